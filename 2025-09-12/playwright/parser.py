@@ -1,10 +1,17 @@
+import asyncio
 import logging
 import psutil
 import time
 import re
-from playwright.sync_api import sync_playwright
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
+from browser_pool import BrowserPool
+
+POOL_SIZE = 4              # contexts, i.e. product pages open at once
+PAGES_PER_CONTEXT = 50     # recycle a context after this many pages
+
+BR_RE = re.compile(r'<br\s*/?>')
+TAG_RE = re.compile(r'<[^>]+>')
 
 
 class Carbon38ProductParser:
@@ -57,44 +64,44 @@ class Carbon38ProductParser:
         except PyMongoError as e:
             self.logger.error(f"Error inserting product data: {e}")
 
-    def parse_product_page(self, page):
+    async def parse_product_page(self, page):
         """Extract detailed product information from a page"""
         try:
-            brand=page.query_selector('xpath=//h2[contains(@class,"ProductMeta__Vendor Heading u-h1")]/a')
-            brand_text = brand.inner_text().strip() if brand else ""
+            brand=await page.query_selector('xpath=//h2[contains(@class,"ProductMeta__Vendor Heading u-h1")]/a')
+            brand_text = (await brand.inner_text()).strip() if brand else ""
 
-            name = page.query_selector('xpath=//h1[contains(@class,"ProductMeta__Title Heading u-h3")]')
-            name_text = name.inner_text().strip() if name else ""
+            name = await page.query_selector('xpath=//h1[contains(@class,"ProductMeta__Title Heading u-h3")]')
+            name_text = (await name.inner_text()).strip() if name else ""
 
-            color=page.query_selector('xpath=//span[contains(@class,"ProductForm__SelectedValue ")]')
-            color_text = color.inner_text().strip() if color else ""
+            color=await page.query_selector('xpath=//span[contains(@class,"ProductForm__SelectedValue ")]')
+            color_text = (await color.inner_text()).strip() if color else ""
 
-            price = page.query_selector('xpath=//span[contains(@class,"ProductMeta__Price Price")]')
-            price_text = price.inner_text().replace("$","").replace("USD","").strip() if price else ""
+            price = await page.query_selector('xpath=//span[contains(@class,"ProductMeta__Price Price")]')
+            price_text = (await price.inner_text()).replace("$","").replace("USD","").strip() if price else ""
 
-            sizes = page.query_selector_all('xpath=//input[contains(@class,"SizeSwatch__Radio")]')
-            size_list = [size.get_attribute("value") for size in sizes if size.get_attribute("value")]  
+            sizes = await page.query_selector_all('xpath=//input[contains(@class,"SizeSwatch__Radio")]')
+            size_list = [value for value in [await size.get_attribute("value") for size in sizes] if value]  
 
-            faq_element = page.query_selector_all('xpath=.//div[contains(@class,"Faq__AnswerWrapper")]//p')
-            editor_notes = faq_element[0].inner_html() if faq_element else ""
-            size_fit = faq_element[1].inner_html() if len(faq_element) > 1 else ""
-            fabric_care = page.query_selector('xpath=.//div[contains(@class,"Faq__AnswerWrapper")]//p/span')
+            faq_element = await page.query_selector_all('xpath=.//div[contains(@class,"Faq__AnswerWrapper")]//p')
+            editor_notes = (await faq_element[0].inner_html()) if faq_element else ""
+            size_fit = (await faq_element[1].inner_html()) if len(faq_element) > 1 else ""
+            fabric_care = await page.query_selector('xpath=.//div[contains(@class,"Faq__AnswerWrapper")]//p/span')
             if fabric_care:
-                raw_html = fabric_care.inner_html()
+                raw_html = await fabric_care.inner_html()
                 # Replace <br> with newline
-                fabric_care_text = re.sub(r'<br\s*/?>', '\n', raw_html)
+                fabric_care_text = BR_RE.sub('\n', raw_html)
                 # Remove any other HTML tags
-                fabric_care_text = re.sub(r'<[^>]+>', '', fabric_care_text).strip()             
+                fabric_care_text = TAG_RE.sub('', fabric_care_text).strip()             
 
         
-            rating=page.query_selector('xpath=//div[contains(@class,"yotpo-bottom-line-left-panel yotpo-bottom-line-score")]')
-            rating_text = rating.inner_text().strip() if rating else ""
+            rating=await page.query_selector('xpath=//div[contains(@class,"yotpo-bottom-line-left-panel yotpo-bottom-line-score")]')
+            rating_text = (await rating.inner_text()).strip() if rating else ""
 
-            reviews=page.query_selector('xpath=//span[contains(@class,"yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel")]')
-            reviews_text = reviews.inner_text().replace("Reviews","").strip() if reviews else ""
+            reviews=await page.query_selector('xpath=//span[contains(@class,"yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel")]')
+            reviews_text = (await reviews.inner_text()).replace("Reviews","").strip() if reviews else ""
 
-            images = page.query_selector_all('xpath=//div[contains(@class,"Product__SlideshowNavScroller")]//img')
-            image_urls = [img.get_attribute("src") for img in images if img.get_attribute("src")]
+            images = await page.query_selector_all('xpath=//div[contains(@class,"Product__SlideshowNavScroller")]//img')
+            image_urls = [src for src in [await img.get_attribute("src") for img in images] if src]
 
             return {
                 "brand": brand_text,
@@ -114,7 +121,18 @@ class Carbon38ProductParser:
             self.logger.error(f"Error parsing product page {page.url}: {e}")
             return None
 
-    def scrape_products(self):
+    async def scrape_product(self, page, url):
+        """Load one product page and store its data"""
+        try:
+            await page.goto(url, timeout=120000, wait_until="domcontentloaded")
+            self.logger.info(f"Scraping product: {url}")
+            product_data = await self.parse_product_page(page)
+            if product_data:
+                self.save_product_data(product_data)
+        except Exception as e:
+            self.logger.error(f"Error scraping URL {url}: {e}")
+
+    async def scrape_products(self):
         """Main scraping method for all product URLs"""
         self.connect_mongo()
         self.start_time = time.time()
@@ -124,22 +142,8 @@ class Carbon38ProductParser:
             self.logger.warning("No product URLs found to scrape.")
             return
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-
-            for url in product_urls:
-                try:
-                    page.goto(url,  timeout=120000, wait_until="domcontentloaded")
-                    #time.sleep(7)
-                    self.logger.info(f"Scraping product: {url}")
-                    product_data = self.parse_product_page(page)
-                    if product_data:
-                        self.save_product_data(product_data)
-                except Exception as e:
-                    self.logger.error(f"Error scraping URL {url}: {e}")
-
-            browser.close()
+        async with BrowserPool(size=POOL_SIZE, pages_per_context=PAGES_PER_CONTEXT) as pool:
+            await pool.map(self.scrape_product, product_urls)
     
         self.print_efficiency()
 
@@ -163,5 +167,5 @@ class Carbon38ProductParser:
 
 if __name__ == "__main__":
     parser = Carbon38ProductParser()
-    parser.scrape_products()
+    asyncio.run(parser.scrape_products())
     parser.close()
@@ -1,15 +1,38 @@
+import logging
 import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from twisted.internet import defer, task, threads
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
 
 class MongoPipeline:
-    def __init__(self, mongo_uri, mongo_db):
+    """
+    Upserts items into MongoDB in batches.
+
+    Items are buffered as UpdateOne operations keyed on product_url and
+    written with bulk_write(ordered=False) on a reactor thread, every
+    MONGO_BATCH_SIZE items or MONGO_FLUSH_INTERVAL seconds, so Mongo latency
+    never blocks the downloader.
+    """
+
+    def __init__(self, mongo_uri, mongo_db, batch_size=500, flush_interval=5):
         self.mongo_uri = mongo_uri
         self.mongo_db = mongo_db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.writes = set()
 
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
             mongo_uri="mongodb://localhost:27017",
-            mongo_db="carbon38"
+            mongo_db="carbon38",
+            batch_size=crawler.settings.getint("MONGO_BATCH_SIZE", 500),
+            flush_interval=crawler.settings.getfloat("MONGO_FLUSH_INTERVAL", 5),
         )
 
     def open_spider(self, spider):
@@ -22,14 +45,45 @@ class MongoPipeline:
             self.collection = self.db["product_data"]
         else:
             self.collection = self.db["default_collection"]
+        self.flusher = task.LoopingCall(self.flush)
+        self.flusher.start(self.flush_interval, now=False)
 
+    @defer.inlineCallbacks
     def close_spider(self, spider):
+        self.flusher.stop()
+        self.flush()
+        # Wait for in-flight batches before closing the client
+        yield defer.DeferredList(list(self.writes))
         self.client.close()
 
     def process_item(self, item, spider):
-        self.collection.update_one(
+        self.buffer.append(UpdateOne(
             {"product_url": item.get("product_url")},
-            {"$set": item},
+            {"$set": dict(item)},
             upsert=True
-        )
+        ))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
         return item
+
+    def flush(self):
+        """Hand everything buffered so far to a reactor thread"""
+        if not self.buffer:
+            return
+        ops, self.buffer = self.buffer, []
+        write = threads.deferToThread(self._write, ops)
+        self.writes.add(write)
+        write.addBoth(self._written, write)
+
+    def _write(self, ops):
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # ordered=False keeps going past bad docs, so only these are lost
+            for error in e.details.get("writeErrors", []):
+                logger.error(f"Mongo upsert failed: {error.get('errmsg')}")
+
+    def _written(self, result, write):
+        self.writes.discard(write)
+        if isinstance(result, Failure):
+            logger.error(f"Mongo batch failed: {result.getErrorMessage()}")
@@ -22,4 +22,8 @@ ITEM_PIPELINES = {
     'carbon38_scraper.pipelines.MongoPipeline': 300,
 }
 
+# Mongo write batching (MongoPipeline)
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
 ROBOTSTXT_OBEY = False
\ No newline at end of file
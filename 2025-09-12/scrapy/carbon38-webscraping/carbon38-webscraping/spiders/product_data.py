@@ -10,7 +10,7 @@ class ProductDetailSpider(scrapy.Spider):
     Purpose:
         - Scrapes detailed product information and review counts from carbon38.com.
         - Reads product URLs from MongoDB (collection: product_urls).
-        - Saves enriched product data back into MongoDB (collection: product_data).
+        - Yields enriched product data; MongoPipeline saves it (collection: product_data).
     """
 
     name = 'product_data'
@@ -18,11 +18,13 @@ class ProductDetailSpider(scrapy.Spider):
 
     def __init__(self, *args, **kwargs):
         super(ProductDetailSpider, self).__init__(*args, **kwargs)
-        # MongoDB connection
+        # MongoDB connection (input only; items are written by MongoPipeline)
         self.client = pymongo.MongoClient("mongodb://localhost:27017")
         self.db = self.client["carbon38"]
         self.urls_collection = self.db["product_urls"]
-        self.data_collection = self.db["product_data"]
+
+    def closed(self, reason):
+        self.client.close()
 
     def start_requests(self):
         """
@@ -126,16 +128,11 @@ class ProductDetailSpider(scrapy.Spider):
         else:
             self.logger.warning(f"No Yotpo product ID found for: {response.url}")
             product["reviews"] = "0 Reviews"
-            self.data_collection.update_one(
-                {"product_url": product["product_url"]},
-                {"$set": product},
-                upsert=True
-            )
             yield product
 
     def parse_reviews(self, response):
         """
-        Parses the Yotpo API response to extract total review count and saves product to MongoDB.
+        Parses the Yotpo API response to extract total review count and yields the product.
         """
         item = response.meta.get("item_data", {})
         try:
@@ -146,10 +143,4 @@ class ProductDetailSpider(scrapy.Spider):
             self.logger.warning(f"Failed to parse Yotpo response: {e}")
             item["reviews"] = ""
 
-        # Save final item to MongoDB
-        self.data_collection.update_one(
-            {"product_url": item["product_url"]},
-            {"$set": item},
-            upsert=True
-        )
         yield item
@@ -3,14 +3,23 @@ import psutil
 import time
 import re
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
+from hybrid_fetch import HybridFetcher, inner_html, text_lines
+
+# Core fields the server renders; pages missing any of them are rendered in Chrome.
+# Yotpo rating/reviews are injected by JS, so static hits leave them empty unless
+# their XPaths are added here.
+REQUIRED_XPATHS = [
+    '//h2[contains(@class,"ProductMeta__Vendor")]/a',
+    '//h1[contains(@class,"ProductMeta__Title")]',
+    '//span[contains(@class,"ProductMeta__Price")]',
+]
+BR_RE = re.compile(r'<br\s*/?>')
+TAG_RE = re.compile(r'<[^>]+>')
 
 
 class Carbon38ProductParserSelenium:
@@ -25,7 +34,7 @@ class Carbon38ProductParserSelenium:
         self.url_collection = None
         self.product_collection = None
         self.start_time = None
-        self.driver = None
+        self.fetcher = None
 
         # Logger setup
         logging.basicConfig(
@@ -64,72 +73,58 @@ class Carbon38ProductParserSelenium:
         except PyMongoError as e:
             self.logger.error(f"Error inserting product data: {e}")
 
-    def setup_driver(self, headless=True):
-        """Setup Selenium Chrome driver"""
+    def setup_driver(self, headless=True, page_load_timeout=30):
+        """Setup Selenium Chrome driver, used only for pages that need rendering"""
         options = webdriver.ChromeOptions()
         if headless:
             options.add_argument("--headless=new")
         options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    def safe_get(self, url, timeout=30):
-        """Load a page with timeout, stop if it takes too long"""
-        self.driver.set_page_load_timeout(timeout)
-        try:
-            self.driver.get(url)
-        except TimeoutException:
-            self.logger.warning(f"Timeout loading {url}, stopping load...")
-            self.driver.execute_script("window.stop();")
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        driver.set_page_load_timeout(page_load_timeout)
+        return driver
 
-    def get_text_or_empty(self, xpath, wait_time=5, attr=None):
+    def get_text_or_empty(self, tree, xpath, attr=None):
         """Return text or attribute for an element, else empty string"""
-        try:
-            el = WebDriverWait(self.driver, wait_time).until(
-                EC.presence_of_element_located((By.XPATH, xpath))
-            )
-            return el.get_attribute(attr).strip() if attr else el.text.strip()
-        except Exception:
+        elements = tree.xpath(xpath)
+        if not elements:
             return ""
+        return (elements[0].get(attr) or "").strip() if attr else text_lines(elements[0])
 
     def parse_product_page(self, url):
         """Extract detailed product information from a product URL"""
         try:
-            self.safe_get(url)
+            tree = self.fetcher.fetch(url)
 
             # --- Extract fields ---
-            brand_text = self.get_text_or_empty('//h2[contains(@class,"ProductMeta__Vendor")]/a')
-            name_text = self.get_text_or_empty('//h1[contains(@class,"ProductMeta__Title")]')
-            color_text = self.get_text_or_empty('//span[contains(@class,"ProductForm__SelectedValue")]')
-            price_text = self.get_text_or_empty('//span[contains(@class,"ProductMeta__Price")]').replace("$", "").replace("USD", "").strip()
+            brand_text = self.get_text_or_empty(tree, '//h2[contains(@class,"ProductMeta__Vendor")]/a')
+            name_text = self.get_text_or_empty(tree, '//h1[contains(@class,"ProductMeta__Title")]')
+            color_text = self.get_text_or_empty(tree, '//span[contains(@class,"ProductForm__SelectedValue")]')
+            price_text = self.get_text_or_empty(tree, '//span[contains(@class,"ProductMeta__Price")]').replace("$", "").replace("USD", "").strip()
 
             # Sizes
-            size_elements = self.driver.find_elements(By.XPATH, '//input[contains(@class,"SizeSwatch__Radio")]')
-            size_list = [s.get_attribute("value") for s in size_elements if s.get_attribute("value")]
+            size_list = [v for v in tree.xpath('//input[contains(@class,"SizeSwatch__Radio")]/@value') if v]
 
             # FAQ sections
-            faq_elements = self.driver.find_elements(By.XPATH, '//div[contains(@class,"Faq__AnswerWrapper")]//p')
-            editor_notes = faq_elements[0].get_attribute("innerHTML").strip() if len(faq_elements) > 0 else ""
-            size_fit = faq_elements[1].get_attribute("innerHTML").strip() if len(faq_elements) > 1 else ""
+            faq_elements = tree.xpath('//div[contains(@class,"Faq__AnswerWrapper")]//p')
+            editor_notes = inner_html(faq_elements[0]).strip() if len(faq_elements) > 0 else ""
+            size_fit = inner_html(faq_elements[1]).strip() if len(faq_elements) > 1 else ""
 
             # Fabric & care
             fabric_care_text = ""
-            try:
-                fabric_care_el = self.driver.find_element(By.XPATH, '//div[contains(@class,"Faq__AnswerWrapper")]//p/span')
-                raw_html = fabric_care_el.get_attribute("innerHTML")
-                fabric_care_text = re.sub(r'<br\s*/?>', '\n', raw_html)
-                fabric_care_text = re.sub(r'<[^>]+>', '', fabric_care_text).strip()
-            except NoSuchElementException:
-                fabric_care_text = ""
+            fabric_care_elements = tree.xpath('//div[contains(@class,"Faq__AnswerWrapper")]//p/span')
+            if fabric_care_elements:
+                raw_html = inner_html(fabric_care_elements[0])
+                fabric_care_text = BR_RE.sub('\n', raw_html)
+                fabric_care_text = TAG_RE.sub('', fabric_care_text).strip()
 
             # Rating & reviews
-            rating_text = self.get_text_or_empty('//div[contains(@class,"yotpo-bottom-line-score")]')
-            reviews_text = self.get_text_or_empty('//span[contains(@class,"yotpo-sr-bottom-line-text")]').replace("Reviews", "").strip()
+            rating_text = self.get_text_or_empty(tree, '//div[contains(@class,"yotpo-bottom-line-score")]')
+            reviews_text = self.get_text_or_empty(tree, '//span[contains(@class,"yotpo-sr-bottom-line-text")]').replace("Reviews", "").strip()
 
             # Images
-            image_elements = self.driver.find_elements(By.XPATH, '//div[contains(@class,"Product__SlideshowNavScroller")]//img')
-            image_urls = [img.get_attribute("src") for img in image_elements if img.get_attribute("src")]
+            image_urls = [src for src in tree.xpath('//div[contains(@class,"Product__SlideshowNavScroller")]//img/@src') if src]
 
             return {
                 "brand": brand_text,
@@ -153,7 +148,8 @@ class Carbon38ProductParserSelenium:
     def scrape_products(self):
         """Main scraping method for all product URLs"""
         self.connect_mongo()
-        self.setup_driver(headless=True)
+        # Chrome is started by the fetcher only when a page first needs rendering
+        self.fetcher = HybridFetcher(REQUIRED_XPATHS, lambda: self.setup_driver(headless=True))
         self.start_time = time.time()
         product_urls = self.fetch_product_urls()
 
@@ -172,7 +168,7 @@ class Carbon38ProductParserSelenium:
             except Exception as e:
                 self.logger.error(f"Error scraping URL {url}: {e}")
 
-        self.driver.quit()
+        self.fetcher.close()
         self.print_efficiency()
 
     def print_efficiency(self):
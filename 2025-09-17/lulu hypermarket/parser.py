@@ -9,22 +9,23 @@ The scraper reads from a MongoDB collection containing categories and product UR
 then scrapes each product page and saves the details to a separate products collection.
 
 Dependencies:
-    - playwright
+    - playwright (async API, through browser_pool.BrowserPool)
     - pymongo
     - logging (built-in)
     - random (built-in) 
-    - time (built-in)
+    - asyncio (built-in)
 
 Database Collections:
     - Input: categories_with_products (contains product URLs to scrape)
     - Output: products (stores scraped product details)
 
 """
+import asyncio
 import logging
 import random
-import time
 from pymongo import MongoClient, errors as mongo_errors
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import BrowserPool
 
 # ------------------------------
 # Logging setup
@@ -34,6 +35,12 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+# ------------------------------
+# Browser pool
+# ------------------------------
+POOL_SIZE = 4              # isolated contexts, i.e. product pages open at once
+PAGES_PER_CONTEXT = 25     # a context (and its user agent) is replaced after this many pages
+
 
 class LuluProductScraper:
     """
@@ -116,7 +123,7 @@ class LuluProductScraper:
         """
         return random.choice(self.user_agents)
 
-    def scrape_product(self, browser, product_url, main_category, subcategory_url):
+    async def scrape_product(self, page, product_url, main_category, subcategory_url):
         """
         Scrape details for a single product page.
         
@@ -124,7 +131,7 @@ class LuluProductScraper:
         availability, and images from a Lulu Hypermarket product page.
         
         Args:
-            browser: Playwright browser instance
+            page: Playwright page opened on a pooled context
             product_url (str): URL of the product page to scrape
             main_category (str): Main category URL this product belongs to
             subcategory_url (str): Subcategory URL this product belongs to
@@ -140,10 +147,6 @@ class LuluProductScraper:
                 - availability (str): Product availability/brand info
                 - images (list): List of product image URLs
         """
-        ua = self._get_random_ua()
-        context = browser.new_context(extra_http_headers={"user-agent": ua})
-        page = context.new_page()
-
         logging.info(f"Scraping product: {product_url} (Category: {main_category})")
 
         product_data = {
@@ -153,41 +156,42 @@ class LuluProductScraper:
         }
 
         try:
-            page.goto(product_url, timeout=60000, wait_until="domcontentloaded")
-            time.sleep(random.uniform(2, 4))
+            await page.goto(product_url, timeout=60000, wait_until="domcontentloaded")
+            await asyncio.sleep(random.uniform(2, 4))
 
             # Title
             try:
-                tittle_el=page.query_selector('//h1[@data-testid="product-name"]')
-                product_data["title"] = tittle_el.inner_text().strip() if tittle_el else ""
+                tittle_el = await page.query_selector('//h1[@data-testid="product-name"]')
+                product_data["title"] = (await tittle_el.inner_text()).strip() if tittle_el else ""
             except Exception:
                 product_data["title"] = ""
 
             # Price
             try:
-                price_el = page.query_selector("//span[@data-testid='price']")
-                product_data["price"] = price_el.inner_text().strip() if price_el else ""
+                price_el = await page.query_selector("//span[@data-testid='price']")
+                product_data["price"] = (await price_el.inner_text()).strip() if price_el else ""
             except Exception:
                 product_data["price"] = ""
 
             # Description
             try:
-                desc_el = page.query_selector_all("//li[@class='flex gap-3.5 text-sm text-gray-620']//span")
-                product_data["description"] = [el.inner_text().strip() for el in desc_el if desc_el]
+                desc_el = await page.query_selector_all("//li[@class='flex gap-3.5 text-sm text-gray-620']//span")
+                product_data["description"] = [(await el.inner_text()).strip() for el in desc_el]
             except Exception:
                 product_data["description"] = []
 
             # Availability / Stock
             try:
-                brand_el = page.query_selector("//a[@class='whitespace-nowrap text-primary']")
-                product_data["availability"] = brand_el.inner_text().strip() if brand_el else ""
+                brand_el = await page.query_selector("//a[@class='whitespace-nowrap text-primary']")
+                product_data["availability"] = (await brand_el.inner_text()).strip() if brand_el else ""
             except Exception:
                 product_data["availability"] = ""
 
             # Images
             try:
-                img_elements = page.query_selector_all("//div[contains(@class,'swiper-wrapper')]//img")
-                product_data["images"] = [img.get_attribute("src") for img in img_elements if img.get_attribute("src")]
+                img_elements = await page.query_selector_all("//div[contains(@class,'swiper-wrapper')]//img")
+                sources = [await img.get_attribute("src") for img in img_elements]
+                product_data["images"] = [src for src in sources if src]
             except Exception:
                 product_data["images"] = []
 
@@ -195,60 +199,66 @@ class LuluProductScraper:
             logging.error(f"Timeout loading {product_url}")
         except Exception as e:
             logging.error(f"Error scraping {product_url}: {e}")
-        finally:
-            context.close()
 
         return product_data
 
-    def run(self):
+    def _product_jobs(self):
+        """
+        Yield (product_url, main_category, subcategory_url) for every product in MongoDB.
+        """
+        for doc in self.final_collection.find():
+            main_category = doc["main_category"]
+            for sub in doc.get("subcategories", []):
+                subcategory_url = sub["subcategory_url"]
+                for product_url in sub.get("products", []):
+                    yield product_url, main_category, subcategory_url
+
+    async def _scrape_and_save(self, page, job):
+        """
+        Scrape one product on a pooled page and upsert it into MongoDB.
+        """
+        product_url, main_category, subcategory_url = job
+        product_data = await self.scrape_product(page, product_url, main_category, subcategory_url)
+
+        try:
+            self.products_collection.update_one(
+                {"product_url": product_url},
+                {"$set": product_data},
+                upsert=True
+            )
+            logging.info(f"Saved product: {product_data.get('title')}")
+        except mongo_errors.PyMongoError as e:
+            logging.error(f"Failed to save product {product_url}: {e}")
+
+        await asyncio.sleep(random.uniform(2, 5))  # anti-bot delay, per context
+
+    async def run(self):
         """
         Execute the main scraping workflow.
         
         This method:
-        1. Launches a Playwright browser instance
+        1. Launches one Playwright browser with a pool of isolated contexts
         2. Reads all categories and product URLs from MongoDB
-        3. Iterates through each product URL and scrapes its details
+        3. Scrapes POOL_SIZE product pages concurrently, one per context
         4. Saves scraped product data to MongoDB products collection
-        5. Includes anti-bot delays and proper cleanup
-        
-        The method processes all documents in the categories_with_products collection,
-        extracting product URLs and scraping each one individually.
+        5. Rotates the user agent whenever a context is recycled
         
         Raises:
             mongo_errors.PyMongoError: If database operations fail
             PlaywrightTimeoutError: If browser operations timeout
             Exception: For other scraping errors
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-
-            # Iterate over all categories and products
-            for doc in self.final_collection.find():
-                main_category = doc["main_category"]
-                subcategories = doc.get("subcategories", [])
-
-                for sub in subcategories:
-                    subcategory_url = sub["subcategory_url"]
-                    product_urls = sub.get("products", [])
-
-                    for product_url in product_urls:
-                        product_data = self.scrape_product(browser, product_url, main_category, subcategory_url)
-
-                        try:
-                            self.products_collection.update_one(
-                                {"product_url": product_url},
-                                {"$set": product_data},
-                                upsert=True
-                            )
-                            logging.info(f"Saved product: {product_data.get('title')}")
-                        except mongo_errors.PyMongoError as e:
-                            logging.error(f"Failed to save product {product_url}: {e}")
-
-                        time.sleep(random.uniform(2, 5))  # anti-bot delay
+        pool = BrowserPool(
+            size=POOL_SIZE,
+            pages_per_context=PAGES_PER_CONTEXT,
+            headless=self.headless,
+            context_options=lambda: {"extra_http_headers": {"user-agent": self._get_random_ua()}},
+        )
+        async with pool:
+            await pool.map(self._scrape_and_save, self._product_jobs())
 
-            browser.close()
-            self.client.close()
-            logging.info("Product scraping completed and MongoDB connection closed.")
+        self.client.close()
+        logging.info("Product scraping completed and MongoDB connection closed.")
 
 
 if __name__ == "__main__":
@@ -264,4 +274,4 @@ if __name__ == "__main__":
         user_agents_file="/home/shahana/datahut-training/hw-training/2025-09-17/lulu hypermarket/user_agents.txt",
         headless=False
     )
-    scraper.run()
+    asyncio.run(scraper.run())
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from playwright.async_api import async_playwright
+
+# Requests a scraper never needs: the DOM is read, nothing is rendered
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+)
+
+
+class BrowserPool:
+    """One browser kept alive with `size` isolated contexts
+
+    Pages run concurrently, at most one per context. A context is closed
+    and replaced after `pages_per_context` pages to cap its memory.
+    `context_options` may be a dict or a callable returning one (e.g. to
+    rotate user agents per context); `on_context` is awaited with every
+    fresh context, e.g. to pass a bot challenge once per context.
+    """
+
+    def __init__(self, size=4, pages_per_context=50, headless=True, block_resources=True,
+                 context_options=None, init_script=None, on_context=None):
+        self.size = size
+        self.pages_per_context = pages_per_context
+        self.headless = headless
+        self.block_resources = block_resources
+        self.context_options = context_options or {}
+        self.init_script = init_script
+        self.on_context = on_context
+        self.contexts_opened = 0
+
+    async def __aenter__(self):
+        self._p = await async_playwright().start()
+        self.browser = await self._p.chromium.launch(headless=self.headless)
+        self.slots = asyncio.Queue()
+        for _ in range(self.size):
+            self.slots.put_nowait(None)  # contexts are opened on first use
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        while not self.slots.empty():
+            slot = self.slots.get_nowait()
+            if slot:
+                await slot["context"].close()
+        await self.browser.close()
+        await self._p.stop()
+        logging.info(f"Browser pool closed after opening {self.contexts_opened} contexts")
+
+    async def _new_context(self):
+        options = self.context_options() if callable(self.context_options) else dict(self.context_options)
+        context = await self.browser.new_context(**options)
+        if self.init_script:
+            await context.add_init_script(self.init_script)
+        if self.block_resources:
+            await context.route("**/*", self._route)
+        if self.on_context:
+            await self.on_context(context)
+        self.contexts_opened += 1
+        return context
+
+    async def _route(self, route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def run(self, handler, *args):
+        """Open a page on a free context and return await handler(page, *args)"""
+        slot = await self.slots.get()
+        try:
+            if slot is None or slot["pages"] >= self.pages_per_context:
+                if slot:
+                    await slot["context"].close()
+                    slot = None
+                slot = {"context": await self._new_context(), "pages": 0}
+            slot["pages"] += 1
+            page = await slot["context"].new_page()
+            try:
+                return await handler(page, *args)
+            finally:
+                await page.close()
+        finally:
+            self.slots.put_nowait(slot)
+
+    async def map(self, handler, items):
+        """Run handler(page, item) for every item, `size` pages at a time
+
+        Items are pulled lazily, so a Mongo cursor can be passed directly.
+        Errors are logged per item and do not stop the others.
+        """
+        items = iter(items)
+
+        async def worker():
+            for item in items:
+                try:
+                    await self.run(handler, item)
+                except Exception as e:
+                    logging.error(f"Error on {item}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(self.size)))
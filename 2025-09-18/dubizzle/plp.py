@@ -3,13 +3,14 @@
 Playwright scraper with stealth and MongoDB category+subcategory+products nesting.
 """
 
-import time
+import asyncio
 import random
 import logging
 from urllib.parse import urljoin
 from pymongo import MongoClient, UpdateOne
 from pymongo.errors import PyMongoError
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+from playwright.async_api import TimeoutError as PWTimeout
+from browser_pool import BrowserPool
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -20,6 +21,8 @@ MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "dubizzle_db"
 PLAYWRIGHT_NAV_TIMEOUT = 60_000  # ms
 CHALLENGE_WAIT = 10
+POOL_SIZE = 3              # contexts, i.e. subcategories paginated at once
+PAGES_PER_CONTEXT = 10     # recycle a context (new UA, new challenge) after this many pages
 
 STEALTH_INIT_JS = r"""
 Object.defineProperty(navigator, 'webdriver', { get: () => false });
@@ -83,23 +86,23 @@ class DubizzlePlaywrightStealthScraper:
 
 
     # ---------- Extraction ----------
-    def _extract_categories(self, page):
+    async def _extract_categories(self, page):
         logging.info(" Extracting categories...")
         cats = []
 
-        nodes = page.query_selector_all(
+        nodes = await page.query_selector_all(
             'xpath=//div[contains(@class,"_948d9e0a _66b37327 _95d4067f")]'
         )
 
         for node in nodes:
-            title_el = node.query_selector(
+            title_el = await node.query_selector(
                 'xpath=.//span[contains(@class,"a1c1940e b7af14b4")]'
             )
-            cat_name = title_el.inner_text().strip() if title_el else "Unknown"
+            cat_name = (await title_el.inner_text()).strip() if title_el else "Unknown"
 
             subs = []
-            for a in node.query_selector_all("a"):
-                href = a.get_attribute("href")
+            for a in await node.query_selector_all("a"):
+                href = await a.get_attribute("href")
                 if href:
                     subs.append(urljoin(self.base_url, href))
 
@@ -108,43 +111,42 @@ class DubizzlePlaywrightStealthScraper:
         logging.info(f" Extracted {len(cats)} categories")
         return cats
 
-    def _extract_products(self, page):
+    async def _extract_products(self, page):
         logging.info(" Extracting product links...")
         products = set()
 
-        links1 = page.query_selector_all('xpath=//div[@class="b5af0448"]/a')
-        links2 = page.query_selector_all('xpath=//div[contains(@class,"_70cdfb32")]/a')
-        links3 = page.query_selector_all('xpath=//div[@class="d6ce1d5a"]//a')
+        links1 = await page.query_selector_all('xpath=//div[@class="b5af0448"]/a')
+        links2 = await page.query_selector_all('xpath=//div[contains(@class,"_70cdfb32")]/a')
+        links3 = await page.query_selector_all('xpath=//div[@class="d6ce1d5a"]//a')
 
         for link in links1 + links2 + links3:
-            href = link.get_attribute("href")
+            href = await link.get_attribute("href")
             if href:
                 products.add(urljoin(self.base_url, href))
 
         logging.info(f" Extracted {len(products)} products")
         return list(products)
     
-    def _extract_products_with_pagination(self, page, cat_name, sub_url):
+    async def _extract_products_with_pagination(self, page, cat_name, sub_url):
         """Extract all products from paginated subcategory using click navigation"""
         all_products = set()
 
         while True:
             
             #  Extract products from current page
-            products = self._extract_products(page)
+            products = await self._extract_products(page)
             all_products.update(products)
 
             #  Find the "Next" button
-            next_btn = page.query_selector("//div[@role='navigation']//ul/li[last()]/a")
-            #print(next_btn.inner_html())
-            if not next_btn or "disabled" in (next_btn.get_attribute("class") or ""):
+            next_btn = await page.query_selector("//div[@role='navigation']//ul/li[last()]/a")
+            if not next_btn or "disabled" in (await next_btn.get_attribute("class") or ""):
                 break  # no more pages
 
             try:
                 logging.info(" Clicking next page...")
-                next_btn.click()
-                page.wait_for_load_state("domcontentloaded", timeout=PLAYWRIGHT_NAV_TIMEOUT)
-                time.sleep(random.uniform(2, 5))  # human-like pause
+                await next_btn.click()
+                await page.wait_for_load_state("domcontentloaded", timeout=PLAYWRIGHT_NAV_TIMEOUT)
+                await asyncio.sleep(random.uniform(2, 5))  # human-like pause
             except PWTimeout:
                 logging.warning(f" Timeout while clicking next page in {sub_url}")
                 break
@@ -155,36 +157,55 @@ class DubizzlePlaywrightStealthScraper:
 
 
     # ---------- Runner ----------
-    def run(self):
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            context = browser.new_context(user_agent=random_ua())
-            page = context.new_page()
-            page.add_init_script(STEALTH_INIT_JS)
-
-            logging.info(" Navigating to homepage...")
+    async def _pass_challenge(self, context):
+        """Open the homepage once per fresh context so its cookies pass the challenge"""
+        page = await context.new_page()
+        try:
+            await page.goto(self.base_url, timeout=PLAYWRIGHT_NAV_TIMEOUT)
+            await asyncio.sleep(CHALLENGE_WAIT)
+        except PWTimeout:
+            logging.warning(" Timeout loading homepage for new context")
+        finally:
+            await page.close()
+
+    async def _load_categories(self, page):
+        logging.info(" Navigating to homepage...")
+        await page.goto(self.base_url, timeout=PLAYWRIGHT_NAV_TIMEOUT)
+        return await self._extract_categories(page)
+
+    async def _crawl_subcategory(self, page, job):
+        cat_name, sub_url = job
+        try:
+            await page.goto(sub_url, timeout=PLAYWRIGHT_NAV_TIMEOUT)
+            await asyncio.sleep(random.uniform(3, 6))
+            await self._extract_products_with_pagination(page, cat_name, sub_url)
+        except PWTimeout:
+            logging.warning(f"Timeout on {sub_url}")
+
+    async def run(self):
+        pool = BrowserPool(
+            size=POOL_SIZE,
+            pages_per_context=PAGES_PER_CONTEXT,
+            headless=False,
+            context_options=lambda: {"user_agent": random_ua()},
+            init_script=STEALTH_INIT_JS,
+            on_context=self._pass_challenge,
+        )
+        async with pool:
             try:
-                page.goto(self.base_url, timeout=PLAYWRIGHT_NAV_TIMEOUT)
-                time.sleep(CHALLENGE_WAIT)
+                categories = await pool.run(self._load_categories)
             except PWTimeout:
                 logging.error(" Timeout loading homepage")
                 return
 
-            categories = self._extract_categories(page)
-
-            for cat in categories:
-                for sub_url in cat["subcategories"][:2]:   #  first two only
-                    try:
-                        page.goto(sub_url,timeout=PLAYWRIGHT_NAV_TIMEOUT)
-                        time.sleep(random.uniform(3, 6))
-                        self._extract_products_with_pagination(page, cat["name"], sub_url)
-                    except PWTimeout:
-                        logging.warning(f"Timeout on {sub_url}")
-
-
-            browser.close()
+            jobs = [
+                (cat["name"], sub_url)
+                for cat in categories
+                for sub_url in cat["subcategories"][:2]   #  first two only
+            ]
+            await pool.map(self._crawl_subcategory, jobs)
 
 
 if __name__ == "__main__":
     scraper = DubizzlePlaywrightStealthScraper()
-    scraper.run()
+    asyncio.run(scraper.run())
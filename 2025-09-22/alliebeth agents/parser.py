@@ -8,6 +8,8 @@ personal details, contact information, office details, and social media links.
 
 Key Features:
 - Reads agent URLs from existing MongoDB collection
+- Fetches profiles with curl_cffi first and renders in Chrome only when
+  the expected profile elements are missing from the static HTML
 - Extracts comprehensive profile data from individual agent pages
 - Handles missing elements gracefully with safe extraction methods
 - Parses complex data like names, phone numbers, and background images
@@ -16,7 +18,9 @@ Key Features:
 - Robust error handling and logging throughout the process
 
 Dependencies:
-- undetected-chromedriver: For stealth web automation
+- curl_cffi: Lightweight requests with a browser TLS fingerprint
+- lxml: XPath extraction on the fetched HTML
+- undetected-chromedriver: For stealth web automation (fallback only)
 - selenium: Web driver framework
 - pymongo: MongoDB Python driver
 - re: Regular expression operations for data parsing
@@ -29,8 +33,8 @@ Database Schema:
 
 The scraper will:
 1. Connect to MongoDB and read all agent URLs from the 'agents' collection
-2. Launch an undetected Chrome browser
-3. Visit each agent profile page individually
+2. Fetch each agent profile page statically
+3. Render it in undetected Chrome only if expected elements are missing
 4. Extract comprehensive profile information using XPath selectors
 5. Parse and clean extracted data (names, phones, addresses, etc.)
 6. Save detailed profile data to 'agent_profiles' collection
@@ -47,11 +51,10 @@ Data Extraction Details:
 """
 
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-import time
 import logging
 from pymongo import MongoClient
 import re
+from hybrid_fetch import HybridFetcher, text_lines
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(
@@ -70,6 +73,13 @@ db = client[DB_NAME]
 agents_col = db[AGENT_COLLECTION]
 profiles_col = db[PROFILE_COLLECTION]
 
+# Elements every server-rendered profile has; if any is missing the page is rendered in Chrome
+REQUIRED_XPATHS = [
+    "//div[contains(@class,'site-info-contact')]/h2",
+    "//div[@class='site-about-column']//div",
+]
+OFFICE_PHONE_RE = re.compile(r"Office Phone:\s*([\(\)\d\-\s]+)")
+
 
 # ----------------- Scraper Class -----------------
 class AllieBethScraper:
@@ -82,17 +92,17 @@ class AllieBethScraper:
     stores the extracted data in a separate MongoDB collection.
     
     Attributes:
-        driver (uc.Chrome): The undetected Chrome WebDriver instance
+        fetcher (HybridFetcher): Static-first page fetcher with browser fallback
    
     """
     def __init__(self):
         """
         Initialize the AllieBeth profile scraper.
         
-        Sets up the scraper instance with a None driver that will be initialized
-        when the scraping process begins.
+        The Chrome driver is only started by the fetcher when a profile first
+        needs rendering.
         """
-        self.driver = None
+        self.fetcher = HybridFetcher(REQUIRED_XPATHS, self.start_driver)
 
     def start_driver(self):
         """
@@ -102,14 +112,18 @@ class AllieBethScraper:
         The browser is started in maximized mode to ensure proper element visibility
         and consistent rendering across different profile pages.
         
+        Returns:
+            uc.Chrome: The started driver, owned and closed by the fetcher
+        
         Raises:
             Exception: If Chrome driver fails to start
         """
         logging.info("Starting undetected Chrome driver...")
         options = uc.ChromeOptions()
         options.add_argument("--start-maximized")
-        self.driver = uc.Chrome(options=options)
+        driver = uc.Chrome(options=options)
         logging.info("Driver started.")
+        return driver
 
     def scrape_agent_profile(self, profile_url):
         """
@@ -146,8 +160,7 @@ class AllieBethScraper:
             - get_background_image_url(): Parses CSS background-image URLs
         """
         logging.info(f"Scraping profile: {profile_url}")
-        self.driver.get(profile_url)
-        time.sleep(2)
+        tree = self.fetcher.fetch(profile_url)
 
         def safe_text(xpath):
             """
@@ -159,11 +172,8 @@ class AllieBethScraper:
             Returns:
                 str: Cleaned text content or empty string if element not found
             """
-            try:
-                el = self.driver.find_element(By.XPATH, xpath)
-                return el.text.strip()
-            except:
-                return ""
+            elements = tree.xpath(xpath)
+            return text_lines(elements[0]) if elements else ""
 
         def safe_attribute(xpath, attr):
             """
@@ -176,11 +186,8 @@ class AllieBethScraper:
             Returns:
                 str: Attribute value or empty string if element/attribute not found
             """
-            try:
-                el = self.driver.find_element(By.XPATH, xpath)
-                return el.get_attribute(attr)
-            except:
-                return ""
+            elements = tree.xpath(xpath)
+            return elements[0].get(attr, "") if elements else ""
             
         def get_background_image_url(xpath):
             """
@@ -196,11 +203,10 @@ class AllieBethScraper:
             Returns:
                 str: Clean image URL or empty string if not found/parseable
             """
-            try:
-                style = self.driver.find_element(By.XPATH, xpath).get_attribute("style")
-                return style.split("url(")[-1].split(")")[0].strip().strip('"').strip("'")
-            except:
+            style = safe_attribute(xpath, "style")
+            if not style:
                 return ""
+            return style.split("url(")[-1].split(")")[0].strip().strip('"').strip("'")
 
         # --- Extract name ---
         full_name = safe_text("//div[contains(@class,'site-info-contact')]/h2")
@@ -219,15 +225,12 @@ class AllieBethScraper:
         agent_phone = safe_text("//div[@class='site-info-contact']//p[a[contains(@href,'tel:')]]/a")
         office_phone_text = safe_text("//div[@class='site-info-contact']//p[contains(., 'Office Phone')]")
         # extract phone number with regex
-        office_phone_match = re.search(r"Office Phone:\s*([\(\)\d\-\s]+)", office_phone_text)
+        office_phone_match = OFFICE_PHONE_RE.search(office_phone_text)
         office_phone = office_phone_match.group(1).strip() if office_phone_match else ""
         
 
         # --- Social links ---
-        social_links = [
-            el.get_attribute("href")
-            for el in self.driver.find_elements(By.XPATH, "//ul[@class='no-bullet site-bio-social']//a")
-        ]
+        social_links = tree.xpath("//ul[@class='no-bullet site-bio-social']//a/@href")
 
         agent_data = {
             "profile_url": profile_url,
@@ -277,8 +280,8 @@ class AllieBethScraper:
         
         This is the main method that orchestrates the entire profile scraping process:
         1. Connects to MongoDB and retrieves all agent URLs from the agents collection
-        2. Starts the Chrome WebDriver
-        3. Iterates through each agent URL
+        2. Iterates through each agent URL
+        3. Fetches each profile statically, starting Chrome only if needed
         4. Scrapes detailed profile information from each page
         5. Saves the extracted data to the agent_profiles collection
         6. Properly cleans up browser resources
@@ -297,7 +300,6 @@ class AllieBethScraper:
             Exception: Any exception that occurs during the scraping process
                       will be logged, but the browser cleanup will still occur.
         """
-        self.start_driver()
         try:
             # read all agent URLs from DB
             urls = [doc["url"] for doc in agents_col.find({}, {"url": 1})]
@@ -308,7 +310,7 @@ class AllieBethScraper:
                 self.save_to_mongodb(profile_data)
 
         finally:
-            self.driver.quit()
+            self.fetcher.close()
             logging.info("Scraping finished.")
 
 
@@ -18,7 +18,7 @@ Key Features:
 Technical Approach:
 - Uses incremental scrolling (step-by-step) instead of full-page scrolling
 - Implements proper browser lifecycle management with cleanup
-- Handles dynamic content loading with configurable pause times
+- Handles dynamic content loading with adaptive, event-driven waits
 - Provides detailed progress logging for debugging and monitoring
 
 Dependencies:
@@ -36,9 +36,10 @@ Database Schema:
 Scrolling Strategy:
 The scraper uses incremental scrolling to handle websites with lazy loading:
 1. Scrolls down in configurable pixel increments (default: 1000px)
-2. Pauses between scrolls to allow content loading (default: 2 seconds)
-3. Monitors page height changes to detect when all content is loaded
-4. Continues until no new content appears
+2. After each step waits only until the agent count grows
+3. At the bottom doubles the wait (0.25s up to 4s) while the count stays
+   flat, and stops after 5 flat waits in a row
+4. Logs the number of rounds that loaded agents and the seconds taken
 
 Configuration:
     All key parameters can be modified in the __main__ section:
@@ -71,6 +72,8 @@ from typing import List
 from pymongo import MongoClient
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
 
 # --- Logging setup ---
@@ -84,6 +87,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- Adaptive scrolling ---
+MAX_SCROLL_ROUNDS = 200  # safety cap on rounds that loaded agents; scrolling normally ends on flat waits
+SCROLL_MIN_WAIT = 0.25   # seconds
+SCROLL_MAX_WAIT = 4      # seconds; longest single wait for new agents
+SCROLL_FLAT_WAITS = 5    # waits in a row at the bottom without new agents that end the scroll
+PAGE_STATE_JS = (
+    "return [document.evaluate('count(' + arguments[0] + ')', document, null, "
+    "XPathResult.NUMBER_TYPE, null).numberValue, document.body.scrollHeight];"
+)
+
 
 class AgentScraper:
     """
@@ -172,56 +185,67 @@ class AgentScraper:
             logger.info("Closing browser...")
             self.driver.quit()
 
-    def _scroll_part_by_part(self, pause: float = 2.0, step: int = 1000):
+    def _scroll_part_by_part(self, item_xpath: str, step: int = 1000) -> int:
         """
-        Perform intelligent incremental scrolling to load all dynamic content.
-        
-        Many modern websites use lazy loading or infinite scroll mechanisms that
-        require gradual scrolling to trigger content loading. This method implements
-        an incremental scrolling strategy that:
-        
-        1. Scrolls down in configurable pixel increments
-        2. Pauses between scrolls to allow content loading
-        3. Monitors page height changes to detect new content
-        4. Continues until no new content is loaded
+        Perform adaptive incremental scrolling to load all dynamic content.
         
-        This approach is more reliable than simple full-page scrolling and works
-        better with websites that have complex loading mechanisms.
+        After every step the scroll waits only until the agent count grows.
+        Steps above the bottom wait SCROLL_MIN_WAIT at most. At the bottom the
+        wait doubles from SCROLL_MIN_WAIT up to SCROLL_MAX_WAIT while the
+        count stays flat, and scrolling ends after SCROLL_FLAT_WAITS flat
+        waits in a row. Only rounds that loaded agents count toward
+        MAX_SCROLL_ROUNDS, which is a safety cap and logs a warning when hit.
         
         Args:
-            pause (float, optional): Time in seconds to wait between scroll steps.
-                                   Defaults to 2.0 seconds. Increase for slower
-                                   networks or websites with heavy content.
+            item_xpath (str): XPath of the agent cards whose count is watched.
             step (int, optional): Number of pixels to scroll in each increment.
-                                Defaults to 1000 pixels. Adjust based on page
-                                layout and content density.
+                                Defaults to 1000 pixels.
         
-        Technical Details:
-            - Tracks current scroll position and page height
-            - Uses JavaScript execution for precise scroll control
-            - Provides debug logging for monitoring scroll progress
-            - Handles edge cases like very short pages or loading failures
-        
-        Note:
-            The method automatically detects when the bottom of the page is reached
-            by comparing scroll position with total page height.
+        Returns:
+            int: Number of scroll rounds that loaded agents.
         """
         logger.info("Scrolling part by part to load all agents...")
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        item_count, height = self.driver.execute_script(PAGE_STATE_JS, item_xpath)
         position = 0
+        wait = SCROLL_MIN_WAIT
+        flat_waits = 0
+        rounds = 0
 
-        while True:
-            position += step
+        while rounds < MAX_SCROLL_ROUNDS:
+            position = min(position + step, height)
             self.driver.execute_script(f"window.scrollTo(0, {position});")
-            time.sleep(pause)
+            at_bottom = position >= height
+
+            try:
+                item_count, height = WebDriverWait(
+                    self.driver, wait if at_bottom else SCROLL_MIN_WAIT, poll_frequency=0.1
+                ).until(lambda d: self._more_items(d.execute_script(PAGE_STATE_JS, item_xpath), item_count))
+                rounds += 1
+                wait = SCROLL_MIN_WAIT
+                flat_waits = 0
+                logger.debug(f"Scrolled to {position}px / {item_count} agents / page height = {height}")
+                continue
+            except TimeoutException:
+                # The page can still grow taller without new agents (images, footer)
+                height = self.driver.execute_script(PAGE_STATE_JS, item_xpath)[1]
+
+            if position < height:
+                continue  # content below not reached yet, keep stepping
+
+            flat_waits += 1
+            if flat_waits >= SCROLL_FLAT_WAITS:
+                logger.info(f"Agent count stayed at {item_count} for {flat_waits} waits, no more content to load.")
+                break
+            wait = min(wait * 2, SCROLL_MAX_WAIT)
+        else:
+            logger.warning(f"Stopped at the MAX_SCROLL_ROUNDS safety cap ({MAX_SCROLL_ROUNDS}) with agents still loading.")
 
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            logger.debug(f"Scrolled to {position}px / page height = {new_height}")
+        return rounds
 
-            if position >= new_height:
-                logger.info("Reached bottom of the page, no more content to load.")
-                break
-            last_height = new_height
+    @staticmethod
+    def _more_items(state, item_count: int):
+        """Return the new (item_count, height) if more agents were loaded, else False."""
+        return state if state[0] > item_count else False
 
     def fetch_links(self, xpath: str):
         """
@@ -270,7 +294,9 @@ class AgentScraper:
             time.sleep(5)  # Let page load fully
 
             # Scroll in parts
-            self._scroll_part_by_part()
+            started = time.monotonic()
+            rounds = self._scroll_part_by_part(xpath)
+            logger.info(f"Scrolled {rounds} rounds that loaded agents in {time.monotonic() - started:.1f}s")
 
             logger.info("Extracting agent links...")
             elements = self.driver.find_elements(By.XPATH, xpath)
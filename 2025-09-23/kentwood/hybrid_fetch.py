@@ -0,0 +1,89 @@
+import logging
+from curl_cffi import requests as curl_requests
+from lxml import etree, html
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+
+def text_lines(el):
+    """Non-empty text nodes of an element joined by newlines, like a browser's .text"""
+    return "\n".join(t.strip() for t in el.xpath(".//text()") if t.strip())
+
+
+def inner_html(el):
+    """Markup inside an element, like a browser's innerHTML"""
+    return (el.text or "") + "".join(etree.tostring(child, encoding="unicode") for child in el)
+
+
+class HybridFetcher:
+    """Plain HTTP first, a browser only for pages that need rendering
+
+    A page fetched with curl_cffi (browser TLS fingerprint) is used as is when
+    every XPath in required_xpaths matches an element. Otherwise it is loaded in
+    a browser created by browser_factory on first use and reused for every later
+    fallback. Either way an lxml tree with absolute links is returned.
+    """
+
+    def __init__(self, required_xpaths, browser_factory, impersonate="chrome", timeout=30, render_timeout=10):
+        self.required_xpaths = required_xpaths
+        self.required = [etree.XPath(xpath) for xpath in required_xpaths]
+        self.browser_factory = browser_factory
+        self.session = curl_requests.Session(impersonate=impersonate)
+        self.timeout = timeout
+        self.render_timeout = render_timeout
+        self.driver = None
+        self.stats = {"static": 0, "browser": 0}
+
+    def fetch(self, url):
+        tree = self._fetch_static(url)
+        if tree is not None and self.is_complete(tree):
+            self.stats["static"] += 1
+            return tree
+
+        self.stats["browser"] += 1
+        return self._fetch_browser(url)
+
+    def is_complete(self, tree):
+        return all(xpath(tree) for xpath in self.required)
+
+    def _fetch_static(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except Exception as e:
+            logging.warning(f"Static fetch failed for {url}: {e}")
+            return None
+        if response.status_code != 200:
+            logging.info(f"Static fetch got {response.status_code} for {url}, using browser")
+            return None
+        return self._parse(response.text, url)
+
+    def _fetch_browser(self, url):
+        if self.driver is None:
+            self.driver = self.browser_factory()
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            # Page load timeout set by the factory: keep whatever has loaded
+            logging.warning(f"Timeout loading {url}, stopping load...")
+            self.driver.execute_script("window.stop();")
+        try:
+            # Wait for the content, not a fixed time
+            WebDriverWait(self.driver, self.render_timeout).until(
+                EC.presence_of_element_located((By.XPATH, self.required_xpaths[0]))
+            )
+        except TimeoutException:
+            logging.warning(f"Expected content did not render for {url}")
+        return self._parse(self.driver.page_source, url)
+
+    def _parse(self, text, url):
+        tree = html.fromstring(text, base_url=url)
+        tree.make_links_absolute(url)  # hrefs/srcs as a browser reports them
+        return tree
+
+    def close(self):
+        self.session.close()
+        if self.driver:
+            self.driver.quit()
+        logging.info(f"Pages fetched: {self.stats['static']} static, {self.stats['browser']} via browser")
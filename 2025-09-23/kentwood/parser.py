@@ -19,14 +19,17 @@ Key Features:
 - Configurable processing limits for testing and batch processing
 
 Technical Approach:
-- Uses undetected Chrome WebDriver to bypass anti-bot protections
+- Fetches profiles with curl_cffi first; undetected Chrome is started only
+  for pages whose expected fields are missing from the static HTML
 - Implements safe extraction methods with graceful error handling
 - Sophisticated text parsing for complex address and name formats
 - Handles dynamic content loading with appropriate wait times
 - Processes multiple data types: text, attributes, lists, and structured data
 
 Dependencies:
-- undetected-chromedriver: For stealth web automation
+- curl_cffi: Lightweight requests with a browser TLS fingerprint
+- lxml: XPath extraction on the fetched HTML
+- undetected-chromedriver: For stealth web automation (fallback only)
 - selenium: Web driver framework
 - pymongo: MongoDB Python driver
 - typing: Type hint support
@@ -43,8 +46,8 @@ Configuration:
 
 The scraper will:
 1. Connect to MongoDB and read agent URLs from source collection
-2. Launch undetected Chrome browser for stealth scraping
-3. Visit each agent profile page individually
+2. Fetch each profile with curl_cffi, validating the expected XPaths
+3. Render a profile in undetected Chrome only when fields are missing
 4. Extract comprehensive profile information using XPath selectors
 5. Parse and structure extracted data into standardized format
 6. Save detailed profiles to target collection with duplicate prevention
@@ -60,12 +63,11 @@ Error Handling:
 """
 
 
-import time
 import logging
 from typing import Dict
 from pymongo import MongoClient
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
+from hybrid_fetch import HybridFetcher, text_lines
 
 
 # --- Logging setup ---
@@ -79,6 +81,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Elements every server-rendered profile has; if any is missing the page is rendered in Chrome
+REQUIRED_XPATHS = [
+    "//p[@class='rng-agent-profile-contact-name']",
+    "//li[@class='rng-agent-profile-contact-address']",
+]
+
 
 class AgentDetailsScraper:
     """
@@ -97,7 +105,7 @@ class AgentDetailsScraper:
         db_name (str): Target database name in MongoDB
         source_collection (str): Collection containing agent URLs to process
         target_collection (str): Collection to store detailed profile data
-        driver (uc.Chrome): Undetected Chrome WebDriver instance
+        fetcher (HybridFetcher): Static-first page fetcher with browser fallback
     
     """
     def __init__(self, mongo_uri: str, db_name: str, source_collection: str, target_collection: str):
@@ -111,14 +119,14 @@ class AgentDetailsScraper:
             target_collection (str): Collection name to store extracted profile details
         
         Note:
-            The scraper initializes with a None driver that will be created when
-            the scraping process begins. MongoDB connections are established as needed.
+            The browser is only launched by the fetcher when a page first needs
+            rendering. MongoDB connections are established as needed.
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
         self.source_collection = source_collection
         self.target_collection = target_collection
-        self.driver = None
+        self.fetcher = HybridFetcher(REQUIRED_XPATHS, self._launch_browser)
 
     def _launch_browser(self):
         """
@@ -134,12 +142,11 @@ class AgentDetailsScraper:
             - Maximizes window for consistent element visibility
             - Uses undetected-chromedriver for enhanced stealth capabilities
         
+        Returns:
+            uc.Chrome: The launched browser, owned and closed by the fetcher
+        
         Raises:
             Exception: If Chrome browser fails to launch or initialize properly
-        
-        Note:
-            The browser instance is stored in self.driver and should be closed
-            using _close_browser() to prevent resource leaks.
         """
         logger.info("Launching undetected Chrome...")
         options = uc.ChromeOptions()
@@ -147,8 +154,9 @@ class AgentDetailsScraper:
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_argument("--disable-gpu")
         options.add_argument("--start-maximized")
-        self.driver = uc.Chrome(options=options)
+        driver = uc.Chrome(options=options)
         logger.info("Browser launched successfully.")
+        return driver
 
     def _close_browser(self):
         """
@@ -162,11 +170,10 @@ class AgentDetailsScraper:
             Always called in finally blocks to guarantee resource cleanup
             even when exceptions occur during the scraping process.
         """
-        if self.driver:
-            logger.info("Closing browser...")
-            self.driver.quit()
+        logger.info("Closing fetcher and browser...")
+        self.fetcher.close()
 
-    def _extract_text(self, xpath: str) -> str:
+    def _extract_text(self, tree, xpath: str) -> str:
         """
         Safely extract text content from an element using XPath with error handling.
         
@@ -175,10 +182,11 @@ class AgentDetailsScraper:
         or missing information sections.
         
         Args:
+            tree: Parsed profile page
             xpath (str): XPath expression to locate the target element
         
         Returns:
-            str: Stripped text content from the element, or None if element not found
+            str: Text lines of the element, or None if element not found
         
         Error Handling:
             - Returns None for missing elements instead of raising exceptions
@@ -186,12 +194,10 @@ class AgentDetailsScraper:
             - Handles various types of element location failures
         
         """
-        try:
-            return self.driver.find_element(By.XPATH, xpath).text.strip()
-        except Exception:
-            return None
+        elements = tree.xpath(xpath)
+        return text_lines(elements[0]) if elements else None
 
-    def _extract_attr(self, xpath: str, attr: str) -> str:
+    def _extract_attr(self, tree, xpath: str, attr: str) -> str:
         """
         Safely extract an attribute value from an element using XPath.
         
@@ -200,6 +206,7 @@ class AgentDetailsScraper:
         other attribute-based data from profile pages.
         
         Args:
+            tree: Parsed profile page
             xpath (str): XPath expression to locate the target element
             attr (str): Name of the attribute to extract (e.g., 'href', 'src', 'class')
         
@@ -211,10 +218,8 @@ class AgentDetailsScraper:
             - Handles various types of element location and attribute access failures
             - Prevents crashes when profile pages have inconsistent structure
         """
-        try:
-            return self.driver.find_element(By.XPATH, xpath).get_attribute(attr)
-        except Exception:
-            return None
+        elements = tree.xpath(xpath)
+        return elements[0].get(attr) if elements else None
 
     def _extract_agent_details(self, url: str) -> Dict:
         """
@@ -234,8 +239,8 @@ class AgentDetailsScraper:
                 with empty/None values if extraction fails.
         
         Data Extraction Process:
-            1. Navigates to the agent's profile page
-            2. Waits for page content to load completely
+            1. Fetches the profile statically, rendering it only if fields are missing
+            2. Parses the HTML once into an lxml tree
             3. Extracts personal information (name, title, image)
             4. Processes contact information (phone, email, website)
             5. Parses complex address data with city/state/zip separation
@@ -258,13 +263,9 @@ class AgentDetailsScraper:
             - Social: social (list of URLs)
             - Meta: profile_url for reference
         
-        Note:
-            This method includes a 3-second wait after page load to ensure
-            all dynamic content is fully rendered before extraction begins.
         """
         logger.info(f"Visiting {url}")
-        self.driver.get(url)
-        time.sleep(3)  # allow page to load
+        tree = self.fetcher.fetch(url)
 
         details = {
             "profile_url": url,
@@ -290,10 +291,10 @@ class AgentDetailsScraper:
 
         try:
            
-            p_elem = self.driver.find_element(By.XPATH, "//p[@class='rng-agent-profile-contact-name']")
+            name_text = self._extract_text(tree, "//p[@class='rng-agent-profile-contact-name']") or ""
 
             # Extract name only (exclude <span>)
-            full_name = p_elem.get_attribute("innerText").split("\n")[0].strip()
+            full_name = name_text.split("\n")[0].strip()
             if full_name:
                 parts = full_name.split()
                 if len(parts) >= 1: details["first_name"] = parts[0]
@@ -302,20 +303,20 @@ class AgentDetailsScraper:
                     details["middle_name"] = " ".join(parts[1:-1])
                     details["last_name"] = parts[-1]
 
-            details["title"] = self._extract_text("//span[@class='rng-agent-profile-contact-title']")
+            details["title"] = self._extract_text(tree, "//span[@class='rng-agent-profile-contact-title']")
 
-            details["image_url"] = self._extract_attr("//img[contains(@class,'rng-agent-profile-photo')]", "src")
+            details["image_url"] = self._extract_attr(tree, "//img[contains(@class,'rng-agent-profile-photo')]", "src")
 
-            details["email"] = self._extract_attr("//li[@class='rng-agent-profile-contact-email']/a", "href")
+            details["email"] = self._extract_attr(tree, "//li[@class='rng-agent-profile-contact-email']/a", "href")
             if details["email"]:
                 details["email"] = "https://www.kentwood.com/" + details["email"]
 
             # Phones
-            agent_phones = self.driver.find_elements(By.XPATH, "//li[@class='rng-agent-profile-contact-phone']/a")
-            details["agent_phone_numbers"] = agent_phones[0].text.strip() if agent_phones else ""
+            agent_phones = tree.xpath("//li[@class='rng-agent-profile-contact-phone']/a")
+            details["agent_phone_numbers"] = text_lines(agent_phones[0]) if agent_phones else ""
 
             # address
-            full_address= self._extract_text("//li[@class='rng-agent-profile-contact-address']")
+            full_address= self._extract_text(tree, "//li[@class='rng-agent-profile-contact-address']") or ""
             lines = [line.strip() for line in full_address.split("\n") if line.strip()]
             
             if len(lines) >= 2:
@@ -331,14 +332,13 @@ class AgentDetailsScraper:
                     details["zipcode"] = city_state_zip[2]
 
             # Description / Bio
-            details["description"] = self._extract_text("//div[contains(@id,'widget-text-1-preview-')]")
+            details["description"] = self._extract_text(tree, "//div[contains(@id,'widget-text-1-preview-')]")
 
             # Social media links
-            socials = self.driver.find_elements(By.XPATH, "//li[contains(@class,'social-')]/a")
-            details["social"] = [el.get_attribute("href") for el in socials if el.get_attribute("href")]
+            details["social"] = tree.xpath("//li[contains(@class,'social-')]/a/@href")
 
             # Website
-            details["website"] = self._extract_attr("//li[@class='rng-agent-profile-contact-website']/a", "href")
+            details["website"] = self._extract_attr(tree, "//li[@class='rng-agent-profile-contact-website']/a", "href")
 
         except Exception as e:
             logger.exception(f"Error extracting details for {url}: {e}")
@@ -362,8 +362,8 @@ class AgentDetailsScraper:
         Workflow Process:
             1. Establishes MongoDB connection and retrieves agent URLs
             2. Applies optional limit for testing or batch processing
-            3. Launches undetected Chrome browser for scraping
-            4. Iterates through each agent URL individually
+            3. Iterates through each agent URL individually
+            4. Fetches statically, launching Chrome only on the first page that needs it
             5. Extracts comprehensive profile details from each page
             6. Saves structured data to target collection with upsert operations
             7. Logs progress and handles errors for each profile
@@ -383,7 +383,8 @@ class AgentDetailsScraper:
             - Detailed error logging for debugging and monitoring
         
         Performance Considerations:
-            - Single browser instance used for all profiles (efficient)
+            - Most profiles are server-rendered and never touch the browser
+            - Single browser instance reused for all fallbacks
             - MongoDB connection reuse for better performance
             - Configurable limits for memory management with large datasets
             - Progress logging for monitoring long-running operations
@@ -414,8 +415,6 @@ class AgentDetailsScraper:
 
             logger.info(f"Found {len(urls)} URLs to process.")
 
-            self._launch_browser()
-
             for url in urls:
                 details = self._extract_agent_details(url)
 
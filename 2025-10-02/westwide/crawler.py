@@ -1,11 +1,13 @@
 
+import asyncio
 import logging
 import time
 from urllib.parse import urljoin
 
 from lxml import html
 from pymongo import MongoClient, errors
-from playwright.sync_api import sync_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import BrowserPool
 
 
 MONGO_URI = "mongodb://localhost:27017/"
@@ -13,6 +15,17 @@ MONGO_DB = "westside"
 CATEGORIES_COLLECTION = "categories"
 START_URL = "https://www.westside.com/"
 
+POOL_SIZE = 4              # contexts, i.e. categories scrolled at once
+PAGES_PER_CONTEXT = 20     # recycle a context after this many pages
+
+# DOM scrolling: wait for new items, doubling the wait while none arrive
+SCROLL_MIN_WAIT = 0.25           # seconds
+SCROLL_MAX_WAIT = 4              # seconds; a round that waits this long for nothing ends the scroll
+MAX_SCROLL_ROUNDS = 50
+
+COUNT_ITEMS_JS = "xpath => document.evaluate(`count(${xpath})`, document, null, XPathResult.NUMBER_TYPE, null).numberValue"
+ITEMS_GREW_JS = "([xpath, count]) => document.evaluate(`count(${xpath})`, document, null, XPathResult.NUMBER_TYPE, null).numberValue > count"
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("westside")
 
@@ -25,46 +38,53 @@ class WestsideScraper:
         self.cat_col.create_index("url", unique=True)
         self.headless = headless
 
-    def __enter__(self):
-        self._p = sync_playwright().start()
-        self.browser = self._p.chromium.launch(headless=self.headless)
+    async def __aenter__(self):
+        self.pool = BrowserPool(size=POOL_SIZE, pages_per_context=PAGES_PER_CONTEXT, headless=self.headless)
+        await self.pool.__aenter__()
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.browser.close()
-        self._p.stop()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.pool.__aexit__(exc_type, exc_val, exc_tb)
         self.client.close()
 
-    def _infinite_scroll(self, page, item_xpath="//a[contains(@class,'wizzy-result-product-item')]", pause=1.5, max_rounds=50):
+    async def _infinite_scroll(self, page, item_xpath="//a[contains(@class,'wizzy-result-product-item')]", max_rounds=MAX_SCROLL_ROUNDS):
         """
-        Scrolls in chunks and extracts product URLs dynamically.
-        Returns a list of product hrefs.
+        Scrolls to the bottom until the product count stops growing.
+        Each round waits, re-checking on every DOM mutation, only until new items
+        appear; while none do the wait doubles from SCROLL_MIN_WAIT, and a round
+        that gets nothing after SCROLL_MAX_WAIT ends the scroll.
+        Returns the number of scroll rounds.
         """
-        seen_hrefs = set()
-        prev_count = 0
-
-        for _ in range(max_rounds):
-            page.evaluate("window.scrollBy(0, window.innerHeight);")
-            time.sleep(pause)
-            tree = html.fromstring(page.content())
-            new_hrefs = set(tree.xpath(item_xpath))
-            seen_hrefs.update(new_hrefs)
-
-            # Stop if no new products appear after scroll
-            if len(seen_hrefs) == prev_count:
-                break
-            prev_count = len(seen_hrefs)
-
-        return list(seen_hrefs)
+        item_count = await page.evaluate(COUNT_ITEMS_JS, item_xpath)
+        wait = SCROLL_MIN_WAIT
+        rounds = 0
 
-    def get_category_urls(self):
+        while rounds < max_rounds:
+            rounds += 1
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+            try:
+                await page.wait_for_function(
+                    ITEMS_GREW_JS, arg=[item_xpath, item_count], polling="mutation", timeout=wait * 1000
+                )
+            except PlaywrightTimeoutError:
+                # Stop if no new products appear even after the longest wait
+                if wait >= SCROLL_MAX_WAIT:
+                    break
+                wait = min(wait * 2, SCROLL_MAX_WAIT)
+                continue
+
+            item_count = await page.evaluate(COUNT_ITEMS_JS, item_xpath)
+            wait = SCROLL_MIN_WAIT
+
+        return rounds
+
+    async def get_category_urls(self, page):
         """
         Extract Men’s category URLs with a SINGLE XPath.
         """
-        page = self.browser.new_page()
-        page.goto(START_URL, wait_until="domcontentloaded")
+        await page.goto(START_URL, wait_until="domcontentloaded")
 
-        tree = html.fromstring(page.content())
+        tree = html.fromstring(await page.content())
       
         category_el = tree.xpath("//ul[@class='last-child western-wear']")
         category_hrefs = category_el[4].xpath(".//a/@href") if category_el else []
@@ -79,20 +99,20 @@ class WestsideScraper:
                 pass
             categories.append(abs_url)
 
-        page.close()
         return categories
 
-    def extract_products_from_category(self, category_url: str):
+    async def extract_products_from_category(self, page, category_url: str):
         """
         Extract product URLs from a category page with a SINGLE XPath.
         Save them into the same category doc as a list.
         """
-        page = self.browser.new_page()
-        page.goto(category_url, wait_until="domcontentloaded")
-
-        self._infinite_scroll(page)
+        await page.goto(category_url, wait_until="domcontentloaded")
+        started = time.monotonic()
+        rounds = await self._infinite_scroll(page)
+        logger.info(f"Scrolled {rounds} rounds in {time.monotonic() - started:.1f}s for category: {category_url}")
 
-        tree = html.fromstring(page.content())
+        # One DOM read once scrolling has stopped
+        tree = html.fromstring(await page.content())
         product_hrefs = tree.xpath("//a[@class='wizzy-result-product-item']/@href")
 
         product_urls = [urljoin(category_url, href) for href in set(product_hrefs)]
@@ -105,16 +125,23 @@ class WestsideScraper:
         )
 
         logger.info(f"Saved {len(product_urls)} products for category: {category_url}")
-        page.close()
 
-    def crawl(self):
-        categories = self.get_category_urls()
+    async def crawl(self):
+        categories = await self.pool.run(self.get_category_urls)
+        pending = []
         for cat_url in categories:
             cat_doc = self.cat_col.find_one({"url": cat_url})
             if not cat_doc or not cat_doc.get("scraped"):
-                self.extract_products_from_category(cat_url)
+                pending.append(cat_url)
+
+        # Categories scroll concurrently, one per pooled context
+        await self.pool.map(self.extract_products_from_category, pending)
+
+
+async def main():
+    async with WestsideScraper(headless=False) as scraper:
+        await scraper.crawl()
 
 
 if __name__ == "__main__":
-    with WestsideScraper(headless=False) as scraper:
-        scraper.crawl()
+    asyncio.run(main())
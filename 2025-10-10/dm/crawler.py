@@ -1,8 +1,12 @@
 import logging
+import threading
 import requests
-from mongoengine import connect, errors
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import BulkWriteError
+from mongoengine import connect
 from items import ProductCategoryUrlItem, ProductUrlItem
-from settings import HEADERS, MONGO_DB
+from http_session import new_session
+from settings import HEADERS, MONGO_DB, CATEGORY_WORKERS, PAGE_WORKERS, REQUEST_TIMEOUT
 
 class Crawler:
     """Crawling product URLs from DM Austria using MongoEngine"""
@@ -15,6 +19,13 @@ class Crawler:
         self.base_url = "https://www.dm.at"
         self.api_base = "https://product-search.services.dmtech.com/at/search/static"
 
+        # Keep-alive pool large enough for every in-flight request
+        self.session = new_session(pool_size=CATEGORY_WORKERS + PAGE_WORKERS)
+
+        # Page requests of all categories share this pool
+        self.page_pool = ThreadPoolExecutor(max_workers=PAGE_WORKERS)
+
+        self.count_lock = threading.Lock()
         self.inserted_count = 0
         self.skipped_count = 0
 
@@ -23,51 +34,54 @@ class Crawler:
         categories = ProductCategoryUrlItem.objects()  # fetch all categories from MongoDB
         logging.info(f"Loaded {categories.count()} categories from MongoDB")
 
-        for cat in categories:
-            if not cat.filters:
-                continue
-
-            filter_param = cat.filters.replace(":", "=").replace(" ", "&")
-            sort = cat.sort or "editorial_relevance"
-            api = f"{self.api_base}?{filter_param}&pageSize=30&searchType=editorial-search&sort={sort}&type=search-static"
-
-            logging.info(f"Processing category: {cat.category_path}")
-            logging.info(f"API: {api}")
-
-            try:
-                first_response = requests.get(api, headers=HEADERS)
-                first_response.raise_for_status()
-            except requests.RequestException as e:
-                logging.warning(f"Failed initial request → skipping category: {e}")
-                continue
-
-            first_json = first_response.json()
-            total_products = first_json.get("count", 0)
-            total_pages = first_json.get("totalPages", 1)
-            logging.info(f"Found {total_products} products → {total_pages} pages")
-
-            self.process_pages(api, total_pages, cat)
+        with ThreadPoolExecutor(max_workers=CATEGORY_WORKERS) as executor:
+            for _ in executor.map(self.process_category, categories):
+                pass
 
         logging.info(f"Total Inserted: {self.inserted_count}")
         logging.info(f"Total Skipped (Duplicates): {self.skipped_count}")
 
-    def process_pages(self, api, total_pages, cat):
-        """Iterate through category pages and store product URLs"""
-        category_inserted = 0
-        category_skipped = 0
-
-        for page in range(0, total_pages + 1):
-            paginated_url = f"{api}&currentPage={page}"
-            try:
-                response = requests.get(paginated_url, headers=HEADERS)
-                response.raise_for_status()
-            except requests.RequestException:
-                logging.warning(f"Failed page {page} → skipping")
-                continue
-
-            data = response.json()
-            products = data.get("products", [])
-
+    def process_category(self, cat):
+        """Read the page count of one category, then crawl its pages"""
+        if not cat.filters:
+            return
+
+        filter_param = cat.filters.replace(":", "=").replace(" ", "&")
+        sort = cat.sort or "editorial_relevance"
+        api = f"{self.api_base}?{filter_param}&pageSize=30&searchType=editorial-search&sort={sort}&type=search-static"
+
+        logging.info(f"Processing category: {cat.category_path}")
+        logging.info(f"API: {api}")
+
+        try:
+            first_response = self.session.get(api, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            first_response.raise_for_status()
+        except requests.RequestException as e:
+            logging.warning(f"Failed initial request → skipping category: {e}")
+            return
+
+        first_json = first_response.json()
+        total_products = first_json.get("count", 0)
+        total_pages = first_json.get("totalPages", 1)
+        logging.info(f"Found {total_products} products → {total_pages} pages")
+
+        try:
+            self.process_pages(api, total_pages, cat, first_json)
+        except Exception as e:
+            logging.error(f"{cat.category_path}: failed → {e}")
+
+    def process_pages(self, api, total_pages, cat, first_json):
+        """Fetch category pages concurrently and store product URLs in bulk"""
+        # First response already holds page 0
+        futures = [
+            self.page_pool.submit(self.fetch_page, f"{api}&currentPage={page}", page)
+            for page in range(1, total_pages + 1)
+        ]
+        pages = [first_json.get("products", [])] + [future.result() for future in futures]
+
+        docs = {}
+        found = 0
+        for products in pages:
             for product in products:
                 gtin = product.get("gtin") or product.get("tileData", {}).get("gtin")
                 product_path = product.get("tileData", {}).get("self")
@@ -75,24 +89,54 @@ class Crawler:
                 if not (gtin and product_path):
                     continue
 
+                found += 1
                 product_url = self.base_url + product_path
                 product_doc = ProductUrlItem(
                     url=product_url,
                     gtin=int(gtin),
                     category_path=cat.category_path
                 )
+                docs[product_url] = product_doc.to_mongo().to_dict()
 
-                try:
-                    product_doc.save(force_insert=True)  # raises NotUniqueError if duplicate
-                    self.inserted_count += 1
-                    category_inserted += 1
-                except errors.NotUniqueError:
-                    self.skipped_count += 1
-                    category_skipped += 1
+        category_inserted = self.save_urls(list(docs.values()))
+        category_skipped = found - category_inserted
+
+        with self.count_lock:
+            self.inserted_count += category_inserted
+            self.skipped_count += category_skipped
 
         logging.info(f"{cat.category_path}: Inserted={category_inserted}, Skipped={category_skipped}")
 
+    def fetch_page(self, paginated_url, page):
+        """Return the products of one listing page"""
+        try:
+            response = self.session.get(paginated_url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException:
+            logging.warning(f"Failed page {page} → skipping")
+            return []
+
+        return response.json().get("products", [])
+
+    def save_urls(self, docs):
+        """Unordered bulk insert, returns the number of new URLs"""
+        if not docs:
+            return 0
+
+        try:
+            result = ProductUrlItem._get_collection().insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # duplicates are reported per document, the rest are still written
+            return e.details.get("nInserted", 0)
+
+    def close(self):
+        """Close function for all module object closing"""
+        self.page_pool.shutdown()
+        self.session.close()
+
 
 if __name__ == "__main__":
     crawler = Crawler()
     crawler.start()
+    crawler.close()
@@ -1,11 +1,16 @@
 import logging
 import re
+import threading
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from mongoengine import connect, errors
+from mongoengine import connect
 from items import ProductUrlItem, ProductDetailItem
-from settings import HEADERS, MONGO_DB
+from http_session import new_session
+from mongo_writer import BufferedMongoWriter
+from rate_limiter import RateLimiter
+from settings import HEADERS, MONGO_DB, REQUEST_TIMEOUT, PARSER_WORKERS, CURSOR_BATCH_SIZE, PROGRESS_EVERY
+from settings import RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_RETRIES, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL
 
 class Parser:
     """Parsing product details from DM Austria API using MongoEngine"""
@@ -14,35 +19,80 @@ class Parser:
         connect(db=MONGO_DB, alias="default", host="localhost", port=27017)
         self.api_base = "https://products.dm.de/product/products/detail/AT/gtin/"
 
+        # Keep-alive pool large enough for every in-flight request
+        self.session = new_session(pool_size=PARSER_WORKERS)
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
+
+        # Unordered bulk inserts; the unique_id index drops duplicate GTINs
+        self.writer = BufferedMongoWriter(ProductDetailItem._get_collection(), MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+
+        self.count_lock = threading.Lock()
+        self.done_count = 0
+        self.parsed_count = 0
+        self.failed_count = 0
+
     def start(self):
         """Start parsing process"""
-        products = ProductUrlItem.objects()  # Fetch all products from MongoDB
-        logging.info(f"Found {products.count()} products to process")
+        products = ProductUrlItem.objects(gtin__ne=None).only("gtin", "url").batch_size(CURSOR_BATCH_SIZE)
+        total = products.count()  # one round trip, not one per product
+        logging.info(f"Found {total} products to process")
 
-        for idx, prod in enumerate(products, start=1):
-            gtin = prod.gtin
-            url = prod.url
-            if not gtin:
-                continue
+        self.started = time.monotonic()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=PARSER_WORKERS) as executor:
+            for prod in products:
+                if not prod.gtin:
+                    continue
+                # Keep a bounded number of products queued
+                if len(in_flight) >= PARSER_WORKERS * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(self.process_product, prod.gtin, prod.url, total))
+            wait(in_flight)
 
-            result = self.fetch_product_detail(gtin, url)
-            if result:
-                try:
-                    product_item = ProductDetailItem(**result)
-                    product_item.save(force_insert=True)
-                    logging.info(f"Saved {gtin} ({idx}/{products.count()})")
-                except errors.NotUniqueError:
-                    logging.info(f"Skipped duplicate GTIN {gtin}")
+        self.writer.close()
+        self.session.close()
+        self.report(total)
+        logging.info("All products processed successfully.")
 
-            time.sleep(0.6)  # polite delay
+    def process_product(self, gtin, url, total):
+        """Fetch, parse and queue one GTIN"""
+        result = self.fetch_product_detail(gtin, url)
+        if result:
+            try:
+                product_item = ProductDetailItem(**result)
+                product_item.validate()
+                self.writer.add(product_item.to_mongo().to_dict())
+            except Exception as e:
+                logging.error(f"Invalid item for GTIN {gtin}: {e}")
+                result = None
 
-        logging.info("All products processed successfully.")
+        with self.count_lock:
+            self.done_count += 1
+            if result:
+                self.parsed_count += 1
+            else:
+                self.failed_count += 1
+            done = self.done_count
+        if done % PROGRESS_EVERY == 0:
+            self.report(total)
+
+    def report(self, total):
+        """Log progress and throughput of this run"""
+        elapsed = time.monotonic() - self.started
+        rate = self.done_count / elapsed if elapsed else 0.0
+        logging.info(
+            f"{self.done_count}/{total} products in {elapsed:.0f}s ({rate:.1f}/s): "
+            f"parsed {self.parsed_count}, failed {self.failed_count}, "
+            f"inserted {self.writer.inserted}, duplicates {self.writer.duplicates}"
+        )
 
     def fetch_product_detail(self, gtin, url):
         """Fetch product data from DM API"""
         api_url = f"{self.api_base}{gtin}"
         try:
-            r = requests.get(api_url, headers=HEADERS, timeout=15)
+            r = self.limiter.request(
+                self.session.get, api_url, RATE_LIMIT_RETRIES, headers=HEADERS, timeout=REQUEST_TIMEOUT
+            )
             if r.status_code == 200:
                 data = r.json()
                 return self.parse_item(data, gtin, url)
@@ -28,6 +28,31 @@ MONGO_COLLECTION_CATEGORY = "category_filters"
 MONGO_COLLECTION_URLS = "product_url"
 MONGO_COLLECTION_DATA = "product_details"
 
+# -------------------------------------------------
+# CRAWLER CONCURRENCY
+# -------------------------------------------------
+CATEGORY_WORKERS = 4    # categories crawled in parallel
+PAGE_WORKERS = 8        # page requests in flight across all categories
+REQUEST_TIMEOUT = 30
+
+# -------------------------------------------------
+# PARSER (GTIN DETAIL API)
+# -------------------------------------------------
+PARSER_WORKERS = 16         # GTIN requests in flight
+CURSOR_BATCH_SIZE = 1000    # product urls per Mongo round trip
+PROGRESS_EVERY = 1000       # products between throughput log lines
+
+# Per-host rate limit shared by the workers; adapts between min and max
+# from response latency and 429/403/5xx answers
+RATE_LIMIT_START = 2        # req/s to begin with (the old 0.6s sleep)
+RATE_LIMIT_MIN = 0.5
+RATE_LIMIT_MAX = 25
+RATE_LIMIT_RETRIES = 2      # retries of a throttled request
+
+# Detail inserts are buffered and written unordered, duplicates skipped
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5    # seconds
+
 # -------------------------------------------------
 # HEADERS FOR  CATEGORY API EXTRACTION
 # -------------------------------------------------
@@ -1,50 +1,119 @@
-import requests
-import unicodedata
+import json
+import os
 import re
-import time
-import random
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from mongoengine import connect
 from items import ProductCategoryItem, ProductItem
+from http_session import new_session
+from rate_limiter import RateLimiter
 from settings import MONGO_URI, MONGO_DB, CRAWLER_HEADERS, logging
+from settings import RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_THROTTLE_STATUSES
+from settings import CRAWLER_WORKERS, MONGO_BATCH_SIZE, ITEMS_PER_PAGE_CANDIDATES, LEAF_CACHE_FILE
+from settings import ITEMS_PER_PAGE_BASELINE, PROBE_MAX_CATEGORIES
+
+PRODUCTS_API = "https://auchan.hu/api/v2/cache/products?page={page}&itemsPerPage={per_page}&categoryId={cat_id}&cacheSegmentationCode=&hl=hu"
 
 class AuchanCrawler:
     """Crawler for Auchan products using leaf category IDs"""
 
     def __init__(self):
         connect(db=MONGO_DB, host=MONGO_URI)
+        self.limiter = RateLimiter(
+            RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, throttle_statuses=RATE_LIMIT_THROTTLE_STATUSES
+        )
+        # Keep-alive pool large enough for every in-flight request
+        self.session = new_session(pool_size=CRAWLER_WORKERS)
+
+        # Product upserts are queued and written with bulk_write
+        self.collection = ProductItem._get_collection()
+        self.ops = []
+        self.upserted = 0
+        self.modified = 0
 
     def start(self):
         """Fetch all leaf category IDs and crawl them"""
         leaf_ids = self.get_leaf_category_ids()
         logging.info(f"Total leaf categories to crawl: {len(leaf_ids)}")
+        if not leaf_ids:
+            return
 
-        for cat_id in leaf_ids:
-            page = 1
-            while True:
-                api_url = f"https://auchan.hu/api/v2/cache/products?page={page}&itemsPerPage=8&categoryId={cat_id}&cacheSegmentationCode=&hl=hu"
-                try:
-                    response = requests.get(api_url, headers=CRAWLER_HEADERS)
-                    logging.info(f"Requesting {api_url} → Status Code: {response.status_code}")
-                    if response.status_code != 200:
-                        break
-
-                    data = response.json()
-                    self.parse_item(data)
-
-                    # Stop if no more pages
-                    page_count = data.get("pageCount", 1)
-                    if page >= page_count:
-                        break
+        per_page = self.probe_items_per_page(leaf_ids)
+        logging.info(f"Crawling with itemsPerPage={per_page}")
 
-                    page += 1
-                    time.sleep(random.uniform(1.5, 3.5))
+        with ThreadPoolExecutor(max_workers=CRAWLER_WORKERS) as executor:
+            # Page 1 of every leaf first; its pageCount fans out the remaining pages
+            first_pages = {
+                executor.submit(self.fetch_page, cat_id, 1, per_page): cat_id
+                for cat_id in leaf_ids
+            }
+            next_pages = []
+            for future in as_completed(first_pages):
+                data = future.result()
+                if data is None:
+                    continue
+                self.parse_item(data)
+
+                cat_id = first_pages[future]
+                next_pages += [
+                    executor.submit(self.fetch_page, cat_id, page, per_page)
+                    for page in range(2, data.get("pageCount", 1) + 1)
+                ]
+
+            for future in as_completed(next_pages):
+                data = future.result()
+                if data is not None:
+                    self.parse_item(data)
 
-                except Exception as e:
-                    logging.error(f"Error while crawling category {cat_id}, page {page}: {e}")
-                    break
+        self.flush()
+
+    def fetch_page(self, cat_id, page, per_page):
+        """JSON of one listing page, None if it failed"""
+        api_url = PRODUCTS_API.format(page=page, per_page=per_page, cat_id=cat_id)
+        try:
+            response = self.limiter.request(self.session.get, api_url, headers=CRAWLER_HEADERS, timeout=30)
+            logging.info(f"Requesting {api_url} → Status Code: {response.status_code}")
+            if response.status_code != 200:
+                return None
+            return response.json()
+        except Exception as e:
+            logging.error(f"Error while crawling category {cat_id}, page {page}: {e}")
+            return None
+
+    def probe_items_per_page(self, leaf_ids):
+        """Largest itemsPerPage the API serves in full, else the baseline
+
+        Only a category with more products than the largest candidate can
+        show a cap, so one is looked for first with baseline-sized pages.
+        A candidate counts only if its first page comes back full.
+        """
+        largest = max(ITEMS_PER_PAGE_CANDIDATES)
+        probe_id = None
+        for cat_id in leaf_ids[:PROBE_MAX_CATEGORIES]:
+            data = self.fetch_page(cat_id, 1, ITEMS_PER_PAGE_BASELINE)
+            # pageCount - 1 full pages before the last one
+            if data and (data.get("pageCount", 1) - 1) * ITEMS_PER_PAGE_BASELINE >= largest:
+                probe_id = cat_id
+                break
+        if probe_id is None:
+            logging.warning(f"No category with more than {largest} products to probe, keeping itemsPerPage={ITEMS_PER_PAGE_BASELINE}")
+            return ITEMS_PER_PAGE_BASELINE
+
+        for per_page in ITEMS_PER_PAGE_CANDIDATES:
+            data = self.fetch_page(probe_id, 1, per_page)
+            if data and len(data.get("results", [])) == per_page:
+                return per_page
+        return ITEMS_PER_PAGE_BASELINE
 
     def get_leaf_category_ids(self):
-        """Traverse ProductCategoryItem tree and return all leaf category IDs"""
+        """Leaf category IDs of this iteration; the category tree is walked once"""
+        if os.path.exists(LEAF_CACHE_FILE):
+            with open(LEAF_CACHE_FILE) as f:
+                logging.info(f"Leaf categories from {LEAF_CACHE_FILE}")
+                return json.load(f)
+
         leaf_ids = []
 
         def traverse(node):
@@ -57,6 +126,11 @@ class AuchanCrawler:
         for top_cat in ProductCategoryItem.objects():
             traverse(top_cat)
 
+        # A leaf listed under several parents is crawled once
+        leaf_ids = list(dict.fromkeys(leaf_ids))
+        os.makedirs(os.path.dirname(LEAF_CACHE_FILE), exist_ok=True)
+        with open(LEAF_CACHE_FILE, "w") as f:
+            json.dump(leaf_ids, f)
         return leaf_ids
 
     def parse_item(self, data):
@@ -96,36 +170,36 @@ class AuchanCrawler:
             }
 
             try:
-                ProductItem.objects(product_url=product_url).update_one(
-                    set__title=product_data["title"],
-                    set__brand=product_data["brand"],
-                    set__breadcrumbs=product_data["breadcrumbs"],
-                    set__images=product_data["images"],
-                    set__grammage_quantity=product_data["grammage_quantity"],
-                    set__grammage_unit=product_data["grammage_unit"],
-                    set__regular_price=product_data["regular_price"],
-                    set__discounted_price=product_data["discounted_price"],
-                    set__discount=product_data["discount"],
-                    set__currency=product_data["currency"],
-                    set__sku=product_data["sku"],
-                    set__product_id=product_data["product_id"],
-                    set__selectvalue=product_data["selectvalue"],
-                    set__details=product_data["details"],
-                    set__rating=product_data["rating"],
-                    set__review=product_data["review"],
-                    set__availability=product_data["availability"],
-                    set__flags=product_data["flags"],
-                    set__offer_type=product_data["offer_type"],
-                    set__discoutvalidfrom=product_data["discoutvalidfrom"],
-                    set__discoutvalidto=product_data["discoutvalidto"],
-                    upsert=True,
-                )
-                logging.info(f"Saved/Updated product: {name} → {product_url}")
+                # None values are $set too, as update_one(set__...) did
+                fields = dict.fromkeys(product_data)
+                fields.update(ProductItem(**product_data).to_mongo().to_dict())
+                self.ops.append(UpdateOne({"product_url": product_url}, {"$set": fields}, upsert=True))
             except Exception as e:
                 logging.error(f"Failed to save product {name}: {e}")
 
+        if len(self.ops) >= MONGO_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write queued product upserts in one unordered bulk_write"""
+        ops, self.ops = self.ops, []
+        if not ops:
+            return
+        try:
+            result = self.collection.bulk_write(ops, ordered=False)
+            self.upserted += result.upserted_count
+            self.modified += result.modified_count
+        except BulkWriteError as e:
+            details = e.details
+            self.upserted += details.get("nUpserted", 0)
+            self.modified += details.get("nModified", 0)
+            logging.error(f"{len(details.get('writeErrors', []))} of {len(ops)} product upserts failed")
+        logging.info(f"Saved/Updated {len(ops)} products")
+
     def close(self):
-        logging.info("Crawler finished.")
+        self.flush()
+        self.session.close()
+        logging.info(f"Crawler finished: {self.upserted} new products, {self.modified} updated")
 
 
 if __name__ == "__main__":
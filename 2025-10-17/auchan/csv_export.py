@@ -0,0 +1,16 @@
+import gzip
+import io
+
+
+def open_export(file_name, gzip_output=False, buffer_size=1024 * 1024):
+    """Text handle for a CSV export, written through a large buffer
+
+    With gzip_output the rows go to file_name + ".gz"; a low compression
+    level keeps the export bound by disk throughput, not by zlib.
+    """
+    if gzip_output:
+        raw = gzip.open(f"{file_name}.gz", "wb", compresslevel=3)
+        return io.TextIOWrapper(
+            io.BufferedWriter(raw, buffer_size), encoding="utf-8", newline=""
+        )
+    return open(file_name, "w", encoding="utf-8", newline="", buffering=buffer_size)
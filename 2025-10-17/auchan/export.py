@@ -2,14 +2,46 @@ import csv
 import re
 from pymongo import MongoClient
 from datetime import datetime
+from csv_export import open_export
 from settings import (
     MONGO_DB,
     MONGO_COLLECTION_DATA,
     FILE_HEADERS,
     FILE_NAME,
+    EXPORT_BATCH_SIZE,
+    EXPORT_BUFFER_SIZE,
+    EXPORT_GZIP,
     logging
 )
 
+TAG_RE = re.compile(r"<.*?>")
+
+# Only the fields the rows are built from
+EXPORT_FIELDS = [
+    "sku", "title", "brand", "grammage_quantity", "grammage_unit", "regular_price",
+    "discounted_price", "discount", "currency", "product_url", "breadcrumbs", "allergens",
+    "description", "ingredients", "availability", "offer_type", "flags", "discoutvalidfrom",
+    "discoutvalidto", "parameters", "nutrition", "images",
+]
+
+
+# === CLEANING HELPERS ===
+def clean_text(value):
+    """Normalize string fields"""
+    if isinstance(value, list):
+        return "; ".join([str(v).strip() for v in value if v])
+    if isinstance(value, dict):
+        return "; ".join([f"{k}: {v}" for k, v in value.items()])
+    return str(value).replace("\n", " ").replace("\r", " ").strip() if value else ""
+
+
+def format_price(value):
+    """Format numeric values"""
+    try:
+        return f"{float(value):.2f}"
+    except (TypeError, ValueError):
+        return ""
+
 
 class Export:
     """Export MongoDB collection to CSV with cleaning and normalization"""
@@ -24,26 +56,13 @@ class Export:
         self.writer.writerow(FILE_HEADERS)
         logging.info("File headers written successfully.")
 
-        cursor = self.mongo[MONGO_COLLECTION_DATA].find(no_cursor_timeout=True)
+        extraction_date = datetime.now().strftime("%Y-%m-%d")
+        cursor = self.mongo[MONGO_COLLECTION_DATA].find(
+            {}, EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE, no_cursor_timeout=True
+        )
 
         for item in cursor:
             try:
-                # === CLEANING HELPERS ===
-                def clean_text(value):
-                    """Normalize string fields"""
-                    if isinstance(value, list):
-                        return "; ".join([str(v).strip() for v in value if v])
-                    if isinstance(value, dict):
-                        return "; ".join([f"{k}: {v}" for k, v in value.items()])
-                    return str(value).replace("\n", " ").replace("\r", " ").strip() if value else ""
-
-                def format_price(value):
-                    """Format numeric values"""
-                    try:
-                        return f"{float(value):.2f}"
-                    except (TypeError, ValueError):
-                        return ""
-
                 # === BASIC FIELDS ===
                 unique_id = str(item.get("sku"))
                 competitor_name = "auchan"
@@ -124,7 +143,7 @@ class Export:
                     "store_state": "",
                     "store_postcode": "",
                     "store_addressid": "",
-                    "extraction_date": datetime.now().strftime("%Y-%m-%d"),
+                    "extraction_date": extraction_date,
                     "product_name": product_name,
                     "brand": brand,
                     "brand_type": "",
@@ -203,7 +222,7 @@ class Export:
                     "heel_type": "",
                     "heel_height": "",
                     "upc": "",
-                    "features": re.sub(r"<.*?>", "", all_parameters_str).strip(),
+                    "features": TAG_RE.sub("", all_parameters_str).strip(),
                     "dietary_lifestyle": "",
                     "manufacturer_address": manufacturer_address,
                     "importer_address": "",
@@ -216,7 +235,7 @@ class Export:
                     "netcontent": "",
                     "netweight": "",
                     "site_shown_uom": product_name,
-                    "ingredients": re.sub(r"<.*?>", "", ingredients).strip(),
+                    "ingredients": TAG_RE.sub("", ingredients).strip(),
                     "random_weight_flag": "",
                     "instock": True if availability.lower() == "available" else False,
                     "promo_limit": "",
@@ -248,7 +267,7 @@ if __name__ == "__main__":
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    with open(FILE_NAME, "w", encoding="utf-8", newline="") as file:
+    with open_export(FILE_NAME, EXPORT_GZIP, EXPORT_BUFFER_SIZE) as file:
         writer_file = csv.writer(file, delimiter="|", quotechar='"')
         export = Export(writer_file)
         export.start()
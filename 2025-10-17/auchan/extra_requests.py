@@ -1,10 +1,16 @@
-import time
-import random
 import logging
 import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from mongoengine import connect
 from items import ProductItem
-from settings import MONGO_URI, MONGO_DB, CRAWLER_HEADERS
+from http_session import new_session
+from rate_limiter import RateLimiter
+from settings import MONGO_URI, MONGO_DB, CRAWLER_HEADERS, MONGO_BATCH_SIZE
+from settings import RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_THROTTLE_STATUSES
+from settings import ENRICH_WORKERS, ENRICH_PRODUCTS_IN_FLIGHT, DETAIL_CACHE_SIZE
 
 # Connect to MongoDB
 connect(db=MONGO_DB, host=MONGO_URI)
@@ -22,59 +28,133 @@ DETAIL_URLS = {
 
 MAX_RETRIES = 3
 
+# Shared pacing for every detail request; backs off on 401/429 and slow answers
+limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, throttle_statuses=RATE_LIMIT_THROTTLE_STATUSES)
+
+# Keep-alive pool large enough for every in-flight request
+session = new_session(pool_size=ENRICH_WORKERS)
+
 def fetch_detail(url):
-    """Fetch detail JSON with retries and random delay"""
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            response = requests.get(url, headers=CRAWLER_HEADERS, timeout=15)
-            logging.info(f"Requesting: {url} → Status Code: {response.status_code}")
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 401:
-                logging.warning(f"401 Unauthorized for URL {url}, attempt {attempt}/{MAX_RETRIES}")
-                time.sleep(random.uniform(3, 6))  # delay before retry
-            else:
-                logging.warning(f"{response.status_code} for URL {url}")
-                return None
-        except requests.RequestException as e:
-            logging.error(f"Request failed for URL {url}: {e}")
-            time.sleep(random.uniform(1, 3))
-    logging.error(f"Failed after {MAX_RETRIES} retries for URL {url}")
+    """Fetch detail JSON; throttled answers are retried by the limiter"""
+    try:
+        response = limiter.request(session.get, url, MAX_RETRIES - 1, headers=CRAWLER_HEADERS, timeout=15)
+    except requests.RequestException as e:
+        logging.error(f"Failed after {MAX_RETRIES} attempts for URL {url}: {e}")
+        return None
+    logging.info(f"Requesting: {url} → Status Code: {response.status_code}")
+    if response.status_code == 200:
+        return response.json()
+    logging.warning(f"{response.status_code} for URL {url}")
     return None
 
+class DetailFetcher:
+    """Detail requests on a thread pool, one request per distinct url
+
+    Variants shared by several products answer the same detail urls, so the
+    futures of the last cache_size urls are kept and handed out again.
+    """
+
+    def __init__(self, workers, cache_size):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.cache_size = cache_size
+        self.futures = OrderedDict()
+        self.requested = 0
+        self.reused = 0
+
+    def get(self, url):
+        """Future of the detail JSON for url"""
+        future = self.futures.get(url)
+        if future is not None:
+            self.futures.move_to_end(url)
+            self.reused += 1
+            return future
+
+        future = self.futures[url] = self.pool.submit(fetch_detail, url)
+        self.requested += 1
+        if len(self.futures) > self.cache_size:
+            self.futures.popitem(last=False)
+        return future
+
+    def close(self):
+        self.pool.shutdown()
+        logging.info(f"Detail requests: {self.requested} sent, {self.reused} reused")
+
+def detail_fields(detail, data):
+    """Product fields of one detail answer"""
+    if detail == "description":
+        return {"description": data.get("description", "")}
+    elif detail == "parameterList":
+        return {"parameters": data.get("parameters", [])}
+    elif detail == "ingredients":
+        return {"ingredients": data.get("description", "")}
+    elif detail == "nutrition":
+        return {"nutrition": data.get("nutritions", {}).get("data", [])}
+    elif detail == "allergens":
+        allergens = data.get("allergensDetailed", [])
+        return {"allergens": ",".join([a.get("name", "") for a in allergens if "name" in a])}
+    return {}
+
+def product_update(product, pending):
+    """Wait for one product's detail calls and build its update, None if nothing came back"""
+    updated_fields = {}
+    for detail, future in pending:
+        try:
+            data = future.result()
+        except Exception as e:
+            logging.error(f"{detail} of {product.title} failed: {e}")
+            continue
+        if data:
+            updated_fields.update(detail_fields(detail, data))
+
+    if not updated_fields:
+        return None
+    logging.info(f"Updated product: {product.title}")
+    return UpdateOne({"_id": product.id}, {"$set": updated_fields})
+
+def write_updates(collection, ops):
+    """Apply queued product updates in one unordered bulk_write"""
+    if not ops:
+        return
+    try:
+        collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        logging.error(f"{len(e.details.get('writeErrors', []))} of {len(ops)} product updates failed")
+
 def main():
-    products = ProductItem.objects()  # Fetch all products saved by crawler
+    # Fetch all products saved by crawler, only the fields the detail urls need
+    products = ProductItem.objects.only("id", "title", "product_id", "selectvalue", "details").no_cache()
     logging.info(f"Total products to parse: {products.count()}")
 
+    collection = ProductItem._get_collection()
+    fetcher = DetailFetcher(ENRICH_WORKERS, DETAIL_CACHE_SIZE)
+    in_flight = deque()
+    ops = []
+
+    def collect_oldest():
+        op = product_update(*in_flight.popleft())
+        if op:
+            ops.append(op)
+        if len(ops) >= MONGO_BATCH_SIZE:
+            write_updates(collection, ops)
+            ops.clear()
+
     for p in products:
-        updated_fields = {}
-        for detail in p.details or []:
-            if detail not in DETAIL_URLS:
-                continue
-
-            url = DETAIL_URLS[detail].format(product_id=p.product_id, selectvalue=p.selectvalue)
-            data = fetch_detail(url)
-            if not data:
-                continue
-
-            # Update fields based on detail type
-            if detail == "description":
-                updated_fields["description"] = data.get("description", "")
-            elif detail == "parameterList":
-                updated_fields["parameters"] = data.get("parameters", [])
-            elif detail == "ingredients":
-                updated_fields["ingredients"] = data.get("description", "")
-            elif detail == "nutrition":
-                updated_fields["nutrition"] = data.get("nutritions", {}).get("data", [])
-            elif detail == "allergens":
-                allergens = data.get("allergensDetailed", [])
-                updated_fields["allergens"] = ",".join([a.get("name", "") for a in allergens if "name" in a])
-
-            time.sleep(random.uniform(0.5, 1.5))  # polite delay between requests
-
-        if updated_fields:
-            ProductItem.objects(id=p.id).update_one(**{f"set__{k}": v for k, v in updated_fields.items()})
-            logging.info(f"Updated product: {p.title}")
+        # Every detail call of a product goes out at once
+        pending = [
+            (detail, fetcher.get(DETAIL_URLS[detail].format(product_id=p.product_id, selectvalue=p.selectvalue)))
+            for detail in p.details or []
+            if detail in DETAIL_URLS
+        ]
+        in_flight.append((p, pending))
+
+        # Keep a bounded number of products queued
+        if len(in_flight) >= ENRICH_PRODUCTS_IN_FLIGHT:
+            collect_oldest()
+
+    while in_flight:
+        collect_oldest()
+    write_updates(collection, ops)
+    fetcher.close()
 
 if __name__ == "__main__":
     main()
@@ -31,6 +31,11 @@ WEEK = (int(DAY) - 1) // 7 + 1
 
 FILE_NAME = f"{PROJECT}_{iteration}.csv"
 
+# CSV export
+EXPORT_BATCH_SIZE = 5000               # documents per cursor round trip
+EXPORT_BUFFER_SIZE = 1024 * 1024       # bytes buffered before each disk write
+EXPORT_GZIP = False                    # write FILE_NAME.gz instead of plain csv
+
 # ==========================
 # MongoDB Configuration
 # ==========================
@@ -39,6 +44,35 @@ MONGO_DB = "Auchan"
 MONGO_COLLECTION_CATEGORY = f"{PROJECT_NAME}_categories"
 MONGO_COLLECTION_DATA = f"{PROJECT_NAME}_products"
 
+# ==========================
+# Rate Limiting
+# ==========================
+# Per-host limit; adapts between min and max from response latency and
+# throttle answers (auchan.hu answers bursts with 401)
+RATE_LIMIT_START = 0.5     # req/s per host to begin with
+RATE_LIMIT_MIN = 0.1
+RATE_LIMIT_MAX = 5
+RATE_LIMIT_THROTTLE_STATUSES = (401, 403, 429, 503)
+
+# ==========================
+# Crawler
+# ==========================
+CRAWLER_WORKERS = 8        # listing pages in flight
+MONGO_BATCH_SIZE = 500     # product upserts per bulk_write
+# itemsPerPage values tried largest first; the first one served in full is used
+ITEMS_PER_PAGE_CANDIDATES = (100, 60, 48, 32, 24, 16, 8)
+ITEMS_PER_PAGE_BASELINE = 8      # the site's own page size, kept when no candidate is proven
+PROBE_MAX_CATEGORIES = 20        # leaves tried while looking for one big enough to probe with
+# Leaf category ids of this iteration, so reruns skip the tree walk
+LEAF_CACHE_FILE = f"leaf_cache/leaf_ids_{iteration}.json"
+
+# ==========================
+# Detail Enrichment
+# ==========================
+ENRICH_WORKERS = 16                # detail requests in flight
+ENRICH_PRODUCTS_IN_FLIGHT = 200    # products queued ahead of the update writer
+DETAIL_CACHE_SIZE = 20000          # recent detail urls whose answer is reused
+
 # ==========================
 # Headers for Requests
 # ==========================
@@ -0,0 +1,65 @@
+import logging
+import threading
+import time
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class BufferedMongoWriter:
+    """Buffer items and write them with unordered insert_many"""
+
+    def __init__(self, collection, batch_size=500, flush_interval=5):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+
+    def add(self, item):
+        """Queue one item, flushing on size or time threshold"""
+        with self.lock:
+            self.buffer.append(item)
+            due = (
+                len(self.buffer) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far"""
+        with self.lock:
+            docs, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+            if not docs:
+                return
+
+            try:
+                result = self.collection.insert_many(docs, ordered=False)
+                self.inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                # ordered=False keeps going past bad docs, so only these are lost
+                details = e.details
+                self.inserted += details.get("nInserted", 0)
+                for error in details.get("writeErrors", []):
+                    if error.get("code") == DUPLICATE_KEY_ERROR:
+                        self.duplicates += 1
+                    else:
+                        self.failed += 1
+                        logging.error(f"Mongo insert failed: {error.get('errmsg')}")
+            except Exception as e:
+                self.failed += len(docs)
+                logging.error(f"Mongo batch of {len(docs)} failed: {repr(e)}")
+
+    def close(self):
+        """Flush remaining items and log totals"""
+        self.flush()
+        logging.info(
+            f"{self.collection.name}: inserted {self.inserted}, "
+            f"duplicates {self.duplicates}, failed {self.failed}"
+        )
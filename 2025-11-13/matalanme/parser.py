@@ -5,8 +5,9 @@ import time
 import requests
 from parsel import Selector
 from mongoengine import connect
-from settings import MONGO_DB, BASE_URL, PARSER_API_URL, PARSER_HEADERS, PARSER_QUERY
+from settings import MONGO_DB, BASE_URL, PARSER_API_URL, PARSER_HEADERS, PARSER_QUERY, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL
 from items import ProductItem, ProductDetailItem, ProductFailedItem
+from mongo_writer import BufferedMongoWriter
 
 
 class Parser:
@@ -14,6 +15,7 @@ class Parser:
     
     def __init__(self):
         self.mongo = connect(db=MONGO_DB, alias="default", host="localhost", port=27017)
+        self.writer = BufferedMongoWriter(ProductDetailItem._get_collection(), MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
     
     def start(self):
         """Requesting Start url"""
@@ -101,7 +103,8 @@ class Parser:
                     logging.info(item)
                     try:
                         detail_item = ProductDetailItem(**item)
-                        detail_item.save()
+                        detail_item.validate()
+                        self.writer.add(detail_item.to_mongo().to_dict())
                     except Exception as e:
                         logging.warning(f"Mongo insert failed: {e}")
                     
@@ -145,6 +148,7 @@ class Parser:
     def close(self):
         """Close function for all module object closing"""
         logging.info("Product detail crawling completed.")
+        self.writer.close()
         self.mongo.close()
         
 
@@ -34,6 +34,10 @@ MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_PLP = f"{PROJECT_NAME}_products"
 MONGO_COLLECTION_PDP = f"{PROJECT_NAME}_products_detailed"
 
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
 
 HEADERS = {
     'accept': '*/*',
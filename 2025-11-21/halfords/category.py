@@ -1,13 +1,14 @@
-import requests
 from mongoengine import connect
+from http_session import new_session
 from parsel import Selector
 from items import ProductCategoryItem
-from settings import logging, MONGO_DB, MONGO_HOST, MONGO_PORT
+from settings import logging, MONGO_DB, MONGO_HOST, MONGO_PORT, HTTP_POOL_SIZE, IMPERSONATE
 
 class Crawler:
     """Crawling Urls"""
     def __init__(self):
         self.mongo = connect(db=MONGO_DB, host=MONGO_HOST, alias="default", port=MONGO_PORT)
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
     
     def start(self):
         """Requesting Start url"""
@@ -17,7 +18,7 @@ class Crawler:
         meta['url'] = url
         
         try:
-            response = requests.get(url)
+            response = self.session.get(url)
             if response.status_code == 200:
                 self.parse_item(response, meta)
             else:
@@ -97,6 +98,7 @@ class Crawler:
     
     def close(self):
         """Close function for all module object closing"""
+        self.session.close()
         self.mongo.close()
         
 
@@ -1,178 +1,243 @@
-import requests
+import queue
+import threading
+import time
+from urllib.parse import urlparse
 from parsel import Selector
 from mongoengine import connect
+from http_session import new_session
 from items import ProductCategoryItem, ProductUrlItem
-from settings import logging, MONGO_DB, MONGO_HOST, MONGO_PORT, REQUEST_TIMEOUT
+from mongo_writer import BufferedMongoWriter
+from settings import (
+    logging,
+    MONGO_DB,
+    MONGO_HOST,
+    MONGO_PORT,
+    HTTP_POOL_SIZE,
+    IMPERSONATE,
+    REQUEST_TIMEOUT,
+    MONGO_BATCH_SIZE,
+    MONGO_FLUSH_INTERVAL,
+    CRAWLER_WORKERS,
+    CRAWLER_MAX_PER_HOST,
+    CRAWLER_DELAY,
+)
+
+# XPATH
+DEEPER_SUBCAT_XPATH = "//li[@class='border-bottom border-gray-200']/a/@href"
+PRODUCT_XPATH = "//a[@data-action-name='plp.product.click']/@href"
+LOADMORE_XPATH = "//a[@data-cmp-id='loadMore']/@href"
 
 
 class Crawler:
     """Crawling Urls"""
     def __init__(self):
         self.mongo = connect(db=MONGO_DB, host=MONGO_HOST, alias="default", port=MONGO_PORT)
-        
+        self.local = threading.local()
+        self.sessions_lock = threading.Lock()
+        self.sessions = []
+        self.writer = BufferedMongoWriter(ProductUrlItem._get_collection(), MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+
+        # Frontier of categories still to crawl
+        self.frontier = queue.Queue()
+
+        # Per-host politeness
+        self.host_lock = threading.Lock()
+        self.host_slots = {}
+        self.host_next_at = {}
+
+        # Product URLs already queued for saving this run
+        self.seen_lock = threading.Lock()
+        self.seen_urls = set()
+
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+
     def start(self):
         """Requesting Start url"""
-        
+
         category_doc = ProductCategoryItem.objects.first()
-        if category_doc:
-                categories=category_doc.categories
-        
+        categories = category_doc.categories if category_doc else {}
+
         if not categories:
             logging.error("No categories found in database")
             return
-        
-        # Iterate through category tree
+
+        # Seed the frontier with every sub-sub-category
         for cat, cat_data in categories.items():
             for sub, sub_data in cat_data.get("subcategories", {}).items():
                 for subsub, subsub_data in sub_data.get("sub_subcategories", {}).items():
-                    url = subsub_data["url"]
-                    
                     meta = {}
                     meta['category'] = cat
                     meta['subcategory'] = sub
                     meta['sub_subcategory'] = subsub
-                    meta['url'] = url
-                    
-                    logging.info(f"Processing: {cat} > {sub} > {subsub}")
-                    
-                    try:
-                        response = requests.get(url,timeout=REQUEST_TIMEOUT)
-                        if response.status_code == 200:
-                            self.parse_item(response, meta)
-                        else:
-                            logging.warning(f"Status code {response.status_code} for {url}")
-                    except Exception as e:
-                        logging.error(f"Error fetching {url}: {str(e)}")
-    
-    
-    def parse_item(self, response, meta):
+                    meta['path'] = f"{cat} > {sub} > {subsub}"
+                    meta['url'] = subsub_data["url"]
+                    meta['leaf'] = False
+                    self.frontier.put(meta)
+
+        logging.info(f"Frontier seeded with {self.frontier.qsize()} categories")
+
+        workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(CRAWLER_WORKERS)]
+        for worker in workers:
+            worker.start()
+
+        self.frontier.join()
+        for _ in workers:
+            self.frontier.put(None)
+        for worker in workers:
+            worker.join()
+
+        total_pages = sum(stat["pages"] for stat in self.stats.values())
+        logging.info(
+            f"Crawl finished: {len(self.stats)} listings, {total_pages} pages, "
+            f"{len(self.seen_urls)} unique product urls"
+        )
+
+    def worker(self):
+        """Take categories off the frontier until told to stop"""
+        while True:
+            meta = self.frontier.get()
+            if meta is None:
+                self.frontier.task_done()
+                return
+            try:
+                self.crawl_category(meta)
+            except Exception as e:
+                logging.error(f"Error crawling {meta['path']}: {str(e)}")
+            finally:
+                self.frontier.task_done()
+
+    def crawl_category(self, meta):
+        """Expand a category into deeper listings or walk its pagination"""
+        response = self.fetch(meta['url'])
+        if response is None:
+            return
+
+        if not meta['leaf']:
+            sel = Selector(response.text)
+            more_subcats = sel.xpath(DEEPER_SUBCAT_XPATH).getall()
+
+            # CHECK DEEPER SUB-CATEGORIES
+            if more_subcats:
+                logging.info(f"Found {len(more_subcats)} deeper categories in {meta['path']}")
+                for link in more_subcats:
+                    child_url = f"https://www.halfords.com{link}" if link.startswith("/") else link
+                    child = dict(meta)
+                    child['path'] = f"{meta['path']} > {child_url.rstrip('/').split('/')[-1]}"
+                    child['url'] = child_url
+                    child['leaf'] = True
+                    self.frontier.put(child)
+                return
+
+        # NO DEEPER CATEGORIES → DIRECT PAGINATION
+        self.crawl_pagination(meta, response)
+
+    def crawl_pagination(self, meta, response):
+        """Follow the "load more" chain of one listing"""
+        started = time.monotonic()
+        stat = {"pages": 0, "products": 0, "new": 0, "seconds": 0}
+
+        while response is not None:
+            stat["pages"] += 1
+            next_page = self.parse_item(response, meta, stat)
+            if not next_page:
+                break
+
+            page_url = next_page if next_page.startswith("http") else f"https://www.halfords.com{next_page}"
+            logging.info(f"[{meta['path']}] Load More found → Page {stat['pages']}: {page_url}")
+            response = self.fetch(page_url)
+
+        stat["seconds"] = round(time.monotonic() - started, 1)
+        with self.stats_lock:
+            self.stats[meta['url']] = stat
+        logging.info(
+            f"[{meta['path']}] Pagination completed: {stat['pages']} pages, "
+            f"{stat['products']} products ({stat['new']} new) in {stat['seconds']}s"
+        )
+
+    def parse_item(self, response, meta, stat):
         """item part"""
         sel = Selector(response.text)
-        
-        # XPATH
-        DEEPER_SUBCAT_XPATH = "//li[@class='border-bottom border-gray-200']/a/@href"
-        PRODUCT_XPATH = "//a[@data-action-name='plp.product.click']/@href"
-        LOADMORE_XPATH = "//a[@data-cmp-id='loadMore']/@href"
-        
+
         # EXTRACT
-        more_subcats = sel.xpath(DEEPER_SUBCAT_XPATH).getall()
-        
-        full_product_links = []
-
-        # CHECK DEEPER SUB-CATEGORIES
-        if more_subcats:
-            logging.info(f"Found {len(more_subcats)} deeper categories")
-            more_subcats = [
-                f"https://www.halfords.com{link}" if link.startswith("/") else link
-                for link in more_subcats
-            ]
-            
-            for child_url in more_subcats:
-                logging.info(f"Visiting deeper: {child_url}")
-
-                page_url = child_url   # IMPORTANT FIX
-
-                while True:
-                    try:
-                        child_response = requests.get(page_url,timeout=REQUEST_TIMEOUT)
-                        if child_response.status_code == 200:
-
-                            child_sel = Selector(child_response.text)
-                            product_links = child_sel.xpath(PRODUCT_XPATH).getall()
-                            
-                            if product_links:
-                                logging.info(f"Found {len(product_links)} products on this page")
-                                full_product_links.extend(product_links)
-                            else:
-                                logging.info("No products found on this page")
-                                break
-
-                            # PAGINATION
-                            next_page = child_sel.xpath(LOADMORE_XPATH).get()
-                            
-                            if next_page:
-                                page_url = (
-                                    next_page if next_page.startswith("http")
-                                    else f"https://www.halfords.com{next_page}"
-                                )
-                                logging.info(f"Load More found → Next page: {page_url}")
-                            else:
-                                logging.info("Pagination completed")
-                                break
-
-                        else:
-                            logging.warning(f"Status code {child_response.status_code}")
-                            break
-                            
-                    except Exception as e:
-                        logging.error(f"Error: {str(e)}")
-                        break
-
-        else:
-            # NO DEEPER CATEGORIES → DIRECT PAGINATION
-            logging.info("No deeper categories → Using pagination directly")
-            
-            page_url = meta['url']
-            meta['page'] = 0
-            
-            while True:
-                try:
-                    response = requests.get(page_url,timeout=REQUEST_TIMEOUT)
-                    if response.status_code == 200:
-                        sel = Selector(response.text)
-
-                        # Extract product links
-                        product_links = sel.xpath(PRODUCT_XPATH).getall()
-                        if product_links:
-                            logging.info(f"Found {len(product_links)} products on this page")
-                            full_product_links.extend(product_links)
-                        else:
-                            logging.info("No products found on this page")
-                            break
-
-                        # Pagination (Load more)
-                        next_page = sel.xpath(LOADMORE_XPATH).get()
-                        if next_page:
-                            page_url = (
-                                next_page if next_page.startswith("http")
-                                else f"https://www.halfords.com{next_page}"
-                            )
-                            meta['page'] += 1
-                            logging.info(f"Load More found → Page {meta['page']}: {page_url}")
-                        else:
-                            logging.info("Pagination completed")
-                            break
-
-                    else:
-                        logging.warning(f"Status code {response.status_code}")
-                        break
-
-                except Exception as e:
-                    logging.error(f"Error during pagination: {str(e)}")
-                    break
-        
-        
-        for url in full_product_links:
+        product_links = sel.xpath(PRODUCT_XPATH).getall()
+        if not product_links:
+            logging.info(f"[{meta['path']}] No products found on this page")
+            return None
+
+        stat["products"] += len(product_links)
+
+        for url in product_links:
+            with self.seen_lock:
+                if url in self.seen_urls:
+                    continue
+                self.seen_urls.add(url)
+            stat["new"] += 1
 
             # ITEM YIELD
             item = {}
             item["url"] = url
-            
-            #logging.info(item)
-        
+
             try:
-                ProductUrlItem(**item).save()
-                logging.info("Saved to database")
+                url_item = ProductUrlItem(**item)
+                url_item.validate()
+                self.writer.add(url_item.to_mongo().to_dict())
             except Exception as e:
                 logging.error(f"Error saving: {str(e)}")
-                pass
+
+        # PAGINATION
+        return sel.xpath(LOADMORE_XPATH).get()
+
+    def fetch(self, url):
+        """GET with per-host concurrency cap and spacing
+
+        Requests to one host start at least CRAWLER_DELAY apart whatever the
+        number of workers, so a host never sees more than 1 / CRAWLER_DELAY
+        requests per second.
+        """
+        host = urlparse(url).netloc
+        with self.host_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(CRAWLER_MAX_PER_HOST)
+                self.host_next_at[host] = time.monotonic()
+            now = time.monotonic()
+            wait_for = self.host_next_at[host] - now
+            self.host_next_at[host] = max(now, self.host_next_at[host]) + CRAWLER_DELAY
+            slots = self.host_slots[host]
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+        try:
+            with slots:
+                response = self.get_session().get(url, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            logging.error(f"Error fetching {url}: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            logging.warning(f"Status code {response.status_code} for {url}")
+            return None
+        return response
+
+    def get_session(self):
+        """curl_cffi sessions are not thread safe, so one per worker thread"""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+            self.local.session = session
+            with self.sessions_lock:
+                self.sessions.append(session)
+        return session
 
     def close(self):
         """Close function for all module object closing"""
+        for session in self.sessions:
+            session.close()
+        self.writer.close()
         self.mongo.close()
 
 
 if __name__ == "__main__":
     crawler = Crawler()
     crawler.start()
-    crawler.close()
\ No newline at end of file
+    crawler.close()
@@ -2,8 +2,15 @@ import csv
 import json
 from datetime import datetime
 from pymongo import MongoClient
-from settings import MONGO_DB, MONGO_COLLECTION_DATA, FILE_HEADERS, FILE_NAME, logging
+from csv_export import open_export
+from settings import MONGO_DB, MONGO_COLLECTION_DATA, FILE_HEADERS, FILE_NAME, EXPORT_BATCH_SIZE, EXPORT_BUFFER_SIZE, EXPORT_GZIP, logging
 
+# Only the fields the rows are built from
+EXPORT_FIELDS = [
+    "url", "sku", "product_name", "breadcrumbs", "rating", "reviews", "currency",
+    "selling_price", "regular_price", "price_label", "priceValidUntil", "availability",
+    "seller", "features", "description", "specification", "mpn", "image",
+]
 
 
 class Export:
@@ -19,7 +26,10 @@ class Export:
         self.writer.writerow(FILE_HEADERS)
         logging.info("File headers written successfully.")
 
-        cursor = self.mongo[MONGO_COLLECTION_DATA].find(no_cursor_timeout=True)
+        extraction_date = datetime.now().strftime("%Y-%m-%d")
+        cursor = self.mongo[MONGO_COLLECTION_DATA].find(
+            {}, EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE, no_cursor_timeout=True
+        )
         for item in cursor:
            
             try:
@@ -82,7 +92,7 @@ class Export:
                     "store_state": "",
                     "store_postcode": "",
                     "store_addressid": "",
-                    "extraction_date": datetime.now().strftime("%Y-%m-%d"),
+                    "extraction_date": extraction_date,
                     "product_name": product_name,
                     "brand": seller ,
                     "brand_type": "",
@@ -206,7 +216,7 @@ if __name__ == "__main__":
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    with open(FILE_NAME, "w", encoding="utf-8", newline="") as file:
+    with open_export(FILE_NAME, EXPORT_GZIP, EXPORT_BUFFER_SIZE) as file:
         writer_file = csv.writer(file, delimiter="|", quotechar='"')
         export = Export(writer_file)
         export.start()
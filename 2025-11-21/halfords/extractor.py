@@ -0,0 +1,40 @@
+import threading
+from lxml import etree, html
+
+_local = threading.local()
+
+
+def parse_html(text):
+    """Parse a page or fragment once into an lxml tree"""
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        # lxml parsers must not be shared between threads
+        parser = _local.parser = html.HTMLParser(encoding="utf-8")
+    return html.fromstring(text.encode("utf-8"), parser=parser)
+
+
+class Extractor:
+    """Declarative field map of XPath expressions compiled once at import"""
+
+    def __init__(self, fields):
+        self.fields = {name: etree.XPath(xpath) for name, xpath in fields.items()}
+
+    def extract(self, root):
+        """Evaluate every field on an already parsed tree
+
+        Text and attribute results come back as plain str lists, node
+        results as element lists, like parsel's getall().
+        """
+        data = {}
+        for name, xpath in self.fields.items():
+            result = xpath(root)
+            if isinstance(result, list):
+                data[name] = [str(v) if isinstance(v, str) else v for v in result]
+            else:
+                data[name] = result
+        return data
+
+
+def first(values, default=None):
+    """parsel .get() equivalent for an extracted list"""
+    return values[0] if values else default
@@ -1,6 +1,6 @@
-from mongoengine import DynamicDocument, StringField, DictField
+from mongoengine import DynamicDocument, StringField, DictField, ObjectIdField
 
-from settings import MONGO_COLLECTION_CATEGORY,MONGO_COLLECTION_PRODUCTS, MONGO_COLLECTION_DATA
+from settings import MONGO_COLLECTION_CATEGORY,MONGO_COLLECTION_PRODUCTS, MONGO_COLLECTION_DATA, MONGO_COLLECTION_CHECKPOINT
 
 class ProductCategoryItem(DynamicDocument):
     """initializing Category fields and its Data-Types"""
@@ -31,4 +31,10 @@ class ProductDataItem(DynamicDocument):
     image = StringField()
     features = StringField()
     description = StringField()
-    specification = DictField()
\ No newline at end of file
+    specification = DictField()
+
+class ParserCheckpointItem(DynamicDocument):
+    """Last input _id fully processed by a stage"""
+    meta = {"db_alias": "default", "collection": MONGO_COLLECTION_CHECKPOINT}
+    stage = StringField(primary_key=True)
+    last_id = ObjectIdField()
@@ -1,201 +1,327 @@
+import argparse
 import json
 import re
-import requests
-from parsel import Selector
+from extractor import Extractor, parse_html, first
 from mongoengine import connect
-from items import ProductUrlItem, ProductDataItem
-from settings import logging, MONGO_DB, MONGO_HOST, MONGO_PORT
+from http_session import new_session
+from response_cache import ResponseCache, CachedSession, CacheMiss
+from raw_archive import RawArchive
+from parse_pool import ParsePool
+from items import ProductUrlItem, ProductDataItem, ParserCheckpointItem
+from mongo_writer import BufferedMongoWriter
+from input_pages import input_pages
+from settings import logging, MONGO_DB, MONGO_HOST, MONGO_PORT, HTTP_POOL_SIZE, IMPERSONATE, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL, MONGO_COLLECTION_DATA, RESUME, CHECKPOINT_EVERY, INPUT_PAGE_SIZE
+from settings import HTTP_CACHE, HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_VARY_HEADERS
+from settings import RAW_ARCHIVE, RAW_ARCHIVE_DIR, RAW_ARCHIVE_PART_BYTES, PARSE_WORKERS, PARSE_MAX_PENDING
+
+# XPATH
+PDP_FIELDS = Extractor({
+    "script_tags": "//script[@type='application/ld+json']/text()",
+    "js_model": "//script[@class='js-model' and @type='application/json']/text()",
+})
+FEATURE_FIELDS = Extractor({"features": "//li/text()"})
+DESCRIPTION_FIELDS = Extractor({"lines": "//text()"})
+SPEC_FIELDS = Extractor({"rows": "//table//tr"})
+SPEC_ROW_FIELDS = Extractor({"key": "./td[1]//text()", "value": "./td[2]//text()"})
+
+# Description markup cleanup
+STYLE_RE = re.compile(r"<style.*?>.*?</style>", re.DOTALL | re.IGNORECASE)
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
 
 
 class Parser:
     """Parser for Halfords product data"""
     
-    def __init__(self):
+    def __init__(self, replay=False, data_collection=MONGO_COLLECTION_DATA, parse_workers=PARSE_WORKERS, resume=RESUME):
+        """replay=True reads responses from the response cache only, never the network"""
+        self.replay = replay
+        self.resume = resume and not replay
+        self.failed = 0
         self.mongo = connect(db=MONGO_DB, host=MONGO_HOST, alias="default", port=MONGO_PORT)
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+        if HTTP_CACHE or replay:
+            cache = ResponseCache(HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_VARY_HEADERS)
+            self.session = CachedSession(self.session, cache, replay)
+
+        if data_collection == MONGO_COLLECTION_DATA:
+            # _get_collection() creates the document's indexes on first use
+            collection = ProductDataItem._get_collection()
+        else:
+            collection = ProductDataItem._get_db()[data_collection]
+            collection.create_index("url", unique=True)
+        self.writer = BufferedMongoWriter(collection, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+        self.archive = RawArchive(RAW_ARCHIVE_DIR, RAW_ARCHIVE_PART_BYTES) if RAW_ARCHIVE and not replay else None
+        self.parse_pool = ParsePool(extract_item, parse_workers, PARSE_MAX_PENDING) if parse_workers else None
     
     def start(self):
         """Start code"""
         # Fetch URLs from MongoDB
-        url_docs = ProductUrlItem.objects()
+        total = ProductUrlItem.objects.count()
         
-        if not url_docs:
+        if not total:
             logging.error("No URLs found in database")
             return
         
-        logging.info(f"Found {url_docs.count()} URLs to process")
-        
-        for url_doc in url_docs:
-            url = url_doc.url
+        logging.info(f"Found {total} URLs to process")
+        last_id = None
+        for idx, url_doc in enumerate(self.pending_inputs(), 1):
+            if last_id and idx % CHECKPOINT_EVERY == 0:
+                self.save_checkpoint(last_id)
+            last_id = url_doc["_id"]
+            url = url_doc["url"]
             
             try:
-                response = requests.get(url, timeout=30)
+                response = self.session.get(url, timeout=30)
                 if response.status_code == 200:
-                    self.parse_item(url, response)
+                    if self.archive:
+                        self.archive.write(response, url=url)
+                    if self.parse_pool:
+                        # Extraction runs in a worker; save whatever finished meanwhile
+                        for item in self.parse_pool.submit(url, response.text):
+                            self.save_item(item)
+                    else:
+                        self.parse_item(url, response)
                 else:
+                    self.failed += 1
                     logging.warning(f"Status code {response.status_code} for {url}")
+            except CacheMiss:
+                logging.warning(f"Not in response cache, skipped: {url}")
             except Exception as e:
+                self.failed += 1
                 logging.error(f"Error fetching {url}: {str(e)}")
+
+        self.collect_parsed()
+        if last_id:
+            self.save_checkpoint(last_id)
+        if self.resume and self.failures():
+            logging.warning(f"{self.failures()} inputs failed; checkpoint held before the first, --resume retries them")
+
+    def pending_inputs(self):
+        """URLs not yet parsed, in _id order after the last checkpoint
+
+        Read a short page at a time, so no cursor idles while pages are fetched.
+        """
+        after = None
+        if self.resume:
+            checkpoint = ParserCheckpointItem.objects(stage="parser").first()
+            if checkpoint:
+                logging.info(f"Resuming after _id {checkpoint.last_id}")
+                after = checkpoint.last_id
+        for url_docs in input_pages(ProductUrlItem._get_collection(), INPUT_PAGE_SIZE, {"url": 1}, after=after):
+            yield from self.unparsed(url_docs)
+
+    def unparsed(self, url_docs):
+        """URLs without a saved item (all of them unless resuming)"""
+        if not self.resume:
+            return url_docs
+        # Anti-join on the unique url index of the data collection
+        urls = [url_doc["url"] for url_doc in url_docs]
+        saved = {doc["url"] for doc in self.writer.collection.find({"url": {"$in": urls}}, {"url": 1})}
+        return [url_doc for url_doc in url_docs if url_doc["url"] not in saved]
+
+    def save_checkpoint(self, last_id):
+        """Flush queued items, then record the last processed _id
+
+        Once an input has failed the checkpoint stays where it was, so a
+        resumed run retries that input; the anti-join skips what was saved since.
+        """
+        if not self.resume:
+            return
+        self.collect_parsed()
+        self.writer.flush()
+        if self.failures():
+            return
+        ParserCheckpointItem(stage="parser", last_id=last_id).save()
+
+    def failures(self):
+        """Inputs that failed to fetch, parse or save so far"""
+        return self.failed + (self.parse_pool.failed if self.parse_pool else 0)
     
+    def collect_parsed(self):
+        """Save every item still in the parse pool"""
+        if self.parse_pool:
+            for item in self.parse_pool.drain():
+                self.save_item(item)
+
     def close(self):
         """Connection close"""
+        if self.parse_pool:
+            self.parse_pool.close()
+        self.session.close()
+        self.writer.close()
+        if self.archive:
+            self.archive.close()
         self.mongo.close()
     
     def parse_item(self, url, response):
         """Item part"""
-        sel = Selector(text=response.text)
+        self.save_item(extract_item(url, response.text))
+
+    def save_item(self, item):
+        """Validate and queue one extracted item"""
+        logging.info(item)
         
-        #XPATH
-        SCRIPTTAGS_XPATH = "//script[@type='application/ld+json']/text()"
-        JSMODEL_XPATH = "//script[@class='js-model' and @type='application/json']/text()"
-    
-        # Extract data from LD+JSON scripts
-        script_tags = sel.xpath(SCRIPTTAGS_XPATH).getall()
+        try:
+            data_item = ProductDataItem(**item)
+            data_item.validate()
+            self.writer.add(data_item.to_mongo().to_dict())
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"Error saving to database: {str(e)}")
 
-        breadcrumbs = []
 
-        for script in script_tags:
-            try:
-                data = json.loads(script)
-                
-                # Extract Breadcrumbs
-                if "BreadcrumbList" in data.get("@type", ""):
-                    breadcrumb_list = data.get("itemListElement", [])
-                    for item in breadcrumb_list:
-                        breadcrumb = item.get("name")
-                        if breadcrumb:
-                            breadcrumbs.append(breadcrumb)
-                
-                # Extract Product data
-                if "Product" in data.get("@type", ""):
-                    product_name = data.get("name", "")
-                    sku = data.get("sku", "")
-                    rating = data.get("aggregateRating", {}).get("ratingValue", "")
-                    reviews = data.get("aggregateRating", {}).get("reviewCount", "")
-                    currency = data.get("offers", {}).get("priceCurrency", "")
-                    price = data.get("offers", {}).get("price", "")
-                    priceValidUntil = data.get("offers", {}).get("priceValidUntil", "")
-                    availability = data.get("offers", {}).get("availability", "").split("/")[-1]
-                    seller = data.get("offers", {}).get("seller", {}).get("name", "")
-                    mpn = data.get("mpn", "")
-                    image = data.get("image", "")
+def extract_item(url, html):
+    """Fields of one product page; module level so parse workers can run it"""
+    fields = PDP_FIELDS.extract(parse_html(html))
+
+    # Extract data from LD+JSON scripts
+    script_tags = fields["script_tags"]
+
+    breadcrumbs = []
+
+    for script in script_tags:
+        try:
+            data = json.loads(script)
+            
+            # Extract Breadcrumbs
+            if "BreadcrumbList" in data.get("@type", ""):
+                breadcrumb_list = data.get("itemListElement", [])
+                for item in breadcrumb_list:
+                    breadcrumb = item.get("name")
+                    if breadcrumb:
+                        breadcrumbs.append(breadcrumb)
             
-            except json.JSONDecodeError as e:
-                logging.error(f"Error parsing JSON: {str(e)}")
-                continue
+            # Extract Product data
+            if "Product" in data.get("@type", ""):
+                product_name = data.get("name", "")
+                sku = data.get("sku", "")
+                rating = data.get("aggregateRating", {}).get("ratingValue", "")
+                reviews = data.get("aggregateRating", {}).get("reviewCount", "")
+                currency = data.get("offers", {}).get("priceCurrency", "")
+                price = data.get("offers", {}).get("price", "")
+                priceValidUntil = data.get("offers", {}).get("priceValidUntil", "")
+                availability = data.get("offers", {}).get("availability", "").split("/")[-1]
+                seller = data.get("offers", {}).get("seller", {}).get("name", "")
+                mpn = data.get("mpn", "")
+                image = data.get("image", "")
         
-        # Extract product data from js-model script
-        try:
-            product_script = sel.xpath(JSMODEL_XPATH).get()
+        except json.JSONDecodeError as e:
+            logging.error(f"Error parsing JSON: {str(e)}")
+            continue
+    
+    # Extract product data from js-model script
+    try:
+        product_script = first(fields["js_model"])
 
-            specification={}
+        specification={}
 
-            if product_script:
-                product_data = json.loads(product_script)
-                product = product_data.get("product", {})
-                product_name = product.get("productName", product_name)
-                selling_price = product.get("price", {}).get("sales", {}).get("decimalPrice",price)
-                regular_price = product.get("price", {}).get("list", {}).get("decimalPrice", "") if product.get("price", {}).get("list", {}) else ""
-                label = product.get("price", {}).get("saveLabel", "")
-                
-                # Extract features
-                feature_html = product.get("plp3", "")
-                if feature_html:
-                    fsel = Selector(feature_html)
-                    features = ",".join(fsel.xpath("//li/text()").getall())
-                else:
-                    features = ""
-                
-                # Extract tabs (Description & Specification)
-                tabs = product.get("tabs", {}).get("list", [])
+        if product_script:
+            product_data = json.loads(product_script)
+            product = product_data.get("product", {})
+            product_name = product.get("productName", product_name)
+            selling_price = product.get("price", {}).get("sales", {}).get("decimalPrice",price)
+            regular_price = product.get("price", {}).get("list", {}).get("decimalPrice", "") if product.get("price", {}).get("list", {}) else ""
+            label = product.get("price", {}).get("saveLabel", "")
+            
+            # Extract features
+            feature_html = product.get("plp3") or ""
+            if feature_html.strip():
+                features = ",".join(FEATURE_FIELDS.extract(parse_html(feature_html))["features"])
+            else:
+                features = ""
+            
+            # Extract tabs (Description & Specification)
+            tabs = product.get("tabs", {}).get("list", [])
+            
+            for tab in tabs:
+                # Extract Description
+                if tab.get("tabLabel") == "Description":
+                    html = tab.get("tabMarkup", "")
+                    # Remove <style>...</style> blocks AND stray CSS comments
+                    clean = STYLE_RE.sub("", html)
+                    clean = CSS_COMMENT_RE.sub("", clean)   # remove CSS comments
+
+                    # Also remove HTML comments if any
+                    clean = HTML_COMMENT_RE.sub("", clean)
+                    # Clean non-breaking spaces
+                    clean = clean.replace("\xa0", " ")
+                    # Strip leading whitespace
+                    clean = clean.strip()
+
+                    # Now extract readable text
+                    lines = [
+                        t.strip()
+                        for t in DESCRIPTION_FIELDS.extract(parse_html(clean))["lines"]
+                        if t.strip()
+                    ] if clean else []
+
+                    # Remove duplicates, keep order
+                    clean_lines = []
+                    seen = set()
+
+                    for line in lines:
+                        if line not in seen:
+                            clean_lines.append(line)
+                            seen.add(line)
+
+                    description = ",".join(clean_lines)
                 
-                for tab in tabs:
-                    # Extract Description
-                    if tab.get("tabLabel") == "Description":
-                        html = tab.get("tabMarkup", "")
-                        # Remove <style>...</style> blocks AND stray CSS comments
-                        clean = re.sub(r"<style.*?>.*?</style>", "", html, flags=re.DOTALL|re.IGNORECASE)
-                        clean = re.sub(r"/\*.*?\*/", "", clean, flags=re.DOTALL)   # remove CSS comments
-
-                        # Also remove HTML comments if any
-                        clean = re.sub(r"<!--.*?-->", "", clean, flags=re.DOTALL)
-                        # Clean non-breaking spaces
-                        clean = clean.replace("\xa0", " ")
-                        # Strip leading whitespace
-                        clean = clean.strip()
-
-                        # Now extract readable text
-                        sel = Selector(clean)
-                                
-                        lines = [
-                            t.strip()
-                            for t in sel.xpath("//text()").getall()
-                            if t.strip()
-                        ]
-
-                        # Remove duplicates, keep order
-                        clean_lines = []
-                        seen = set()
-
-                        for line in lines:
-                            if line not in seen:
-                                clean_lines.append(line)
-                                seen.add(line)
-
-                        description = ",".join(clean_lines)
+                # Extract Specification
+                if tab.get("tabLabel") == "Specification":
+                    html = tab.get("tabMarkup", "")
+                    rows = SPEC_FIELDS.extract(parse_html(html))["rows"] if html.strip() else []
                     
-                    # Extract Specification
-                    if tab.get("tabLabel") == "Specification":
-                        html = tab.get("tabMarkup", "")
-                        spec_sel = Selector(html)
-                        rows = spec_sel.xpath("//table//tr")
+                    for row in rows:
+                        row_data = SPEC_ROW_FIELDS.extract(row)
+                        key = " ".join([k.strip() for k in row_data["key"] if k.strip()])
                         
-                        for row in rows:
-                            key = row.xpath("./td[1]//text()").getall()
-                            key = " ".join([k.strip() for k in key if k.strip()])
-                            
-                            value = row.xpath("./td[2]//text()").getall()
-                            value = " ".join([v.strip() for v in value if v.strip()])
-                            
-                            if key and value:
-                                specification[key] = value
-        
-        except (json.JSONDecodeError, AttributeError) as e:
-            logging.error(f"Error parsing product script: {str(e)}")
-        
-        # Clean breadcrumbs
-        breadcrumbs_str = ">".join(breadcrumbs) if breadcrumbs else ""
-        
-        # ITEM YIELD
-        item = {}
-        item["url"] = url
-        item["product_name"] = product_name 
-        item["sku"] = sku 
-        item["mpn"] = mpn 
-        item["breadcrumbs"] = breadcrumbs_str 
-        item["rating"] = rating 
-        item["reviews"] = reviews 
-        item["currency"] = currency 
-        item["selling_price"] = selling_price
-        item["regular_price"] = regular_price
-        item["price_label"] = label
-        item["priceValidUntil"] = priceValidUntil
-        item["availability"] = availability
-        item["seller"] = seller 
-        item["image"] = image
-        item["features"] = features
-        item["description"] = description 
-        item["specification"] = specification
-        
-        logging.info(item)
-        
-        try:
-            ProductDataItem(**item).save()
-            logging.info("Saved to database")
-        except Exception as e:
-            logging.error(f"Error saving to database: {str(e)}")
+                        value = " ".join([v.strip() for v in row_data["value"] if v.strip()])
+                        
+                        if key and value:
+                            specification[key] = value
+    
+    except (json.JSONDecodeError, AttributeError) as e:
+        logging.error(f"Error parsing product script: {str(e)}")
+    
+    # Clean breadcrumbs
+    breadcrumbs_str = ">".join(breadcrumbs) if breadcrumbs else ""
+    
+    # ITEM YIELD
+    item = {}
+    item["url"] = url
+    item["product_name"] = product_name 
+    item["sku"] = sku 
+    item["mpn"] = mpn 
+    item["breadcrumbs"] = breadcrumbs_str 
+    item["rating"] = rating 
+    item["reviews"] = reviews 
+    item["currency"] = currency 
+    item["selling_price"] = selling_price
+    item["regular_price"] = regular_price
+    item["price_label"] = label
+    item["priceValidUntil"] = priceValidUntil
+    item["availability"] = availability
+    item["seller"] = seller 
+    item["image"] = image
+    item["features"] = features
+    item["description"] = description 
+    item["specification"] = specification
+
+    return item
 
 
 if __name__ == "__main__":
-    parser_obj = Parser()
+    arg_parser = argparse.ArgumentParser(description="Halfords product parser")
+    arg_parser.add_argument("--replay", action="store_true", help="re-parse cached responses offline")
+    arg_parser.add_argument("--resume", action="store_true", help="skip parsed urls and continue after the checkpoint")
+    args = arg_parser.parse_args()
+
+    if args.replay:
+        # Re-parse every url from the cache into a fresh side collection
+        parser_obj = Parser(replay=True, data_collection=f"{MONGO_COLLECTION_DATA}_replay")
+        parser_obj.writer.collection.delete_many({})  # keeps the unique url index
+    else:
+        parser_obj = Parser(resume=args.resume or RESUME)
     parser_obj.start()
     parser_obj.close()
\ No newline at end of file
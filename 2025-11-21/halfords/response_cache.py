@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+class CacheMiss(Exception):
+    """Replay mode asked for a response that was never cached"""
+
+
+class CachedResponse:
+    """The parts of a requests/curl_cffi response the parsers read"""
+
+    def __init__(self, url, status_code, headers, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """Content-addressed, gzip-compressed store of HTTP responses on disk
+
+    Entries are keyed by a sha256 of method, url, params, body and the
+    headers listed in vary_headers (e.g. a location header that changes the
+    page). Entries older than ttl seconds since they were fetched (the file's
+    mtime, never touched afterwards) are ignored and removed. Hits only bump
+    the access time, and once the store exceeds max_bytes the least recently
+    used entries by access time are evicted.
+    """
+
+    def __init__(self, directory, ttl=24 * 3600, max_bytes=2 * 1024 ** 3, vary_headers=()):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.vary_headers = tuple(h.lower() for h in vary_headers)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self._entries())
+
+    def key(self, method, url, params=None, headers=None, body=None):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        parts = [
+            method.upper(),
+            url,
+            json.dumps(params or {}, sort_keys=True),
+            json.dumps({h: headers.get(h) for h in self.vary_headers}, sort_keys=True),
+        ]
+        digest = hashlib.sha256("\n".join(parts).encode())
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, sort_keys=True)
+        if body:
+            digest.update(body if isinstance(body, bytes) else str(body).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.gz")
+
+    def get(self, key, expire=True):
+        """Cached response for key, or None if absent or (when expire is set) expired"""
+        path = self.path(key)
+        try:
+            fetched_at = os.path.getmtime(path)
+            if expire and self.ttl and time.time() - fetched_at > self.ttl:
+                with self.lock:
+                    self._remove(path)
+                return None
+            with gzip.open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                content = f.read()
+            # Mark as recently used for eviction; mtime keeps the fetch time
+            os.utime(path, (time.time(), fetched_at))
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(meta["url"], meta["status_code"], meta["headers"], content, meta["encoding"])
+
+    def put(self, key, response):
+        """Store a response, then evict if over budget"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "url": str(response.url),
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "encoding": response.encoding or "utf-8",
+        }
+        # Write then rename so a concurrent reader never sees a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=3) as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(response.content)
+
+        with self.lock:
+            # A concurrent put of the same key replaces the entry, not adds one
+            try:
+                self.size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self.size += os.path.getsize(path)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".gz"):
+                    yield os.path.join(root, name)
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self.size -= size
+
+    def _evict(self):
+        """Drop least recently used entries down to 90% of max_bytes"""
+        entries = sorted(self._entries(), key=os.path.getatime)
+        target = self.max_bytes * 0.9
+        for path in entries:
+            if self.size <= target:
+                break
+            self._remove(path)
+        logging.info(f"Response cache evicted down to {self.size / 1024 ** 2:.0f} MB")
+
+
+class CachedSession:
+    """Send a session's GET/POST requests through a ResponseCache
+
+    Only 200 responses are stored. With replay=True the network is never
+    used: a cached response of any age is returned or CacheMiss is raised.
+    lookup() answers from the cache alone, so a caller can serve hits
+    before taking a rate-limit slot for the network.
+    """
+
+    def __init__(self, session, cache, replay=False):
+        self.session = session
+        self.cache = cache
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def lookup(self, method, url, params=None, headers=None, data=None, json=None):
+        """Cached response for the request, or None; never touches the network"""
+        body = data if data is not None else json
+        cached = self.cache.get(self.cache.key(method, url, params, headers, body), expire=not self.replay)
+        if cached is not None:
+            self.hits += 1
+        return cached
+
+    def request(self, method, url, params=None, headers=None, data=None, **kwargs):
+        cached = self.lookup(method, url, params, headers, data, kwargs.get("json"))
+        if cached is not None:
+            return cached
+        self.misses += 1
+        if self.replay:
+            raise CacheMiss(f"{method} {url}")
+
+        response = self.session.request(method, url, params=params, headers=headers, data=data, **kwargs)
+        if response.status_code == 200:
+            body = data if data is not None else kwargs.get("json")
+            self.cache.put(self.cache.key(method, url, params, headers, body), response)
+        return response
+
+    def close(self):
+        self.session.close()
+        logging.info(f"Response cache: {self.hits} hits, {self.misses} misses")
+
@@ -33,6 +33,20 @@ MONGO_COLLECTION_CATEGORY = f"{PROJECT_NAME}_category_url"
 MONGO_COLLECTION_PRODUCTS = f"{PROJECT_NAME}_product_url"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"product_data_item"
+MONGO_COLLECTION_CHECKPOINT = f"{PROJECT_NAME}_checkpoint"
+
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Resume mode: skip inputs already parsed and continue after the checkpoint.
+# Off by default, since the checkpoint is per MONGO_DB; opt in with --resume
+RESUME = False
+CHECKPOINT_EVERY = 100
+
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
 
 
 # MongoDB connection settings
@@ -43,6 +57,36 @@ MONGO_PORT = 27017
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 
+# HTTP session
+HTTP_POOL_SIZE = 10        # keep-alive connections per host
+IMPERSONATE = None       # curl_cffi profile, None for plain requests
+
+# Response cache for parser fetches; `python parser.py --replay` re-parses from it offline.
+# Off in production runs, where a day-old page is a stale price; turn it on for
+# development runs that re-parse the same pages after an XPath change
+HTTP_CACHE = False
+HTTP_CACHE_DIR = "http_cache"
+HTTP_CACHE_TTL = 24 * 60 * 60          # seconds a cached response is reused
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3   # least recently used entries evicted beyond this
+HTTP_CACHE_VARY_HEADERS = ()           # request headers that change the response
+
+# Raw archive of parsed responses per iteration; `python reparse.py` re-extracts from it
+RAW_ARCHIVE = False
+RAW_ARCHIVE_DIR = f"raw_archive/{MONGO_DB}"
+RAW_ARCHIVE_PART_BYTES = 256 * 1024 ** 2   # uncompressed bytes per part file
+REPARSE_WORKERS = os.cpu_count()
+REPARSE_CHUNK = 200                        # records handed to a worker at a time
+
+# Parse stage: page extraction runs in worker processes while the loop keeps fetching
+PARSE_WORKERS = os.cpu_count()             # 0 parses inline on the fetch loop
+PARSE_MAX_PENDING = 64                     # fetched pages waiting for a worker before fetching pauses
+
+# Crawler frontier
+CRAWLER_WORKERS = 6        # pagination chains crawled in parallel
+CRAWLER_MAX_PER_HOST = 4   # concurrent requests to one host
+CRAWLER_DELAY = 0.5        # seconds between requests to one host; caps each host at 1 / CRAWLER_DELAY req/s
+                           # (2 req/s) however many workers run, so raise workers only with a lower delay
+
 FILE_HEADERS = [
     "unique_id", "competitor_name", "store_name", "store_addressline1", "store_addressline2",
     "store_suburb", "store_state", "store_postcode", "store_addressid", "extraction_date",
@@ -71,4 +115,9 @@ FILE_HEADERS = [
     "Warning", "suitable_for", "standard_drinks", "grape_variety", "retail_limit"
 ]
 
-FILE_NAME= f"{PROJECT_NAME}_products_2025_11_25.csv"
\ No newline at end of file
+FILE_NAME= f"{PROJECT_NAME}_products_2025_11_25.csv"
+
+# CSV export
+EXPORT_BATCH_SIZE = 5000               # documents per cursor round trip
+EXPORT_BUFFER_SIZE = 1024 * 1024       # bytes buffered before each disk write
+EXPORT_GZIP = False                    # write FILE_NAME.gz instead of plain csv
@@ -1,8 +1,8 @@
 import logging
 import json
-import requests
 from pymongo import MongoClient
-from settings import HEADERS, API_URL, MONGO_DB, MONGO_COLLECTION_URLS, proxies
+from http_session import new_session
+from settings import HEADERS, API_URL, MONGO_DB, MONGO_COLLECTION_URLS, HTTP_POOL_SIZE, IMPERSONATE, proxies
 #from items import ProductUrlItem
 
 
@@ -11,6 +11,7 @@ class Crawler:
 
     def __init__(self):
         self.mongo = MongoClient("localhost", 27017)[MONGO_DB]
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
 
     def start(self):
         """Begin crawling pagination"""
@@ -26,7 +27,7 @@ class Crawler:
         while True:
             payload = {"show": "property", "start": meta["start"]}
 
-            response = requests.post(
+            response = self.session.post(
                 API_URL, headers=HEADERS, proxies=proxies, data=json.dumps(payload)
             )
 
@@ -116,6 +117,7 @@ class Crawler:
 
     def close(self):
         """Close DB connection"""
+        self.session.close()
         self.mongo.close()
 
 
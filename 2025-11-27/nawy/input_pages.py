@@ -0,0 +1,32 @@
+"""Read an input collection in short keyed pages instead of one long cursor
+
+A cursor streaming a big collection sits idle on the server while the
+caller does network work between getMores, and MongoDB kills cursors idle
+for 10 minutes (CursorNotFound). Every page here is a fresh query of about
+page_size documents, read in full before any of them is processed.
+"""
+
+
+def input_pages(collection, page_size, projection=None, key="_id", after=None, query=None):
+    """Lists of documents in key order, starting after key value `after`
+
+    A page ends on a key boundary: every document sharing the last key of a
+    page is in that page, so grouping by key inside a page never splits a
+    group. key must be indexed.
+    """
+    while True:
+        match = dict(query or {})
+        if after is not None:
+            match[key] = dict(match.get(key, {}), **{"$gt": after})
+
+        # Key of the page_size-th document; the page runs up to and including it
+        last = list(collection.find(match, {key: 1}).sort(key, 1).skip(page_size - 1).limit(1))
+        if last:
+            match[key] = dict(match.get(key, {}), **{"$lte": last[0].get(key)})
+
+        docs = list(collection.find(match, projection).sort(key, 1))
+        if docs:
+            yield docs
+        if not last:
+            return
+        after = last[0].get(key)
@@ -1,12 +1,28 @@
 import logging
-import requests
-import time
 from datetime import datetime
 from parsel import Selector
 from pymongo import MongoClient
-from settings import HEADERS, MONGO_DB, MONGO_COLLECTION_URLS, MONGO_COLLECTION_DATA, MONGO_COLLECTION_URL_FAILED, proxies
+from mongo_writer import BufferedMongoWriter
+from http_session import new_session
+from input_pages import input_pages
+from rate_limiter import RateLimiter
+from settings import HEADERS, MONGO_DB, MONGO_COLLECTION_URLS, MONGO_COLLECTION_DATA, MONGO_COLLECTION_URL_FAILED, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL, INPUT_PAGE_SIZE, HTTP_POOL_SIZE, IMPERSONATE, proxies
+from settings import RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_RETRIES
 #from items import ProductUrlItem, ProductDataItem
 
+# Only the url fields the parser reads
+URL_FIELDS = {
+    "url": 1,
+    "title": 1,
+    "price": 1,
+    "max_price": 1,
+    "property_type": 1,
+    "details": 1,
+    "refernce_number": 1,
+    "bedrooms": 1,
+    "bathrooms": 1,
+    "ready_by": 1,
+}
 
 class Parser:
     """parser"""
@@ -14,32 +30,33 @@ class Parser:
     def __init__(self):
         self.client = MongoClient("localhost", 27017)
         self.mongo = self.client[MONGO_DB]
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
+        self.writer = BufferedMongoWriter(self.mongo[MONGO_COLLECTION_DATA], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
 
     def start(self):
         """start code"""
-        # Fetch URLs from MongoDB collection
-        metas = []
-        for doc in self.mongo[MONGO_COLLECTION_URLS].find():
-            metas.append({'product': doc})
-        
-        
-        for meta in metas:
-            time.sleep(1)
-            url = meta.get('product', {}).get('url')
-            response = requests.get(url, headers=HEADERS, proxies=proxies)
-            if response.status_code == 200:
-                self.parse_item(response, meta)
-            else:
-                logging.error(f"Failed to fetch URL: {url} with status code {response.status_code}")
-                try:
-                    self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'status_code': response.status_code})
-                except:
-                    pass    
+        # URLs in _id order, a short query per page so no cursor idles
+        for docs in input_pages(self.mongo[MONGO_COLLECTION_URLS], INPUT_PAGE_SIZE, URL_FIELDS):
+            for doc in docs:
+                meta = {'product': doc}
+                url = meta.get('product', {}).get('url')
+                response = self.limiter.request(self.session.get, url, RATE_LIMIT_RETRIES, headers=HEADERS, proxies=proxies)
+                if response.status_code == 200:
+                    self.parse_item(response, meta)
+                else:
+                    logging.error(f"Failed to fetch URL: {url} with status code {response.status_code}")
+                    try:
+                        self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'status_code': response.status_code})
+                    except:
+                        pass    
 
            
     def close(self):
         """connection close"""
 
+        self.writer.close()
+        self.session.close()
         self.client.close()
 
     def parse_item(self, response, meta):
@@ -117,10 +134,7 @@ class Parser:
         # self.mongo.process(product_item, collection=MONGO_COLLECTION_DATA)
 
         logging.info(item)
-        try:
-            self.mongo[MONGO_COLLECTION_DATA].insert_one(item)
-        except:
-            pass
+        self.writer.add(item)
 
 
 if __name__ == "__main__":
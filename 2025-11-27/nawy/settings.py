@@ -34,6 +34,25 @@ MONGO_COLLECTION_URLS= f"{PROJECT_NAME}_url"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"{PROJECT_NAME}_data"
 
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
+
+# HTTP session
+HTTP_POOL_SIZE = 10        # keep-alive connections per host
+IMPERSONATE = None       # curl_cffi profile, None for plain requests
+
+# Per-host rate limit; adapts between min and max from response latency
+# and 429/403/5xx answers
+RATE_LIMIT_START = 1       # req/s per host to begin with
+RATE_LIMIT_MIN = 0.2
+RATE_LIMIT_MAX = 8
+RATE_LIMIT_RETRIES = 2     # retries of a throttled request
+
 
 HEADERS = {
     "accept": "application/json, text/plain, */*",
@@ -4,13 +4,16 @@ from parsel import Selector
 from curl_cffi import requests
 from datetime import datetime
 from pymongo import MongoClient
+from mongo_writer import BufferedMongoWriter
 from settings import (
     logging,
     HEADERS,
     MONGO_DB,
     MONGO_COLLECTION_PRODUCTS,
     MONGO_COLLECTION_DATA,
-    MONGO_COLLECTION_URL_FAILED
+    MONGO_COLLECTION_URL_FAILED,
+    MONGO_BATCH_SIZE,
+    MONGO_FLUSH_INTERVAL
 )
 #from items import ProductUrlItem, ProductDataItem
 
@@ -20,6 +23,7 @@ class Parser:
     def __init__(self):
         self.mongo = MongoClient("localhost", 27017)
         self.db = self.mongo[MONGO_DB]
+        self.writer = BufferedMongoWriter(self.db[MONGO_COLLECTION_DATA], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
         self.api_url = 'https://www.maxfashion.com/api/catalog-browse/products/sku'
         
     def start(self):
@@ -70,6 +74,7 @@ class Parser:
     
     def close(self):
         """connection close"""
+        self.writer.close()
         self.mongo.close()
 
     def parse_size_color_sellingprice(self, url, sku):
@@ -207,10 +212,7 @@ class Parser:
         
         logging.info(item)
         
-        try:
-            self.db[MONGO_COLLECTION_DATA].insert_one(item)
-        except Exception as e:
-            pass
+        self.writer.add(item)
 
 
 if __name__ == "__main__":
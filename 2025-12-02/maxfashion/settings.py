@@ -34,6 +34,10 @@ MONGO_COLLECTION_PRODUCTS = f"{PROJECT_NAME}_product_url"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"product_data_item"
 
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
 # File settings
 FILE_NAME = f"{PROJECT_NAME}_{YEAR}_{MONTH}_{DAY}_sample.csv"
 
@@ -1,6 +1,6 @@
-from curl_cffi import requests
 from pymongo import MongoClient
-from settings import logging, BASE_URL, HEADERS, MONGO_DB, MONGO_COLLECTION_CATEGORY
+from http_session import new_session
+from settings import logging, BASE_URL, HEADERS, MONGO_DB, MONGO_COLLECTION_CATEGORY, HTTP_POOL_SIZE, IMPERSONATE
 
 class CategoryCrawler:
     """Crawling Asda Categories"""
@@ -9,12 +9,13 @@ class CategoryCrawler:
         # MongoDB connection
         self.mongo = MongoClient('mongodb://localhost:27017/')  
         self.db = self.mongo[MONGO_DB]  
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
         
     def start(self):
         """Start crawling categories"""
         # Fetch main JSON
         url = f"{BASE_URL}/4565.json"
-        response = requests.get(url, headers=HEADERS, impersonate="chrome")
+        response = self.session.get(url, headers=HEADERS)
         
         if response.status_code == 200:
             categories = response.json()
@@ -64,7 +65,7 @@ class CategoryCrawler:
                     next_json_url = f"{BASE_URL}/{depts}.json"
                     
                     try:
-                        sub_response = requests.get(next_json_url, headers=HEADERS, impersonate="chrome")
+                        sub_response = self.session.get(next_json_url, headers=HEADERS)
                         if sub_response.status_code == 200:
                             sub_data = sub_response.json()
                             
@@ -114,6 +115,7 @@ class CategoryCrawler:
     
     def close(self):
         """Close MongoDB connection"""
+        self.session.close()
         self.mongo.close()
           
 
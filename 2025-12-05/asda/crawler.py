@@ -1,10 +1,17 @@
 
 import json
 import time
-from curl_cffi import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlencode
 from slugify import slugify
 from pymongo import MongoClient
-from settings import MONGO_DB, MONGO_COLLECTION_CATEGORY,MONGO_COLLECTION_PRODUCTS,logging,ALGOLIA_URL,ALGOLIA_PARAMS,ALGOLIA_HEADERS
+from http_session import new_session
+from mongo_writer import BufferedMongoWriter
+from rate_limiter import RateLimiter
+from settings import MONGO_DB, MONGO_COLLECTION_CATEGORY,MONGO_COLLECTION_PRODUCTS,logging,ALGOLIA_URL,ALGOLIA_PARAMS,ALGOLIA_HEADERS,HTTP_POOL_SIZE,IMPERSONATE
+from settings import ALGOLIA_INDEX,ALGOLIA_MULTI_URL,CRAWLER_WORKERS,ALGOLIA_MULTI_QUERY,MULTI_QUERY_BATCH
+from settings import RATE_LIMIT_START,RATE_LIMIT_MIN,RATE_LIMIT_MAX,RATE_LIMIT_RETRIES,MONGO_BATCH_SIZE,MONGO_FLUSH_INTERVAL
 
 class Crawler:
     """Crawling Urls"""
@@ -13,6 +20,13 @@ class Crawler:
         self.mongo = MongoClient('mongodb://localhost:27017/')
         self.db = self.mongo[MONGO_DB]
         self.db[MONGO_COLLECTION_PRODUCTS].create_index("url", unique=True)
+        # Unordered insert_many batches; the unique url index drops repeats
+        self.writer = BufferedMongoWriter(self.db[MONGO_COLLECTION_PRODUCTS], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+        self.local = threading.local()
+        self.sessions_lock = threading.Lock()
+        self.sessions = []
+        # One Algolia budget shared by all workers
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
 
         
     def start(self):
@@ -58,82 +72,140 @@ class Crawler:
         
         logging.info(f"FOUND END LEVEL CATEGORIES: {len(end_categories)}")
         
-        for idx, category in enumerate(end_categories, 1):
+        current_ts = int(time.time())
+        categories = []
+        for category in end_categories:
             meta = {}
             meta['category_id'] = category["id"]
             meta['category_name'] = category["name"]
             meta['category_path'] = category["full_path"]
+            meta['ts'] = current_ts
+            categories.append(meta)
+        
+        # Round 1: page 0 of every category tells us nbPages
+        remaining = []
+        for meta, page, data in self.run_queries([(meta, 0) for meta in categories]):
+            self.parse_item(data, meta, page)
+            nb_pages = data.get("nbPages", 0)
+            logging.info(f"{meta['category_path']}: {data.get('nbHits', 0)} hits, {nb_pages} pages")
+            remaining.extend((meta, p) for p in range(1, nb_pages))
+        
+        # Round 2: every remaining page of every category at once
+        logging.info(f"Fetching {len(remaining)} remaining pages")
+        for meta, page, data in self.run_queries(remaining):
+            self.parse_item(data, meta, page)
+        
+        logging.info("Pagination completed")
+    
+    def run_queries(self, units):
+        """Run (category, page) queries concurrently, yielding results as they land"""
+        with ThreadPoolExecutor(max_workers=CRAWLER_WORKERS) as executor:
+            if ALGOLIA_MULTI_QUERY:
+                batches = [units[i:i + MULTI_QUERY_BATCH] for i in range(0, len(units), MULTI_QUERY_BATCH)]
+                futures = [executor.submit(self.multi_query, batch) for batch in batches]
+            else:
+                futures = [executor.submit(self.single_query, unit) for unit in units]
             
-            logging.info(f"\n[{idx}/{len(end_categories)}] CATEGORY: {meta['category_path']}")
-            logging.info(f"ID: {meta['category_id']}")
-            
-            page = meta.get("page", 0)  # initialising page for pagination
-            api_url = f"{ALGOLIA_URL}?{ALGOLIA_PARAMS}"  # generate api Url
-            
-            while True:
-                current_ts = int(time.time())
-                
-                payload = {
-                    "query": "",
-                    "clickAnalytics": True,
-                    "analytics": True,
-                    "hitsPerPage": 60,
-                    "page": page,
-                    "removeWordsIfNoResults": "allOptional",
-                    "optionalFilters": ["STOCK.4565:1<score=50000>"],
-                    "attributesToRetrieve": [
-                        "STATUS", "BRAND", "CIN", "NAME", "AVG_RATING", "RATING_COUNT",
-                        "ICONS", "PRICES.EN", "SALES_TYPE", "MAX_QTY", "STOCK.4565",
-                        "IS_FROZEN", "IS_BWS", "PROMOS.EN", "LABEL", "LABEL_START_DATE",
-                        "LABEL_END_DATE", "IS_SPONSORED", "PRODUCT_TYPE", "CIN_ID",
-                        "PRIMARY_TAXONOMY", "IMAGE_ID", "PACK_SIZE", "PHARMACY_RESTRICTED",
-                        "CS_YES", "CS_TEXT", "IS_FTO", "PURCHASE_START_DATE_FTO",
-                        "PURCHASE_END_DATE_FTO", "DELIVERY_SLOT_START_DATE_FTO",
-                        "END_DATE", "START_DATE", "SIZE_DESC", "REWARDS", "SHOW_PRICE_CS", "ID"
-                    ],
-                    "facets": ["BRAND", "NUTRITIONAL_INFO.*"],
-                    "filters": (
-                        f"(STATUS:A OR STATUS:I) AND END_DATE>{current_ts} AND "
-                        f"( PRIMARY_TAXONOMY.SHELF_ID:'{meta['category_id']}' OR "
-                        f"SECONDARY_TAXONOMY.SHELF_ID:{meta['category_id']} ) AND "
-                        f"PAGE_TAXONOMY:\"{meta['category_path']}\""
-                    )
-                }
-                
-                response = requests.post(
-                    api_url,
-                    headers=ALGOLIA_HEADERS,
-                    data=json.dumps(payload),
-                    impersonate="chrome",
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    is_next = self.parse_item(response, meta)
-                    if not is_next:
-                        logging.info("Pagination completed")
-                        break
-                    # pagination crawling
-                    page += 1
-                    meta["page"] = page
-                    time.sleep(0.4)
-                else:
-                    logging.error(f"ERROR: {response.status_code}")
-                    break
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logging.error(f"ERROR: {e}")
                     # self.queue.publish(data) ##########used for requeuing
+                    continue
+                yield from results
     
-    def parse_item(self, response, meta):
-        """item part"""
-        try:
-            data = response.json()
-        except:
-            return False
+    def single_query(self, unit):
+        """One Algolia query per HTTP request"""
+        meta, page = unit
+        response = self.limiter.request(
+            self.get_session().post,
+            f"{ALGOLIA_URL}?{ALGOLIA_PARAMS}",
+            RATE_LIMIT_RETRIES,
+            headers=ALGOLIA_HEADERS,
+            data=json.dumps(self.build_payload(meta, page)),
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise ValueError(f"{response.status_code} for {meta['category_path']} page {page}")
+        return [(meta, page, response.json())]
+    
+    def multi_query(self, batch):
+        """Many Algolia queries in one HTTP request"""
+        body = {
+            "requests": [
+                {"indexName": ALGOLIA_INDEX, "params": self.encode_params(self.build_payload(meta, page))}
+                for meta, page in batch
+            ]
+        }
+        response = self.limiter.request(
+            self.get_session().post,
+            f"{ALGOLIA_MULTI_URL}?{ALGOLIA_PARAMS}",
+            RATE_LIMIT_RETRIES,
+            headers=ALGOLIA_HEADERS,
+            data=json.dumps(body),
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise ValueError(f"{response.status_code} for multi-query of {len(batch)}")
         
+        # results come back in request order
+        results = response.json().get("results", [])
+        return [(meta, page, data) for (meta, page), data in zip(batch, results)]
+    
+    def build_payload(self, meta, page):
+        """Algolia query for one category page"""
+        return {
+            "query": "",
+            "clickAnalytics": True,
+            "analytics": True,
+            "hitsPerPage": 60,
+            "page": page,
+            "removeWordsIfNoResults": "allOptional",
+            "optionalFilters": ["STOCK.4565:1<score=50000>"],
+            "attributesToRetrieve": [
+                "STATUS", "BRAND", "CIN", "NAME", "AVG_RATING", "RATING_COUNT",
+                "ICONS", "PRICES.EN", "SALES_TYPE", "MAX_QTY", "STOCK.4565",
+                "IS_FROZEN", "IS_BWS", "PROMOS.EN", "LABEL", "LABEL_START_DATE",
+                "LABEL_END_DATE", "IS_SPONSORED", "PRODUCT_TYPE", "CIN_ID",
+                "PRIMARY_TAXONOMY", "IMAGE_ID", "PACK_SIZE", "PHARMACY_RESTRICTED",
+                "CS_YES", "CS_TEXT", "IS_FTO", "PURCHASE_START_DATE_FTO",
+                "PURCHASE_END_DATE_FTO", "DELIVERY_SLOT_START_DATE_FTO",
+                "END_DATE", "START_DATE", "SIZE_DESC", "REWARDS", "SHOW_PRICE_CS", "ID"
+            ],
+            "facets": ["BRAND", "NUTRITIONAL_INFO.*"],
+            "filters": (
+                f"(STATUS:A OR STATUS:I) AND END_DATE>{meta['ts']} AND "
+                f"( PRIMARY_TAXONOMY.SHELF_ID:'{meta['category_id']}' OR "
+                f"SECONDARY_TAXONOMY.SHELF_ID:{meta['category_id']} ) AND "
+                f"PAGE_TAXONOMY:\"{meta['category_path']}\""
+            )
+        }
+    
+    def encode_params(self, payload):
+        """Multi-query params string; non-string values are JSON encoded"""
+        return urlencode({
+            key: value if isinstance(value, str) else json.dumps(value)
+            for key, value in payload.items()
+        })
+    
+    def get_session(self):
+        """curl_cffi sessions are not thread safe, so one per worker thread"""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+            self.local.session = session
+            with self.sessions_lock:
+                self.sessions.append(session)
+        return session
+    
+    def parse_item(self, data, meta, page):
+        """item part"""
         # EXTRACT
         products = data.get("hits", [])
         
         if products:
-            logging.info(f"page {meta.get('page')} - {len(products)} found")
+            logging.info(f"{meta['category_path']} page {page} - {len(products)} found")
 
             for product in products:
                 prices_en = product.get("PRICES", {}).get("EN", {})
@@ -177,10 +249,7 @@ class Crawler:
                 
                 #logging.info(item)
                 
-                try:
-                    self.db[MONGO_COLLECTION_PRODUCTS].insert_one(item)
-                except:
-                    pass
+                self.writer.add(item)
             
             return True
         
@@ -188,6 +257,9 @@ class Crawler:
     
     def close(self):
         """Close function for all module object closing"""
+        self.writer.close()
+        for session in self.sessions:
+            session.close()
         self.mongo.close()
         # self.queue.close()
 
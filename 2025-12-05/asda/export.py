@@ -1,15 +1,32 @@
 import csv
-import re
 from pymongo import MongoClient
-from datetime import datetime
+from csv_export import open_export
 from settings import (
     MONGO_DB,
     MONGO_COLLECTION_DATA,
     FILE_HEADERS,
     FILE_NAME,
+    EXPORT_BATCH_SIZE,
+    EXPORT_BUFFER_SIZE,
+    EXPORT_GZIP,
     logging
 )
 
+# Only the fields the rows are built from
+EXPORT_FIELDS = [
+    "unique_id", "competitor_name", "extraction_date", "product_name", "brand",
+    "grammage_quantity", "grammage_unit", "producthierarchy_level1", "producthierarchy_level2",
+    "producthierarchy_level3", "producthierarchy_level4", "producthierarchy_level5",
+    "producthierarchy_level6", "producthierarchy_level7", "regular_price", "selling_price",
+    "promotion_price", "price_was", "promotion_description", "price_per_unit", "currency",
+    "breadcrumb", "pdp_url", "product_description", "storage_instructions",
+    "preparation_instructions", "instructionforuse", "country_of_origin", "allergens",
+    "nutritional_information", "labelling", "frozen", "rating", "review", "image_url_1",
+    "competitor_product_key", "upc", "Features", "dietary_lifestyle", "manufacturer_address",
+    "recycling_information", "site_shown_uom", "ingredients", "instock", "product_unique_key",
+    "warning", "netcontent",
+]
+
 
 class Export:
     """Export MongoDB collection to CSV with cleaning and normalization"""
@@ -25,7 +42,9 @@ class Export:
         logging.info("File headers written successfully.")
 
 
-        cursor = self.mongo[MONGO_COLLECTION_DATA].find(no_cursor_timeout=True)
+        cursor = self.mongo[MONGO_COLLECTION_DATA].find(
+            {}, EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE, no_cursor_timeout=True
+        )
        
         for item in cursor:
            
@@ -224,7 +243,7 @@ if __name__ == "__main__":
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    with open(FILE_NAME, "w", encoding="utf-8", newline="") as file:
+    with open_export(FILE_NAME, EXPORT_GZIP, EXPORT_BUFFER_SIZE) as file:
         writer_file = csv.writer(file, delimiter="|", quotechar='"')
         export = Export(writer_file)
         export.start()
@@ -1,26 +1,36 @@
+import argparse
 import re
 import json
 from datetime import datetime
-from curl_cffi import requests
 from parsel import Selector
 from pymongo import MongoClient
-from settings import MONGO_DB, MONGO_COLLECTION_PRODUCTS, MONGO_COLLECTION_DATA,MONGO_COLLECTION_URL_FAILED,HEADERS, logging
+from mongo_writer import BufferedMongoWriter
+from input_pages import input_pages
+from http_session import new_session
+from settings import MONGO_DB, MONGO_COLLECTION_PRODUCTS, MONGO_COLLECTION_DATA,MONGO_COLLECTION_URL_FAILED,HEADERS, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL, MONGO_COLLECTION_CHECKPOINT, RESUME, CHECKPOINT_EVERY, INPUT_PAGE_SIZE, HTTP_POOL_SIZE, IMPERSONATE, logging
 
 
 class Parser:
     """parser"""
     
-    def __init__(self):
+    def __init__(self, resume=RESUME):
+        self.resume = resume
+        self.failed = 0
         self.mongo = MongoClient('mongodb://localhost:27017/')
         self.db = self.mongo[MONGO_DB]
+        self.writer = BufferedMongoWriter(self.db[MONGO_COLLECTION_DATA], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+        self.db[MONGO_COLLECTION_DATA].create_index("pdp_url")
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
     
     def start(self):
         """start code"""
         
-        # Fetch all products from MongoDB
-        products = list(self.db[MONGO_COLLECTION_PRODUCTS].find())
-        
-        for product in products:
+        last_id = None
+        for idx, product in enumerate(self.pending_inputs(), 1):
+            if last_id and idx % CHECKPOINT_EVERY == 0:
+                self.save_checkpoint(last_id)
+            last_id = product["_id"]
+
             url = product.get('url')
             if not url:
                 continue
@@ -28,24 +38,69 @@ class Parser:
             logging.info(f"Processing: {url}")
             
             try:
-                response = requests.get(url, headers=HEADERS, impersonate="chrome")
+                response = self.session.get(url, headers=HEADERS)
                 if response and response.status_code == 200:
                     self.parse_item(url, response, product)
                 else:
                     logging.error(f"Failed to fetch {url}: {response.status_code if response else 'No response'}")
+                    self.failed += 1
                     failed_item = {
                         "url": url,
                         "product_id": product.get("product_id"),
-                        "reason": str(e)
+                        "reason": f"status {response.status_code if response else 'No response'}"
                     }
                     self.db[MONGO_COLLECTION_URL_FAILED].insert_one(failed_item)
                     # self.queue.publish(url)##########used for requeuing
             except Exception as e:
+                self.failed += 1
                 logging.error(f"Error fetching {url}: {e}")
                 # self.queue.publish(url)##########used for requeuing
-    
+
+        if last_id:
+            self.save_checkpoint(last_id)
+        if self.resume and self.failed:
+            logging.warning(f"{self.failed} inputs failed; checkpoint held before the first, --resume retries them")
+
+    def pending_inputs(self):
+        """Products not yet parsed, in _id order after the last checkpoint
+
+        Read a short page at a time, so no cursor idles while pages are fetched.
+        """
+        after = None
+        if self.resume:
+            checkpoint = self.db[MONGO_COLLECTION_CHECKPOINT].find_one({"_id": "parser"})
+            if checkpoint:
+                logging.info(f"Resuming after _id {checkpoint['last_id']}")
+                after = checkpoint["last_id"]
+        for products in input_pages(self.db[MONGO_COLLECTION_PRODUCTS], INPUT_PAGE_SIZE, after=after):
+            yield from self.unparsed(products)
+
+    def unparsed(self, products):
+        """Products whose url is not in the data collection yet (all of them unless resuming)"""
+        if not self.resume:
+            return products
+        # Anti-join on the pdp_url index of the data collection
+        urls = [product.get("url") for product in products]
+        saved = {doc["pdp_url"] for doc in self.writer.collection.find({"pdp_url": {"$in": urls}}, {"pdp_url": 1})}
+        return [product for product in products if product.get("url") not in saved]
+
+    def save_checkpoint(self, last_id):
+        """Flush queued items, then record the last processed _id
+
+        Once an input has failed the checkpoint stays where it was, so a
+        resumed run retries that input; the anti-join skips what was saved since.
+        """
+        if not self.resume or self.failed:
+            return
+        self.writer.flush()
+        self.db[MONGO_COLLECTION_CHECKPOINT].update_one(
+            {"_id": "parser"}, {"$set": {"last_id": last_id}}, upsert=True
+        )
+
     def close(self):
         """connection close"""
+        self.writer.close()
+        self.session.close()
         self.mongo.close()
         # self.queue.close()
     
@@ -294,13 +349,14 @@ class Parser:
     
         #logging.info(item)
       
-        try:
-            self.db[MONGO_COLLECTION_DATA].insert_one(item)
-        except Exception as e:
-            logging.error(f"Failed to insert item: {e}")
+        self.writer.add(item)
 
 
 if __name__ == "__main__":
-    parser_obj = Parser()
+    arg_parser = argparse.ArgumentParser(description="Asda product parser")
+    arg_parser.add_argument("--resume", action="store_true", help="skip parsed products and continue after the checkpoint")
+    args = arg_parser.parse_args()
+
+    parser_obj = Parser(resume=args.resume or RESUME)
     parser_obj.start()
     parser_obj.close()
\ No newline at end of file
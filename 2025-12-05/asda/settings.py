@@ -36,11 +36,34 @@ MONGO_COLLECTION_CATEGORY = f"{PROJECT_NAME}_category_url"
 MONGO_COLLECTION_PRODUCTS = f"{PROJECT_NAME}_product"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"product_data_item"
+MONGO_COLLECTION_CHECKPOINT = f"{PROJECT_NAME}_checkpoint"
+
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Resume mode: skip inputs already parsed and continue after the checkpoint.
+# Off by default, since the checkpoint is per MONGO_DB; opt in with --resume
+RESUME = False
+CHECKPOINT_EVERY = 100
+
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
+
+# HTTP session
+HTTP_POOL_SIZE = 10        # keep-alive connections per host
+IMPERSONATE = "chrome"   # curl_cffi profile, None for plain requests
 
 
 # File settings
 FILE_NAME = f"{PROJECT_NAME}_{YEAR}_{MONTH}_{DAY}_sample.csv"
 
+# CSV export
+EXPORT_BATCH_SIZE = 5000               # documents per cursor round trip
+EXPORT_BUFFER_SIZE = 1024 * 1024       # bytes buffered before each disk write
+EXPORT_GZIP = False                    # write FILE_NAME.gz instead of plain csv
+
 #category crawler headers
 BASE_URL="https://ghs-mm.asda.com/static"
 
@@ -80,6 +103,20 @@ ALGOLIA_HEADERS = {
 }
 
 ALGOLIA_PARAMS = "x-algolia-agent=Algolia%20for%20JavaScript%20(4.25.2)%3B%20Browser"
+ALGOLIA_INDEX = "ASDA_PRODUCTS"
+ALGOLIA_MULTI_URL = "https://8i6wskccnv-dsn.algolia.net/1/indexes/*/queries"
+
+# Algolia fan-out: page 0 of every category first, then all remaining pages at once
+CRAWLER_WORKERS = 6          # Algolia requests in flight
+ALGOLIA_MULTI_QUERY = True   # batch several category/page queries per HTTP request
+MULTI_QUERY_BATCH = 20       # queries per multi-query request
+
+# Per-host rate limit shared by the workers; adapts between min and max
+# from response latency and 429/403/5xx answers
+RATE_LIMIT_START = 5         # req/s per host to begin with
+RATE_LIMIT_MIN = 0.5
+RATE_LIMIT_MAX = 30
+RATE_LIMIT_RETRIES = 2       # retries of a throttled request
 
 FILE_HEADERS = [
     "unique_id", "competitor_name", "store_name", "store_addressline1", "store_addressline2",
@@ -1,206 +1,243 @@
-import requests
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pymongo import MongoClient
 from parsel import Selector
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process, utils
 from urllib.parse import quote_plus
-from settings import logging,MONGO_DB,MONGO_COLLECTION_INPUT,MONGO_COLLECTION_PRODUCTS,BASE_URL
+from http_session import new_session
+from input_pages import input_pages
+from mongo_writer import BufferedMongoWriter
+from rate_limiter import RateLimiter
+from settings import logging,MONGO_DB,MONGO_COLLECTION_INPUT,MONGO_COLLECTION_PRODUCTS,BASE_URL,INPUT_PAGE_SIZE
+from settings import MATCH_WORKERS,MATCH_ROWS_IN_FLIGHT,SEARCH_CACHE_SIZE,NAME_PARTIAL_SCORE,REQUEST_TIMEOUT
+from settings import RATE_LIMIT_START,RATE_LIMIT_MIN,RATE_LIMIT_MAX,RATE_LIMIT_RETRIES,MONGO_BATCH_SIZE,MONGO_FLUSH_INTERVAL
+
+# Only the input columns used for matching
+INPUT_FIELDS = {"EAN MASTER": 1, "CNK BELUX": 1, "PRODUCT GENERAL NAME": 1}
+
+SEARCH_URL = "https://www.farmaline.be/nl/search.htm?eventName=search-submit&i=1&q={q}&searchChannel=algolia"
+
+# XPATH
+PRODUCT_XPATH = "//li[@data-qa-id='result-list-entry']"
+URL_XPATH =".//a[@data-qa-id='serp-result-item-title']/@href"
+NAME_XPATH = ".//a[@data-qa-id='serp-result-item-title']//text()"
+PRICE_XPATH = ".//span[@data-qa-id='entry-price']//text()"
+DISCOUNT_XPATH = ".//div[@class='flex min-w-12 items-center justify-center p-1 text-dark-primary-max rounded-full bg-light-tertiary font-mono text-xs font-medium']/span/text()"
+REGULAR_PRICE_XPATH = ".//div[@class='text-dark-primary-max']/span[@class='line-through']/text()"
+CARD_TEXT_XPATH = ".//text()"
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def collapse_whitespace(query):
+    """Query as sent to the site, with runs of whitespace collapsed"""
+    return WHITESPACE_RE.sub(" ", query).strip()
+
+
+def normalize_query(query):
+    """Cache key only: the site search ignores case and repeated spaces"""
+    return collapse_whitespace(query).upper()
+
+
+def parse_cards(html):
+    """Result cards of one search page, each parsed once"""
+    cards = []
+    for p in Selector(html).xpath(PRODUCT_XPATH):
+        cards.append({
+            "product_url": f"{BASE_URL}{p.xpath(URL_XPATH).get()}",
+            "product_name": p.xpath(NAME_XPATH).get(),
+            "selling_price": "".join(p.xpath(PRICE_XPATH).getall()),
+            "discount": p.xpath(DISCOUNT_XPATH).get(),
+            "regular_price": p.xpath(REGULAR_PRICE_XPATH).get(),
+            "card_text": " ".join(p.xpath(CARD_TEXT_XPATH).getall()).upper(),
+        })
+    return cards
+
+
+def match_item(card, match_type, **extra):
+    """Output document of a matched card"""
+    item = {key: value for key, value in card.items() if key != "card_text"}
+    item["match_type"] = match_type
+    item.update(extra)
+    return item
+
+
+class SearchCache:
+    """Parsed search results per normalized query, shared by all workers
+
+    Rows with the same EAN, CNK or name (up to case and spacing) share one
+    request; a worker asking for a query that is still being fetched waits
+    for that fetch. The first query seen for a key is the one sent to the
+    site, never the upper-cased key. Failed searches are not kept. The last
+    max_size queries are held.
+    """
+
+    def __init__(self, fetch, max_size):
+        self.fetch = fetch
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """Cards for query, None if the search failed"""
+        key = normalize_query(query)
+        with self.lock:
+            future = self.entries.get(key)
+            owner = future is None
+            if owner:
+                future = self.entries[key] = Future()
+                self.misses += 1
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+
+        if owner:
+            try:
+                cards = self.fetch(collapse_whitespace(query))
+            except Exception as e:
+                logging.error(f"Search failed for {query}: {e}")
+                cards = None
+            if cards is None:
+                with self.lock:
+                    if self.entries.get(key) is future:
+                        del self.entries[key]
+            future.set_result(cards)
+        return future.result()
 
 
 class Crawler:
     """Crawling Farmaline Products"""
-    
+
     def __init__(self):
         self.mongo = MongoClient("mongodb://localhost:27017/")
         self.db = self.mongo["farmaline_db"]
-        
-    
+
+        # Keep-alive pool large enough for every in-flight request
+        self.session = new_session(pool_size=MATCH_WORKERS)
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
+        self.cache = SearchCache(self.search, SEARCH_CACHE_SIZE)
+
+        # Matches of all rows go out in unordered insert_many batches
+        self.writer = BufferedMongoWriter(self.db[MONGO_COLLECTION_PRODUCTS], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+
+
     def start(self):
         """Processing input items"""
-        for item in list(self.db[MONGO_COLLECTION_INPUT].find()):
-            ean = str(item.get("EAN MASTER", "")).strip()
-            cnk = str(item.get("CNK BELUX", "")).strip()
-            input_name = str(item.get("PRODUCT GENERAL NAME", "")).strip()
-            
-            logging.info(f"Processing: {input_name}")
-            
-            meta = {
-                'ean': ean,
-                'cnk': cnk,
-                'input_name': input_name,
-                'product_saved': False
-            }
-            
-            # Try EAN search first
-            if ean and not meta['product_saved']:
-                q = quote_plus(ean)
-                url = f"https://www.farmaline.be/nl/search.htm?eventName=search-submit&i=1&q={q}&searchChannel=algolia"
-                
-                response = requests.get(url)
-                if response.status_code == 200:
-                    self.parse_item(response, meta, ean, "EAN")
-                    
-            # Try CNK search if not saved
-            if cnk and not meta['product_saved']:
-                q = quote_plus(cnk)
-                url = f"https://www.farmaline.be/nl/search.htm?eventName=search-submit&i=1&q={q}&searchChannel=algolia"
-                
-                response = requests.get(url)
-                if response.status_code == 200:
-                    self.parse_item(response, meta, cnk, "CNK")
-                    
-            # Try product name search if not saved
-            if input_name and not meta['product_saved']:
-                q = quote_plus(input_name)
-                url = f"https://www.farmaline.be/nl/search.htm?eventName=search-submit&i=1&q={q}&searchChannel=algolia"
-                
-                response = requests.get(url)
-                if response.status_code == 200:
-                    self.parse_item(response, meta, input_name, "NAME")
-            
- 
-    
-    def parse_item(self, response, meta, search_term, search_type):
-        """Parse product listings"""
-        sel = Selector(response.text)
-        
-        # XPATH
-        PRODUCT_XPATH = "//li[@data-qa-id='result-list-entry']"
-        URL_XPATH =".//a[@data-qa-id='serp-result-item-title']/@href"
-        NAME_XPATH = ".//a[@data-qa-id='serp-result-item-title']//text()"
-        PRICE_XPATH = ".//span[@data-qa-id='entry-price']//text()"
-        DISCOUNT_XPATH = ".//div[@class='flex min-w-12 items-center justify-center p-1 text-dark-primary-max rounded-full bg-light-tertiary font-mono text-xs font-medium']/span/text()"
-        REGULAR_PRICE_XPATH = ".//div[@class='text-dark-primary-max']/span[@class='line-through']/text()"
-        CARD_TEXT_XPATH = ".//text()"
-        
-        # EXTRACT
-        products = sel.xpath(PRODUCT_XPATH)
-        
-        
-        if search_type in ["EAN", "CNK"]:
-            if len(products) == 1:
-                p = products[0]
-                product_url = f"{BASE_URL}{p.xpath(URL_XPATH).get()}"
-                name = p.xpath(NAME_XPATH).get()
-                selling_price = "".join(p.xpath(PRICE_XPATH).getall())
-                discount = p.xpath(DISCOUNT_XPATH).get()
-                regular_price = p.xpath(REGULAR_PRICE_XPATH).get()
-                match_type = f"{search_type} EXACT"
-                
-                item={}
-                item["product_url"]=product_url
-                item["product_name"]=name
-                item["selling_price"]=selling_price
-                item["discount"]=discount
-                item["regular_price"]=regular_price
-                item["match_type"]=match_type
-                item[f"{search_type.lower()}"]= search_term
-
-                logging.info(item)
-                try:
-                    self.db[MONGO_COLLECTION_PRODUCTS].insert_one(item)
-                    logging.info(f" Saved via single {search_type} result")
-                    meta['product_saved'] = True
-                except:
-                    pass
-
-            
-            elif len(products) > 1:
-                matched = []
-                
-                for p in products:
-
-                    card_text = " ".join(p.xpath(CARD_TEXT_XPATH).getall()).upper()
-                    
-                    if search_term in card_text:
-                        product_url = f"{BASE_URL}{p.xpath(URL_XPATH).get()}"
-                        name = p.xpath(NAME_XPATH).get()
-                        selling_price = "".join(p.xpath(PRICE_XPATH).getall())
-                        discount = p.xpath(DISCOUNT_XPATH).get()
-                        regular_price = p.xpath(REGULAR_PRICE_XPATH).get()
-                        match_type = f"{search_type} IN CARD"
-                        
-                        item={}
-                        item["product_url"]=product_url
-                        item["product_name"]=name
-                        item["selling_price"]=selling_price
-                        item["discount"]=discount
-                        item["regular_price"]=regular_price
-                        item["match_type"]=match_type
-                        item[f"{search_type.lower()}"]= search_term
-                        matched.append(item)
-                
-                if len(matched) == 1:
-                    logging.info(matched[0])
-                    try:
-                        self.db[MONGO_COLLECTION_PRODUCTS].insert_one(matched[0])
-                        logging.info(f"✔ Saved via {search_type} found in exactly one card")
-                        meta['product_saved'] = True
-                    except:
-                        pass
-                else:
-                    logging.warning(f"{search_type} not uniquely identifiable in PLP")
-
-        elif search_type == "NAME":
-            exact = None
-            partial = []
-            
-            for p in products:
-                product_url = f"{BASE_URL}{p.xpath(URL_XPATH).get()}"
-                name = p.xpath(NAME_XPATH).get()
-                selling_price = "".join(p.xpath(PRICE_XPATH).getall())
-                discount = p.xpath(DISCOUNT_XPATH).get()
-                regular_price = p.xpath(REGULAR_PRICE_XPATH).get()
-                
-                if not name or not product_url or "api" in product_url:
-                    continue
-                
-                
-                score = fuzz.token_sort_ratio(search_term.upper(), name.upper())
-
-                item={}
-                item["product_url"]=product_url
-                item["product_name"]=name
-                item["selling_price"]=selling_price
-                item["discount"]=discount
-                item["regular_price"]=regular_price
-                
-                if score == 100:
-                    item['match_type'] = "NAME EXACT"
-                    item['score'] = score
-                    exact = item
-                    break
-                elif 70 <= score < 100:
-                    item['match_type'] = "NAME PARTIAL"
-                    item['score'] = score
-                    partial.append(item)
-
-           
-
-            if exact:
-                logging.info(exact)
-                try:
-                    self.db[MONGO_COLLECTION_PRODUCTS].insert_one(exact)
-                    logging.info(" Saved exact name match")
-                except: 
-                    pass
-                    
-            elif partial:
-                logging.info(partial)
-                try:
-                    self.db[MONGO_COLLECTION_PRODUCTS].insert_many(partial)
-                    logging.info(f" Saved {len(partial)} partial name matches")
-                except:
-                    pass
-                    
-            else:
-                logging.warning(" No name match found")
-    
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=MATCH_WORKERS) as executor:
+            # Input rows in _id order, a short query per page so no cursor idles
+            for items in input_pages(self.db[MONGO_COLLECTION_INPUT], INPUT_PAGE_SIZE, INPUT_FIELDS):
+                for item in items:
+                    in_flight.append(executor.submit(self.lookup, item))
+                    # Keep a bounded number of rows queued, saved in input order
+                    if len(in_flight) >= MATCH_ROWS_IN_FLIGHT:
+                        self.save(in_flight.popleft())
+            while in_flight:
+                self.save(in_flight.popleft())
+
+        logging.info(f"Search cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+    def lookup(self, item):
+        """Matches of one input row: EAN first, then CNK, then product name"""
+        ean = str(item.get("EAN MASTER", "")).strip()
+        cnk = str(item.get("CNK BELUX", "")).strip()
+        input_name = str(item.get("PRODUCT GENERAL NAME", "")).strip()
+
+        logging.info(f"Processing: {input_name}")
+
+        for code, search_type in ((ean, "EAN"), (cnk, "CNK")):
+            if code:
+                matches = self.match_code(self.cache.get(code) or [], code, search_type)
+                if matches:
+                    return matches
+
+        if input_name:
+            return self.match_name(self.cache.get(input_name) or [], input_name)
+        return []
+
+    def search(self, query):
+        """Result cards of one site search, None unless the page came back"""
+        url = SEARCH_URL.format(q=quote_plus(query))
+        response = self.limiter.request(self.session.get, url, RATE_LIMIT_RETRIES, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            logging.warning(f"Search returned {response.status_code} for {query}")
+            return None
+        return parse_cards(response.text)
+
+    def match_code(self, cards, search_term, search_type):
+        """EAN/CNK: the only result, or the only card mentioning the code"""
+        if len(cards) == 1:
+            logging.info(f" Matched via single {search_type} result")
+            return [match_item(cards[0], f"{search_type} EXACT", **{search_type.lower(): search_term})]
+
+        if len(cards) > 1:
+            matched = [card for card in cards if search_term in card["card_text"]]
+            if len(matched) == 1:
+                logging.info(f"✔ Matched via {search_type} found in exactly one card")
+                return [match_item(matched[0], f"{search_type} IN CARD", **{search_type.lower(): search_term})]
+            logging.warning(f"{search_type} not uniquely identifiable in PLP")
+        return []
+
+    def match_name(self, cards, search_term):
+        """Name: the first exact token_sort match, else every partial one"""
+        candidates = [
+            card for card in cards
+            if card["product_name"] and "api" not in card["product_url"]
+        ]
+        if not candidates:
+            logging.warning(" No name match found")
+            return []
+
+        # All candidates scored in one call instead of one Python call per card
+        scores = process.cdist(
+            [search_term],
+            [card["product_name"] for card in candidates],
+            scorer=fuzz.token_sort_ratio,
+            processor=utils.default_process,
+        )[0]
+        scores = [round(float(score)) for score in scores]
+
+        for card, score in zip(candidates, scores):
+            if score == 100:
+                logging.info(" Matched exact name")
+                return [match_item(card, "NAME EXACT", score=score)]
+
+        partial = [
+            match_item(card, "NAME PARTIAL", score=score)
+            for card, score in zip(candidates, scores)
+            if score >= NAME_PARTIAL_SCORE
+        ]
+        if partial:
+            logging.info(f" Matched {len(partial)} partial names")
+        else:
+            logging.warning(" No name match found")
+        return partial
+
+    def save(self, future):
+        """Queue the matches of one finished row"""
+        try:
+            matches = future.result()
+        except Exception as e:
+            logging.error(f"Lookup failed: {e}")
+            return
+        for match in matches:
+            logging.info(match)
+            self.writer.add(match)
+
     def close(self):
         """Close function for all module object closing"""
+        self.writer.close()
+        self.session.close()
         self.mongo.close()
-       
+
 
 if __name__ == "__main__":
     crawler = Crawler()
     crawler.start()
-    crawler.close()
\ No newline at end of file
+    crawler.close()
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLE_STATUSES = (403, 429, 503)
+
+
+class HostBucket:
+    """Token bucket and AIMD state of one host"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.latency = None  # moving average of healthy response times
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """Per-host token buckets shared by every fetch thread, tuned by AIMD
+
+    acquire() blocks until the host has a token. record() feeds back each
+    outcome: a fast 2xx/3xx/404 adds increase req/s to the host's rate, a
+    throttle status (throttle_statuses), any 5xx or a network error halves
+    it (times decrease), and a response slower than slow_factor times the
+    host's average trims it more gently. Retry-After pauses the host for
+    everyone. Rates stay within [min_rate, max_rate].
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=20.0, burst=1, increase=0.1, decrease=0.5,
+                 slow_factor=2.0, throttle_statuses=THROTTLE_STATUSES):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.throttle_statuses = tuple(throttle_statuses)
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = HostBucket(self.rate, self.burst)
+        return host, bucket
+
+    def acquire(self, url):
+        """Wait for a token of url's host"""
+        while True:
+            with self.lock:
+                _, bucket = self._bucket(url)
+                now = time.monotonic()
+                bucket.refill(now)
+                if now >= bucket.paused_until and bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                wait_for = max(bucket.paused_until - now, (1 - bucket.tokens) / bucket.rate)
+            time.sleep(wait_for)
+
+    def record(self, url, status, latency, retry_after=None):
+        """Adjust url's host from one outcome; status None for a network error"""
+        with self.lock:
+            host, bucket = self._bucket(url)
+            throttled = status is None or status in self.throttle_statuses or status >= 500
+            slow = bucket.latency is not None and latency > bucket.latency * self.slow_factor
+
+            if throttled:
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.tokens = min(bucket.tokens, 0)  # no burst straight after a push-back
+            elif slow:
+                bucket.rate = max(self.min_rate, bucket.rate * (1 + self.decrease) / 2)
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+            if not throttled:
+                bucket.latency = latency if bucket.latency is None else 0.8 * bucket.latency + 0.2 * latency
+            if retry_after:
+                bucket.paused_until = max(bucket.paused_until, time.monotonic() + retry_after)
+            rate = bucket.rate
+
+        if throttled:
+            pause = f", paused {retry_after:.0f}s" if retry_after else ""
+            logging.warning(f"{host} answered {status}: rate down to {rate:.2f} req/s{pause}")
+
+    def request(self, send, url, retries=2, **kwargs):
+        """send(url, **kwargs) under the limiter, retrying throttled responses
+
+        The response of the last attempt is returned whatever its status;
+        the network error of the last attempt is raised.
+        """
+        for attempt in range(retries + 1):
+            self.acquire(url)
+            started = time.monotonic()
+            try:
+                response = send(url, **kwargs)
+            except Exception:
+                self.record(url, None, time.monotonic() - started)
+                if attempt == retries:
+                    raise
+                continue
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.record(url, response.status_code, time.monotonic() - started, retry_after)
+            if response.status_code not in self.throttle_statuses or attempt == retries:
+                return response
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -37,6 +37,28 @@ MONGO_COLLECTION_PRODUCTS = f"{PROJECT_NAME}_products"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"product_data_item"
 
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
+
+# Matching
+MATCH_WORKERS = 16          # input rows looked up at once
+MATCH_ROWS_IN_FLIGHT = 200  # rows queued ahead of the writer
+SEARCH_CACHE_SIZE = 50000   # search result pages kept per normalized query
+NAME_PARTIAL_SCORE = 70     # lowest token_sort_ratio kept as a partial name match
+REQUEST_TIMEOUT = 30
+
+# Per-host rate limit shared by the workers; adapts between min and max
+# from response latency and 429/403/5xx answers
+RATE_LIMIT_START = 2        # req/s to begin with
+RATE_LIMIT_MIN = 0.2
+RATE_LIMIT_MAX = 15
+RATE_LIMIT_RETRIES = 2      # retries of a throttled request
+
+# Match write batching
+MONGO_BATCH_SIZE = 1000
+MONGO_FLUSH_INTERVAL = 10   # seconds
+
 
 # File settings
 FILE_NAME = f"{PROJECT_NAME}_{YEAR}_{MONTH}_{DAY}_.csv"
@@ -1,9 +1,9 @@
 import time
 import random
 import math
-import requests
 from pymongo import MongoClient
-from settings import logging, BASE_URL, PAGE_SIZE, MAX_RETRIES, headers, MONGO_DB ,MONGO_COLLECTION_PRODUCTS
+from http_session import new_session
+from settings import logging, BASE_URL, PAGE_SIZE, MAX_RETRIES, HTTP_POOL_SIZE, headers, MONGO_DB ,MONGO_COLLECTION_PRODUCTS
 
 class Crawler:
     """Crawling 3M Products"""
@@ -12,6 +12,8 @@ class Crawler:
         # MongoDB connection
         self.mongo = MongoClient('mongodb://localhost:27017/')
         self.db = self.mongo[MONGO_DB]
+        # Listing API has always been fetched without impersonation
+        self.session = new_session(pool_size=HTTP_POOL_SIZE)
     
     def start(self):
         """Requesting Start url"""
@@ -22,7 +24,7 @@ class Crawler:
         
         # First request to get total pages
         params = {"size": PAGE_SIZE, "start": 0}
-        response = requests.get(BASE_URL, params=params, headers=headers)
+        response = self.session.get(BASE_URL, params=params, headers=headers)
         response.raise_for_status()
         data = response.json()
         
@@ -44,7 +46,7 @@ class Crawler:
             while retries < MAX_RETRIES:
                 time.sleep(random.uniform(2, 4))
                 
-                response = requests.get(BASE_URL, params=params, headers=headers)
+                response = self.session.get(BASE_URL, params=params, headers=headers)
                 
                 if response.status_code == 404:
                     logging.info(f"End of products at page={page}")
@@ -100,6 +102,7 @@ class Crawler:
     
     def close(self):
         """Close function for all module object closing"""
+        self.session.close()
         self.mongo.close()
       
 if __name__ == "__main__":
@@ -1,21 +1,54 @@
+import argparse
 import json
-from parsel import Selector
-from curl_cffi import requests
+from extractor import Extractor, parse_html
 from pymongo import MongoClient
-from settings import logging, MONGO_DB,MONGO_COLLECTION_PRODUCTS,MONGO_COLLECTION_DATA,MONGO_COLLECTION_URL_FAILED
+from mongo_writer import BufferedMongoWriter
+from input_pages import input_pages
+from http_session import new_session
+from response_cache import ResponseCache, CachedSession, CacheMiss
+from raw_archive import RawArchive
+from settings import logging, MONGO_DB,MONGO_COLLECTION_PRODUCTS,MONGO_COLLECTION_DATA,MONGO_COLLECTION_URL_FAILED, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL, MONGO_COLLECTION_CHECKPOINT, RESUME, CHECKPOINT_EVERY, INPUT_PAGE_SIZE, HTTP_POOL_SIZE, IMPERSONATE
+from settings import HTTP_CACHE, HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_VARY_HEADERS
+from settings import RAW_ARCHIVE, RAW_ARCHIVE_DIR, RAW_ARCHIVE_PART_BYTES
+
+# XPATH
+INITIAL_DATA_PREFIX = "window.__INITIAL_DATA ="
+PDP_FIELDS = Extractor({
+    "breadcrumbs": "//ol[@class='MMM--breadcrumbs-list']/li//text()",
+    "highlights": "//li[@class='sps2-pdp_details--highlights_item mds-font_paragraph']//text()",
+    "description": "//div[@class='sps2-pdp_details--white_container']//text()",
+    "suggested_applications": "//div[@class='sps2-pdp_details--section']//text()",
+    # only the one script carrying the page state, not every script node
+    "script_tags": f"//script[starts-with(., '{INITIAL_DATA_PREFIX}')]/text()",
+    "images": "//div[@class='sps2-pdp_outerGallery--container']//img/@src",
+})
 
 class Parser:
     """parser"""
     
-    def __init__(self):
+    def __init__(self, replay=False, data_collection=MONGO_COLLECTION_DATA, resume=RESUME):
+        """replay=True reads responses from the response cache only, never the network"""
+        self.replay = replay
+        self.resume = resume and not replay
+        self.failed = 0
         self.mongo = MongoClient('mongodb://localhost:27017/')
         self.db = self.mongo[MONGO_DB]
+        self.writer = BufferedMongoWriter(self.db[data_collection], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+        self.db[data_collection].create_index("pdp_url")
+        self.session = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+        if HTTP_CACHE or replay:
+            cache = ResponseCache(HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_VARY_HEADERS)
+            self.session = CachedSession(self.session, cache, replay)
+        self.archive = RawArchive(RAW_ARCHIVE_DIR, RAW_ARCHIVE_PART_BYTES) if RAW_ARCHIVE and not replay else None
     
     def start(self):
         """start code"""
-        products = self.db[MONGO_COLLECTION_PRODUCTS].find({})
-        
-        for product in products:
+        last_id = None
+        for idx, product in enumerate(self.pending_inputs(), 1):
+            if last_id and idx % CHECKPOINT_EVERY == 0:
+                self.save_checkpoint(last_id)
+            last_id = product["_id"]
+
             url = product.get('url')
             if not url:
                 continue
@@ -30,34 +63,72 @@ class Parser:
             logging.info(f"Parsing: {url}")
             
             try:
-                response = requests.get(url, impersonate="chrome")
+                response = self.session.get(url)
                 if response.status_code == 200:
+                    if self.archive:
+                        self.archive.write(response, url=url, meta=meta)
                     self.parse_item(url, response, meta)
                 else:
+                    self.failed += 1
                     self.db[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'status_code': response.status_code})
+            except CacheMiss:
+                logging.warning(f"Not in response cache, skipped: {url}")
             except Exception as e:
+                self.failed += 1
                 logging.error(f"Error fetching {url}: {e}")
-   
-    
+
+        if last_id:
+            self.save_checkpoint(last_id)
+        if self.resume and self.failed:
+            logging.warning(f"{self.failed} inputs failed; checkpoint held before the first, --resume retries them")
+
+    def pending_inputs(self):
+        """Products not yet parsed, in _id order after the last checkpoint
+
+        Read a short page at a time, so no cursor idles while pages are fetched.
+        """
+        after = None
+        if self.resume:
+            checkpoint = self.db[MONGO_COLLECTION_CHECKPOINT].find_one({"_id": "parser"})
+            if checkpoint:
+                logging.info(f"Resuming after _id {checkpoint['last_id']}")
+                after = checkpoint["last_id"]
+        for products in input_pages(self.db[MONGO_COLLECTION_PRODUCTS], INPUT_PAGE_SIZE, after=after):
+            yield from self.unparsed(products)
+
+    def unparsed(self, products):
+        """Products whose url is not in the data collection yet (all of them unless resuming)"""
+        if not self.resume:
+            return products
+        # Anti-join on the pdp_url index of the data collection
+        urls = [product.get("url") for product in products]
+        saved = {doc["pdp_url"] for doc in self.writer.collection.find({"pdp_url": {"$in": urls}}, {"pdp_url": 1})}
+        return [product for product in products if product.get("url") not in saved]
+
+    def save_checkpoint(self, last_id):
+        """Flush queued items, then record the last processed _id
+
+        Once an input has failed the checkpoint stays where it was, so a
+        resumed run retries that input; the anti-join skips what was saved since.
+        """
+        if not self.resume or self.failed:
+            return
+        self.writer.flush()
+        self.db[MONGO_COLLECTION_CHECKPOINT].update_one(
+            {"_id": "parser"}, {"$set": {"last_id": last_id}}, upsert=True
+        )
+
     def parse_item(self, url, response, meta):
         """item part"""
-        sel = Selector(text=response.text)
-        
-        # XPATH
-        BREADCRUMBS_XPATH = "//ol[@class='MMM--breadcrumbs-list']/li//text()"
-        HIGHLIGHTS_XPATH = "//li[@class='sps2-pdp_details--highlights_item mds-font_paragraph']//text()"
-        DESCRIPTION_XPATH = "//div[@class='sps2-pdp_details--white_container']//text()"
-        SUGGESTED_APP_XPATH = "//div[@class='sps2-pdp_details--section']//text()"
-        SCRIPT_XPATH = "//script/text()"
-        IMAGES_XPATH = "//div[@class='sps2-pdp_outerGallery--container']//img/@src"
+        fields = PDP_FIELDS.extract(parse_html(response.text))
         
         # EXTRACT
-        breadcrumbs_list = sel.xpath(BREADCRUMBS_XPATH).getall()
-        highlights_list = sel.xpath(HIGHLIGHTS_XPATH).getall()
-        description_list = sel.xpath(DESCRIPTION_XPATH).getall()
-        suggested_app_list = sel.xpath(SUGGESTED_APP_XPATH).getall()
-        script_tags = sel.xpath(SCRIPT_XPATH).getall()
-        images_list = sel.xpath(IMAGES_XPATH).getall()
+        breadcrumbs_list = fields["breadcrumbs"]
+        highlights_list = fields["highlights"]
+        description_list = fields["description"]
+        suggested_app_list = fields["suggested_applications"]
+        script_tags = fields["script_tags"]
+        images_list = fields["images"]
         
         # CLEAN
         breadcrumb = " > ".join(breadcrumbs_list).strip() if breadcrumbs_list else ""
@@ -70,7 +141,7 @@ class Parser:
         # Extract classification attributes from script
         classification_attributes = ""
         for script in script_tags:
-            if script.startswith("window.__INITIAL_DATA ="):
+            if script.startswith(INITIAL_DATA_PREFIX):
             
                 json_data = script.replace("window.__INITIAL_DATA = ", "").strip().rstrip(";")
                 data = json.loads(json_data)
@@ -132,10 +203,7 @@ class Parser:
         
         #logging.info(item)
         
-        try:
-            self.db[MONGO_COLLECTION_DATA].insert_one(item)
-        except:
-            pass
+        self.writer.add(item)
     
     def parse_moreimages(self, url, mediasize, size):
         """Get more images from API"""
@@ -151,7 +219,7 @@ class Parser:
         
         logging.info(f"Fetching more images from: {api_url}")
         
-        response = requests.get(api_url, impersonate="chrome")
+        response = self.session.get(api_url)
         
         if response.status_code == 200:
             data = response.json()
@@ -185,7 +253,7 @@ class Parser:
         
         logging.info(f"Fetching documents from: {api_url}")
         
-        response = requests.get(api_url, impersonate="chrome")
+        response = self.session.get(api_url)
         
         if response.status_code == 200:
             data = response.json()
@@ -198,11 +266,25 @@ class Parser:
              
     def close(self):
         """connection close"""
+        self.writer.close()
+        self.session.close()
+        if self.archive:
+            self.archive.close()
         self.mongo.close()
         # self.queue.close()
 
 
 if __name__ == "__main__":
-    parser_obj = Parser()
+    arg_parser = argparse.ArgumentParser(description="3M product parser")
+    arg_parser.add_argument("--replay", action="store_true", help="re-parse cached responses offline")
+    arg_parser.add_argument("--resume", action="store_true", help="skip parsed products and continue after the checkpoint")
+    args = arg_parser.parse_args()
+
+    if args.replay:
+        # Re-parse every product from the cache into a fresh side collection
+        parser_obj = Parser(replay=True, data_collection=f"{MONGO_COLLECTION_DATA}_replay")
+        parser_obj.writer.collection.drop()
+    else:
+        parser_obj = Parser(resume=args.resume or RESUME)
     parser_obj.start()
     parser_obj.close()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from glob import glob
+from response_cache import CachedResponse
+
+PART_PATTERN = "part-*.jsonl.gz"
+
+
+class RawArchive:
+    """Rolling gzip JSONL archive of the responses a parser worked from
+
+    One line per parsed response: url, status, headers, body and the context
+    parse_item needs besides the response (input document, side API data).
+    A new part file is started once part_bytes of records (before
+    compression) went into the current one; parts of an earlier, resumed
+    run are kept.
+    """
+
+    def __init__(self, directory, part_bytes=256 * 1024 ** 2):
+        self.directory = directory
+        self.part_bytes = part_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.part = len(glob(os.path.join(directory, PART_PATTERN)))
+        self.raw = None
+        self.file = None
+        self.part_written = 0
+        self.records = 0
+
+    def write(self, response, **context):
+        """Append one response with its parse context"""
+        record = {
+            "url": str(response.url),
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "body": response.text,
+            "fetched_at": time.time(),
+            "context": context,
+        }
+        line = (json.dumps(record, default=str) + "\n").encode()
+        with self.lock:
+            if self.file is None or self.part_written >= self.part_bytes:
+                self._roll()
+            self.file.write(line)
+            self.part_written += len(line)
+            self.records += 1
+
+    def _roll(self):
+        self._close_part()
+        self.part += 1
+        self.raw = open(os.path.join(self.directory, f"part-{self.part:05d}.jsonl.gz"), "wb")
+        self.file = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=3)
+        self.part_written = 0
+
+    def _close_part(self):
+        if self.file is not None:
+            self.file.close()
+            self.raw.close()
+
+    def close(self):
+        with self.lock:
+            self._close_part()
+            self.file = None
+        logging.info(f"Raw archive: {self.records} responses in {self.directory}")
+
+
+def read_records(directory):
+    """Raw JSON lines of every part, oldest first"""
+    for path in sorted(glob(os.path.join(directory, PART_PATTERN))):
+        try:
+            with gzip.open(path, "rb") as f:
+                yield from f
+        except EOFError:
+            # Last part of a run that was killed mid-write
+            logging.warning(f"{path} is truncated, read up to the break")
+
+
+def record_response(record):
+    """Response object parse_item can read, built from an archive record"""
+    return CachedResponse(
+        record["url"], record["status_code"], record["headers"], record["body"].encode("utf-8"), "utf-8"
+    )
@@ -1,4 +1,5 @@
 from datetime import datetime
+import os
 import calendar
 import logging
 import pytz
@@ -33,6 +34,40 @@ MONGO_DB = f"{PROJECT_NAME}_{iteration}"
 MONGO_COLLECTION_PRODUCTS = f"{PROJECT_NAME}_products"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"{PROJECT_NAME}_data"
+MONGO_COLLECTION_CHECKPOINT = f"{PROJECT_NAME}_checkpoint"
+
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Resume mode: skip inputs already parsed and continue after the checkpoint.
+# Off by default, since the checkpoint is per MONGO_DB; opt in with --resume
+RESUME = False
+CHECKPOINT_EVERY = 100
+
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
+
+# HTTP session
+HTTP_POOL_SIZE = 10        # keep-alive connections per host
+IMPERSONATE = "chrome"   # curl_cffi profile, None for plain requests
+
+# Response cache for parser fetches; `python parser.py --replay` re-parses from it offline.
+# Off in production runs, where a day-old page is a stale price; turn it on for
+# development runs that re-parse the same pages after an XPath change
+HTTP_CACHE = False
+HTTP_CACHE_DIR = "http_cache"
+HTTP_CACHE_TTL = 24 * 60 * 60          # seconds a cached response is reused
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3   # least recently used entries evicted beyond this
+HTTP_CACHE_VARY_HEADERS = ()           # request headers that change the response
+
+# Raw archive of parsed responses per iteration; `python reparse.py` re-extracts from it
+RAW_ARCHIVE = False
+RAW_ARCHIVE_DIR = f"raw_archive/{MONGO_DB}"
+RAW_ARCHIVE_PART_BYTES = 256 * 1024 ** 2   # uncompressed bytes per part file
+REPARSE_WORKERS = os.cpu_count()
+REPARSE_CHUNK = 200                        # records handed to a worker at a time
 
 #crawler config
 PAGE_SIZE = 51
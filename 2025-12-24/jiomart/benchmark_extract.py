@@ -0,0 +1,49 @@
+"""Per-page parse time: parsel with inline XPath vs compiled Extractor
+
+Usage: python benchmark_extract.py saved_pdp.html [rounds]
+"""
+import sys
+import time
+from parsel import Selector
+from extractor import parse_html, first
+from parser import PDP_FIELDS, SPEC_ROW_FIELDS
+
+
+def parse_with_parsel(text):
+    """Extraction as parse_item did it before the Extractor"""
+    sel = Selector(text=text)
+    sel.xpath('//li[@class="jm-breadcrumbs-list-item"]/a/text()').getall()
+    for row in sel.xpath('//tr[@class="product-specifications-table-item"]'):
+        row.xpath('.//th/text()').get()
+        row.xpath('.//td//text()').get()
+    sel.xpath('//div[@id="pdp_description"]//text()').getall()
+    sel.xpath('//img[@class="swiper-thumb-slides-img lazyload"]/@data-src').getall()
+    sel.xpath("//script[contains(text(), 'window.product_variants')]/text()").get()
+
+
+def parse_with_extractor(text):
+    """Extraction as parse_item does it now"""
+    fields = PDP_FIELDS.extract(parse_html(text))
+    for row in fields['spec_rows']:
+        row_data = SPEC_ROW_FIELDS.extract(row)
+        first(row_data['key'])
+        first(row_data['value'])
+
+
+def timed(func, text, rounds):
+    """Average milliseconds per page"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(text)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], encoding="utf-8") as f:
+        page = f.read()
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    parsel_ms = timed(parse_with_parsel, page, rounds)
+    extractor_ms = timed(parse_with_extractor, page, rounds)
+    print(f"parsel:    {parsel_ms:.2f} ms/page")
+    print(f"extractor: {extractor_ms:.2f} ms/page ({parsel_ms / extractor_ms:.1f}x)")
@@ -1,8 +1,15 @@
 import logging
+import math
+import threading
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pymongo import MongoClient
-from settings import headers, LOCATIONS, get_cookies, get_json_data, MONGO_DB, MONGO_COLLECTION_PRODUCTS
+from http_session import new_session
+from mongo_writer import BufferedMongoWriter
+from rate_limiter import RateLimiter
+from settings import headers, LOCATIONS, get_cookies, get_json_data, MONGO_DB, MONGO_COLLECTION_PRODUCTS, HTTP_POOL_SIZE, IMPERSONATE
+from settings import RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_RETRIES
+from settings import CATEGORIES, CRAWLER_WORKERS, CRAWLER_OFFSET_PAGING, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL
 
 # Configure logging
 logging.basicConfig(
@@ -10,6 +17,8 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+API_URL = 'https://www.jiomart.com/trex/search'
+
 class Crawler:
     """Crawling JioMart Products"""
     
@@ -17,111 +26,215 @@ class Crawler:
         self.mongo_client = MongoClient('mongodb://localhost:27017/')
         self.mongo = self.mongo_client[MONGO_DB]
         self.mongo[MONGO_COLLECTION_PRODUCTS].create_index([("unique_id", 1), ("location_city", 1)],unique=True)
+        self.writer = BufferedMongoWriter(self.mongo[MONGO_COLLECTION_PRODUCTS], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL)
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
+
+        # Location cookies are built once and set on that location's sessions
+        self.cookies = {
+            location['pincode']: get_cookies(location['city'], location['pincode'], location['state_code'])
+            for location in LOCATIONS
+        }
+        self.local = threading.local()
+        self.sessions_lock = threading.Lock()
+        self.sessions = []
     
     def start(self):
-        """Requesting Start url"""
+        """Run every (location, category, page) unit concurrently"""
+        first_pages = [
+            (location, category, {'number': 1})
+            for location in LOCATIONS
+            for category in CATEGORIES
+        ]
         
-        for location in LOCATIONS:
-            meta = {}
-            meta['location'] = location
-            meta['city'] = location['city']
-            meta['pincode'] = location['pincode']
-            meta['state_code'] = location['state_code']
-            meta['page'] = 1
-            
-            logging.info(f"Starting scrape for {location['city']} ({location['pincode']})")
-            
-            api_url = 'https://www.jiomart.com/trex/search'
-            cookies = get_cookies(location['city'], location['pincode'], location['state_code'])
-            json_data = get_json_data()
-            
-            while True:
-                logging.info(f"[{meta['city']}] Fetching page {meta['page']}")
-                
-                response = requests.post(
-                    api_url,
-                    cookies=cookies,
-                    headers=headers,
-                    json=json_data
-                )
-                
-                if response.status_code == 200:
-                    is_next = self.parse_item(response, meta, json_data)
-                    if not is_next:
-                        logging.info(f"[{meta['city']}] Pagination completed")
-                        break
-                    
-                    # pagination crawling
-                    meta["page"] += 1
-                    time.sleep(1) 
-                else:
-                    logging.error(f"[{meta['city']}] Request failed: {response.status_code}")
-                    
-                    break
-            
+        with ThreadPoolExecutor(max_workers=CRAWLER_WORKERS) as executor:
+            in_flight = {executor.submit(self.fetch_page, *unit): unit for unit in first_pages}
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    location, category, page = in_flight.pop(future)
+                    data = future.result()
+                    if data is None:
+                        continue
+                    # Each page may open further pages of its location and category
+                    for next_page in self.parse_item(data, location, category, page):
+                        unit = (location, category, next_page)
+                        in_flight[executor.submit(self.fetch_page, *unit)] = unit
+        
+        logging.info("Pagination completed")
+    
+    def fetch_page(self, location, category, page):
+        """Search response of one unit, None if it failed"""
+        json_data = get_json_data(category)
+        if 'offset' in page:
+            json_data['offset'] = page['offset']
+        if 'token' in page:
+            json_data['pageToken'] = page['token']
+        
+        logging.info(f"[{location['city']}/{category}] Fetching page {page['number']}")
+        try:
+            response = self.limiter.request(
+                self.get_session(location).post,
+                API_URL,
+                RATE_LIMIT_RETRIES,
+                headers=headers,
+                json=json_data
+            )
+        except Exception as e:
+            logging.error(f"[{location['city']}/{category}] Page {page['number']} failed: {e}")
+            return None
+        
+        if response.status_code != 200:
+            logging.error(f"[{location['city']}/{category}] Request failed: {response.status_code}")
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            logging.error(f"[{location['city']}/{category}] Page {page['number']} is not JSON: {e}")
+            return None
+    
+    def get_session(self, location):
+        """This worker thread's session for a location, cookies set once
+
+        curl_cffi sessions are not thread safe, so each thread keeps one per
+        location; cookies the site sets are reused on later pages.
+        """
+        sessions = getattr(self.local, "sessions", None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        
+        session = sessions.get(location['pincode'])
+        if session is None:
+            session = sessions[location['pincode']] = new_session(IMPERSONATE, HTTP_POOL_SIZE)
+            session.cookies.update(self.cookies[location['pincode']])
+            with self.sessions_lock:
+                self.sessions.append(session)
+        return session
     
-    def parse_item(self, response, meta, json_data):
-        """item part"""
-        data = response.json()
+    def parse_item(self, data, location, category, page):
+        """item part; returns the pages this one opens"""
+        tag = f"{location['city']}/{category}"
         
         # Extract products
         products = data.get("results", [])
         
         if products:
-            for product in products:
-                variants = product.get("product", {}).get("variants", [])
-                for variant in variants:
-                    unique_id=variant.get("id") if variants else None
-                    product_name=variant.get("title")
-                    brand=variant.get("brands", [""])[0] if variant else None
-                    url=variant.get("uri") if variant else None
-                    food_type=variant.get("attributes", {}).get("food_type", {}).get("text") if variant else None
-                    size=variant.get("sizes",[]
-                                     )
-                    # ITEM YIELD
-                    item = {}
-                    item['unique_id'] = unique_id
-                    item['retailer_name'] = "jiomart"
-                    item['extraction_date'] = time.strftime("%Y-%m-%d")
-                    item['location_city'] = meta['city']
-                    item['location_pincode'] = meta['pincode']
-                    item['location_state'] = meta['state_code']
-                    item['product_name'] = product_name
-                    item["size"]=size
-                    item['brand'] = brand
-                    item['url'] = url
-                    item['food_type'] = food_type
-                    
-                    logging.info(item)
-                    
-                    #Save to MongoDB (optional)
-                    try:
-                        self.mongo[MONGO_COLLECTION_PRODUCTS].insert_one(item)
-                    except Exception as e:
-                        pass
-
-            
-            # Extract next page token
-            next_page_token = data.get("nextPageToken")
-            
-            if not next_page_token:
-                logging.info(f"[{meta['city']}] No nextPageToken found, reached last page.")
-                return False
+            for item in search_items(data, location):
+                logging.info(item)
+                
+                # Buffered insert; the unique index drops repeats
+                self.writer.add(item)
             
-            # Update pageToken for next request
-            json_data["pageToken"] = next_page_token
-            return True
+            return self.next_pages(data, tag, page)
+        
+        logging.warning(f"[{tag}] No products found")
+        if 'first_ids' in page:
+            # An empty offset probe doesn't prove offsets work either
+            return self.after_offset_probe(data, tag, page)
+        return []
+    
+    def next_pages(self, data, tag, page):
+        """Pages to fetch after this one
+
+        Pages follow nextPageToken one after another. With offset paging,
+        page 1 first fetches page 2 by offset as a probe, and only once that
+        is known to work does totalSize open every remaining page at once.
+        """
+        total_size = data.get("totalSize")
+        if page['number'] == 1 and CRAWLER_OFFSET_PAGING and total_size:
+            page_size = get_json_data()['pageSize']
+            page_count = math.ceil(int(total_size) / page_size)
+            logging.info(f"[{tag}] {total_size} products over {page_count} pages")
+            if page_count > 1:
+                return [{
+                    'number': 2,
+                    'offset': page_size,
+                    'page_count': page_count,
+                    'first_ids': result_ids(data),
+                    'first_token': data.get("nextPageToken"),
+                }]
+            return []
+        if 'first_ids' in page:
+            return self.after_offset_probe(data, tag, page)
+        if 'offset' in page:
+            return []
+        
+        # Extract next page token
+        next_page_token = data.get("nextPageToken")
         
-        logging.warning(f"[{meta['city']}] No products found")
-        return False
+        if not next_page_token:
+            logging.info(f"[{tag}] No nextPageToken found, reached last page.")
+            return []
+        return [{'number': page['number'] + 1, 'token': next_page_token}]
+    
+    def after_offset_probe(self, data, tag, page):
+        """Pages after the page 2 offset probe
+
+        An API that ignores offset answers page 1 again, so the remaining
+        offsets are only opened when page 2 shares no result with page 1;
+        otherwise paging falls back to page 1's nextPageToken.
+        """
+        ids = result_ids(data)
+        if ids and set(ids).isdisjoint(page['first_ids']):
+            page_size = page['offset']
+            return [
+                {'number': number, 'offset': (number - 1) * page_size}
+                for number in range(3, page['page_count'] + 1)
+            ]
+        
+        logging.warning(f"[{tag}] Offset page 2 repeats page 1, falling back to nextPageToken")
+        if not page['first_token']:
+            return []
+        return [{'number': 2, 'token': page['first_token']}]
     
     def close(self):
         """Close function for all module object closing"""
+        self.writer.close()
+        for session in self.sessions:
+            session.close()
         self.mongo_client.close()
    
 
 
+def result_ids(data):
+    """Variant ids of one search response, in result order"""
+    return [
+        variant.get("id")
+        for product in data.get("results", [])
+        for variant in product.get("product", {}).get("variants", [])
+    ]
+
+
+def search_items(data, location):
+    """Items of one search response for a location"""
+    items = []
+    for product in data.get("results", []):
+        variants = product.get("product", {}).get("variants", [])
+        for variant in variants:
+            unique_id=variant.get("id") if variants else None
+            product_name=variant.get("title")
+            brand=variant.get("brands", [""])[0] if variant else None
+            url=variant.get("uri") if variant else None
+            food_type=variant.get("attributes", {}).get("food_type", {}).get("text") if variant else None
+            size=variant.get("sizes",[]
+                             )
+            # ITEM YIELD
+            item = {}
+            item['unique_id'] = unique_id
+            item['retailer_name'] = "jiomart"
+            item['extraction_date'] = time.strftime("%Y-%m-%d")
+            item['location_city'] = location['city']
+            item['location_pincode'] = location['pincode']
+            item['location_state'] = location['state_code']
+            item['product_name'] = product_name
+            item["size"]=size
+            item['brand'] = brand
+            item['url'] = url
+            item['food_type'] = food_type
+            items.append(item)
+    return items
+
+
 if __name__ == "__main__":
     crawler = Crawler()
     crawler.start()
-    crawler.close()
\ No newline at end of file
+    crawler.close()
@@ -1,15 +1,45 @@
-
 import re
 import csv
-from re import sub
 from html import unescape
 from pymongo import MongoClient
+from csv_export import open_export
 from settings import (
     MONGO_DB,
     MONGO_COLLECTION_DATA,
-    FILE_NAME
+    FILE_NAME,
+    EXPORT_BATCH_SIZE,
+    EXPORT_BUFFER_SIZE,
+    EXPORT_GZIP,
 )
 
+TAG_OR_SPACE_RE = re.compile(r"<.*?>|\s+")
+GRAMMAGE_RE = re.compile(r"([\d.]+)\s*(kg|g|gm|gram|grams)")
+
+# Only the fields the rows are built from
+EXPORT_FIELDS = {
+    "_id": 0,
+    "unique_id": 1,
+    "product_name": 1,
+    "brand": 1,
+    "product_type": 1,
+    "item_form": 1,
+    "url": 1,
+    "regular_price": 1,
+    "selling_price": 1,
+    "discount_percentage": 1,
+    "breadcrumbs": 1,
+    "specifications.Net Weight": 1,
+    "specifications.Net Quantity": 1,
+    "variants/flavour": 1,
+    "description": 1,
+    "images": 1,
+    "food_type": 1,
+    "extraction_date": 1,
+    "country_of_origin": 1,
+    "allergens": 1,
+    "ingredients": 1,
+}
+
 csv_headers = [
     "unique_id",
     "retailer_name",
@@ -68,12 +98,15 @@ class Export:
     def clean_text(self, text):
         if not text:
             return ""
-        return sub(r"<.*?>|\s+", " ", unescape(str(text))).strip()
+        return TAG_OR_SPACE_RE.sub(" ", unescape(str(text))).strip()
 
     def start(self):
         self.writer.writerow(csv_headers)
 
-        for item in self.mongo[MONGO_COLLECTION_DATA].find():
+        cursor = self.mongo[MONGO_COLLECTION_DATA].find(
+            {}, EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE, no_cursor_timeout=True
+        )
+        for item in cursor:
 
             # ---------- BASIC ----------
             unique_id = item.get("unique_id", "")
@@ -117,7 +150,7 @@ class Export:
                 or item.get("specifications", {}).get("Net Quantity", "")
             )
 
-            match = re.search(r"([\d.]+)\s*(kg|g|gm|gram|grams)", size_text.lower())
+            match = GRAMMAGE_RE.search(size_text.lower())
             grammage_quantity = match.group(1) if match else ""
             grammage_unit = match.group(2) if match else ""
 
@@ -190,9 +223,11 @@ class Export:
 
             self.writer.writerow([row.get(h, "") for h in csv_headers])
 
+        cursor.close()
+
 
 if __name__ == "__main__":
-    with open(FILE_NAME, "w", newline="", encoding="utf-8") as f:
+    with open_export(FILE_NAME, EXPORT_GZIP, EXPORT_BUFFER_SIZE) as f:
         writer = csv.writer(f, quotechar='"')
         export = Export(writer)
         export.start()
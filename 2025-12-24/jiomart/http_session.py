@@ -0,0 +1,25 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def new_session(impersonate=None, pool_size=10):
+    """Keep-alive session shared by crawler, parser and category scripts
+
+    With an impersonation profile (e.g. "chrome", "chrome120") a curl_cffi
+    session is returned that negotiates HTTP/2 over TLS. Otherwise a requests
+    session keeping up to pool_size open connections per host.
+    """
+    if impersonate:
+        from curl_cffi import requests as curl_requests
+        from curl_cffi.const import CurlHttpVersion
+
+        return curl_requests.Session(
+            impersonate=impersonate,
+            http_version=CurlHttpVersion.V2TLS,
+        )
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,64 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ParsePool:
+    """Page extraction in worker processes, off the fetch loop
+
+    extract must be a module-level function taking the raw body (plus any
+    context) and returning an item. submit() queues a page and hands back
+    the items finished so far, in submission order; once max_pending pages
+    are queued it waits for the oldest (backpressure). run() parses one page
+    and waits for it, for fetch threads that save their own items.
+
+    Workers come from a forkserver (spawn where there is none), never from a
+    fork of the parser itself: by the time the pool starts its first worker
+    the parser already runs fetch threads and holds a MongoClient, and a
+    forked child could inherit one of their locks held.
+    """
+
+    def __init__(self, extract, workers=None, max_pending=None):
+        self.extract = extract
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending or self.workers * 4
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+        self.pending = deque()
+        self.failed = 0
+
+    def submit(self, *args):
+        """Queue one page; returns the items finished meanwhile, oldest first"""
+        self.pending.append(self.pool.submit(self.extract, *args))
+        items = []
+        while self.pending and (self.pending[0].done() or len(self.pending) > self.max_pending):
+            items.append(self._result(self.pending.popleft()))
+        return [item for item in items if item is not None]
+
+    def drain(self):
+        """Wait for every queued page; returns their items in submission order"""
+        items = [self._result(future) for future in self.pending]
+        self.pending.clear()
+        return [item for item in items if item is not None]
+
+    def run(self, *args):
+        """Parse one page in a worker process and wait for its item"""
+        return self.pool.submit(self.extract, *args).result()
+
+    def _result(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"Error parsing page: {repr(e)}")
+            return None
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def worker_context():
+    """Start method for parse workers that doesn't fork a threaded parent"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
@@ -1,11 +1,50 @@
+import argparse
 import logging
 import re
 import json
-import time
-import requests
-from parsel import Selector
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pymongo import MongoClient
-from settings import MONGO_DB,MONGO_COLLECTION_PRODUCTS,MONGO_COLLECTION_DATA,MONGO_COLLECTION_URL_FAILED, get_headers_with_location
+from mongo_writer import BufferedMongoWriter
+from input_pages import input_pages
+from http_session import new_session
+from response_cache import ResponseCache, CachedSession, CacheMiss
+from raw_archive import RawArchive
+from parse_pool import ParsePool
+from extractor import Extractor, parse_html, first
+from rate_limiter import RateLimiter
+from settings import (
+    MONGO_DB,
+    MONGO_COLLECTION_PRODUCTS,
+    MONGO_COLLECTION_DATA,
+    MONGO_COLLECTION_URL_FAILED,
+    MONGO_COLLECTION_CHECKPOINT,
+    PARSER_WORKERS,
+    PARSER_MAX_PER_HOST,
+    PARSER_TIMEOUT,
+    PARSER_SHARE_PDP,
+    MONGO_BATCH_SIZE,
+    MONGO_FLUSH_INTERVAL,
+    INPUT_PAGE_SIZE,
+    RESUME,
+    CHECKPOINT_EVERY,
+    IMPERSONATE,
+    HTTP_CACHE,
+    HTTP_CACHE_DIR,
+    HTTP_CACHE_TTL,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_CACHE_VARY_HEADERS,
+    RAW_ARCHIVE,
+    RAW_ARCHIVE_DIR,
+    RAW_ARCHIVE_PART_BYTES,
+    PARSE_WORKERS,
+    RATE_LIMIT_START,
+    RATE_LIMIT_MIN,
+    RATE_LIMIT_MAX,
+    RATE_LIMIT_RETRIES,
+    get_headers_with_location,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -13,170 +52,399 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Only the product fields the parser reads
+PRODUCT_FIELDS = {
+    'url': 1,
+    'unique_id': 1,
+    'product_name': 1,
+    'extraction_date': 1,
+    'brand': 1,
+    'food_type': 1,
+    'location_city': 1,
+    'location_pincode': 1,
+    'location_state': 1,
+}
+
+# ========== XPATH DEFINITIONS ==========
+PDP_FIELDS = Extractor({
+    'breadcrumbs': '//li[@class="jm-breadcrumbs-list-item"]/a/text()',
+    'spec_rows': '//tr[@class="product-specifications-table-item"]',
+    'description': '//div[@id="pdp_description"]//text()',
+    'images': '//img[@class="swiper-thumb-slides-img lazyload"]/@data-src',
+    'variants_script': "//script[contains(text(), 'window.product_variants')]/text()",
+})
+SPEC_ROW_FIELDS = Extractor({
+    'key': './/th/text()',
+    'value': './/td//text()',
+})
+VARIANTS_RE = re.compile(r"JSON\.parse\('(.+?)'\)", re.DOTALL)
+
 
 class Parser:
     """Jiomart Product Enrichment Parser"""
     
-    def __init__(self):
-        """Initialize MongoDB connection"""
+    def __init__(self, replay=False, data_collection=MONGO_COLLECTION_DATA, parse_workers=PARSE_WORKERS, resume=RESUME):
+        """Initialize MongoDB connection and HTTP pool
+
+        With replay=True responses come from the response cache only and the
+        network is never touched.
+        """
+        self.replay = replay
+        self.resume = resume and not replay
         self.mongo_client = MongoClient('mongodb://localhost:27017/')
         self.mongo = self.mongo_client[MONGO_DB]
+        self.writer = BufferedMongoWriter(
+            self.mongo[data_collection], MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL
+        )
+        # Lookup index for the resume anti-join
+        self.mongo[data_collection].create_index([("unique_id", 1), ("location", 1)])
+        # Shared PDPs page the products by url
+        if PARSER_SHARE_PDP:
+            self.mongo[MONGO_COLLECTION_PRODUCTS].create_index("url")
+        self.since_checkpoint = 0
+        self.failed = 0
+
+        # Shared keep-alive pool, sized to the per-host concurrency
+        self.session = new_session(IMPERSONATE, PARSER_MAX_PER_HOST)
+        if HTTP_CACHE or replay:
+            cache = ResponseCache(HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_VARY_HEADERS)
+            self.session = CachedSession(self.session, cache, replay)
+        self.archive = RawArchive(RAW_ARCHIVE_DIR, RAW_ARCHIVE_PART_BYTES) if RAW_ARCHIVE and not replay else None
+
+        # HTML and variants JSON are parsed in worker processes, so fetch
+        # threads don't hold the GIL while other downloads are waiting
+        self.parse_pool = ParsePool(extract_item, parse_workers) if parse_workers else None
+
+        self.host_slots = threading.BoundedSemaphore(PARSER_MAX_PER_HOST)
+        self.limiter = RateLimiter(RATE_LIMIT_START, RATE_LIMIT_MIN, RATE_LIMIT_MAX)
+
+        # PDP and price calls of one product run side by side on this pool
+        self.fetch_pool = ThreadPoolExecutor(max_workers=PARSER_MAX_PER_HOST)
     
     def start(self):
         """Start extraction process"""
-        # Fetch all products from input collection
-        products = list(self.mongo[MONGO_COLLECTION_PRODUCTS].find({}))
-        total = len(products)
+        collection = self.mongo[MONGO_COLLECTION_PRODUCTS]
+        total = collection.count_documents({})
         logging.info(f"Found {total} products to process")
+        if PARSER_SHARE_PDP:
+            counted = list(collection.aggregate([{'$group': {'_id': '$url'}}, {'$count': 'urls'}], allowDiskUse=True))
+            total = counted[0]['urls'] if counted else 0
+            logging.info(f"{total} distinct product pages, each fetched once for all locations")
         
-        for idx, product in enumerate(products, 1):
-            url = product.get('url')
-            unique_id = product.get('unique_id')
-            
-            # Get location data from product (if available)
-            location = product.get('location_city')
-            pincode = product.get('location_pincode')
-            statecode = product.get('location_state')
-            
-            if not url or not unique_id:
-                logging.warning(f"[{idx}/{total}] Skipping - missing url or unique_id")
-                continue
-            
-            logging.info(f"[{idx}/{total}] Processing: {url}")
-            
-            try:
-                # Create location-specific headers
-                headers = get_headers_with_location(location, pincode, statecode, url)
-                
-                # Fetch and parse data
-                response = requests.get(url, headers=headers, timeout=15)
-                if response.status_code == 200:
-                    self.parse_item(product, url, unique_id, response, headers)
-                else:
-                    self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'status_code': response.status_code})
-                
-                # Rate limiting
-                time.sleep(1)
-                
-            except Exception as e:
-                #self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'error_message': e}) 
-                pass
-    
-    
-    def parse_item(self, product, url, unique_id, response, headers):
-        """Parse and extract product data"""
-        sel = Selector(text=response.text)
-        
-        # ========== XPATH DEFINITIONS ==========
-        BREADCRUMBS_XPATH = '//li[@class="jm-breadcrumbs-list-item"]/a/text()'
-        SPEC_ROWS_XPATH = '//tr[@class="product-specifications-table-item"]'
-        DESCRIPTION_XPATH = '//div[@id="pdp_description"]//text()'
-        IMAGES_XPATH = '//img[@class="swiper-thumb-slides-img lazyload"]/@data-src'
-        VARIANTS_XPATH="//script[contains(text(), 'window.product_variants')]/text()"
+        in_flight = set()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=PARSER_WORKERS) as executor:
+            for idx, (key, products) in enumerate(self.pending_units(collection), 1):
+                # Keep a bounded number of products queued
+                if len(in_flight) >= PARSER_WORKERS * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self.advance_checkpoint(pending)
+                future = executor.submit(self.process_product, idx, total, products)
+                in_flight.add(future)
+                pending.append((key, future))
+            wait(in_flight)
+        self.advance_checkpoint(pending, final=True)
+        if self.resume and self.failed:
+            logging.warning(f"{self.failed} units failed; checkpoint held before the first, --resume retries them")
+    
+    def pending_units(self, collection):
+        """(checkpoint key, products) of every unit not yet parsed, in key order
 
+        A unit is every location of one url when PDPs are shared (paged by
+        url) or a single product (paged by _id). Products are read a short
+        page at a time, so no cursor idles while units are fetched.
+        """
+        key = 'url' if PARSER_SHARE_PDP else '_id'
+        query = {'url': {'$type': 'string'}} if PARSER_SHARE_PDP else None
+        after = None
+        if self.resume:
+            checkpoint = self.mongo[MONGO_COLLECTION_CHECKPOINT].find_one({'_id': 'parser'})
+            if checkpoint and checkpoint.get('key', '_id') == key:
+                logging.info(f"Resuming after {key} {checkpoint['last_id']}")
+                after = checkpoint['last_id']
+            elif checkpoint:
+                logging.warning(f"Checkpoint is by {checkpoint.get('key', '_id')}, not {key}; starting over")
         
-        # ========== EXTRACT ==========
-        breadcrumbs_list = sel.xpath(BREADCRUMBS_XPATH).getall()
-        spec_rows = sel.xpath(SPEC_ROWS_XPATH)
-        description_list = sel.xpath(DESCRIPTION_XPATH).getall()
-        images_list = sel.xpath(IMAGES_XPATH).getall()
-        variants_script=sel.xpath(VARIANTS_XPATH).get()
+        for page in input_pages(collection, INPUT_PAGE_SIZE, PRODUCT_FIELDS, key, after, query):
+            products = self.unparsed(page)
+            if not PARSER_SHARE_PDP:
+                for product in products:
+                    yield product['_id'], [product]
+                continue
+            # All locations of a url together; a page never splits a url
+            by_url = {}
+            for product in products:
+                by_url.setdefault(product['url'], []).append(product)
+            yield from by_url.items()
+    
+    def unparsed(self, products):
+        """Products not yet saved for their city (all of them unless resuming)"""
+        if not self.resume:
+            return products
+        # Anti-join on the (unique_id, location) index of the data collection
+        saved = {
+            (doc.get('unique_id'), doc.get('location'))
+            for doc in self.writer.collection.find(
+                {'unique_id': {'$in': [p.get('unique_id') for p in products]}}, {'unique_id': 1, 'location': 1}
+            )
+        }
+        return [p for p in products if (p.get('unique_id'), p.get('location_city')) not in saved]
+    
+    def advance_checkpoint(self, pending, final=False):
+        """Checkpoint the newest unit key whose predecessors have all finished
+
+        The checkpoint never moves past a failed unit, so a resumed run
+        retries it; the anti-join skips the units saved after it.
+        """
+        last_id = None
+        while pending and pending[0][1].done():
+            key, future = pending.popleft()
+            if not future.result():
+                self.failed += 1
+            elif not self.failed:
+                last_id = key
+                self.since_checkpoint += 1
         
-        # ========== CLEAN ==========
-        breadcrumbs = " > ".join(breadcrumbs_list).strip() if breadcrumbs_list else ""
+        if self.resume and last_id is not None and (final or self.since_checkpoint >= CHECKPOINT_EVERY):
+            # Items must be in Mongo before the checkpoint moves past them
+            self.writer.flush()
+            self.mongo[MONGO_COLLECTION_CHECKPOINT].update_one(
+                {'_id': 'parser'},
+                {'$set': {'key': 'url' if PARSER_SHARE_PDP else '_id', 'last_id': last_id}},
+                upsert=True,
+            )
+            self.since_checkpoint = 0
+    
+    def process_product(self, idx, total, products):
+        """Fetch the PDP once and the price API per location for one url
+
+        Page content does not change with the location, only the price
+        does, so every location of the url shares one PDP fetch and parse.
+        Returns False if the unit failed and should be retried.
+        """
+        product = products[0]
+        url = product.get('url')
+        unique_id = product.get('unique_id')
         
-        specifications = {}
-        for row in spec_rows:
-            key = row.xpath('.//th/text()').get()
-            value = row.xpath('.//td//text()').get()
-            if key:
-                specifications[key.strip()] = value.strip() if value else ""
+        if not url or not unique_id:
+            logging.warning(f"[{idx}/{total}] Skipping - missing url or unique_id")
+            return True
         
-        description = " ".join(x.strip() for x in description_list).strip() if description_list else ""
-        images = ",".join(images_list) if images_list else ""
+        logging.info(f"[{idx}/{total}] Processing: {url} for {len(products)} location(s)")
         
-        if variants_script:
-            json_text = re.search(r"JSON\.parse\('(.+?)'\)",variants_script,re.DOTALL).group(1)
-
-            data = json.loads(json_text)
-            variants_ = [
-                v["value"]
-                for facet in data
-                if facet["facet_name"] == "Size"
-                for v in facet["facet_values"]
+        try:
+            # Create location-specific headers; the PDP goes out with the first location's
+            location_headers = [
+                get_headers_with_location(p.get('location_city'), p.get('location_pincode'), p.get('location_state'), url)
+                for p in products
+            ]
+            
+            # Fire the price calls while the page downloads
+            price_futures = [
+                self.fetch_pool.submit(self.parse_pricedata, p.get('unique_id'), headers)
+                for p, headers in zip(products, location_headers)
             ]
+            response = self.fetch(url, location_headers[0])
+            prices = [future.result() for future in price_futures]
+
+            if response.status_code == 200:
+                if self.archive:
+                    # One record per page; the body is the same for every location
+                    locations = [{'product': p, 'price_data': price_data} for p, price_data in zip(products, prices)]
+                    self.archive.write(response, url=url, locations=locations)
+                if self.parse_pool:
+                    item = self.parse_pool.run(product, url, unique_id, response.text, prices[0])
+                else:
+                    item = extract_item(product, url, unique_id, response.text, prices[0])
+                self.save_locations(item, products, prices)
+                return True
+            self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'status_code': response.status_code})
+            
+        except CacheMiss:
+            logging.warning(f"[{idx}/{total}] Not in response cache, skipped: {url}")
+            return True
+        except Exception as e:
+            #self.mongo[MONGO_COLLECTION_URL_FAILED].insert_one({'url': url, 'error_message': e}) 
+            logging.error(f"[{idx}/{total}] Error processing {url}: {e}")
+        return False
+    
+    def fetch(self, url, headers):
+        """GET under the per-host concurrency and adaptive rate limit
 
-            variants_string = ", ".join(variants_)
-        else:
-            variants_string=""
+        Cache hits are served first, without a host slot or a rate token.
+        """
+        if isinstance(self.session, CachedSession):
+            cached = self.session.lookup("GET", url, headers=headers)
+            if cached is not None:
+                return cached
+        if self.replay:
+            # Cache reads only, nothing to throttle
+            return self.session.get(url, headers=headers, timeout=PARSER_TIMEOUT)
 
+        with self.host_slots:
+            return self.limiter.request(
+                self.session.get, url, RATE_LIMIT_RETRIES, headers=headers, timeout=PARSER_TIMEOUT
+            )
+    
+    def parse_item(self, products, url, response, prices):
+        """Parse one page and save it for every location of the url"""
+        product = products[0]
+        item = extract_item(product, url, product.get('unique_id'), response.text, prices[0])
+        self.save_locations(item, products, prices)
 
-        # Extract price data
-        price_data = self.parse_pricedata(unique_id, headers)
-        
-        # ========== BUILD ITEM ==========
-        item = {}
-        item["website"] = "Jiomart"
-        item["url"] = url
-        item["unique_id"] = unique_id
-        item["product_name"] = product.get("product_name", "")
-        item["extraction_date"]= product.get("extraction_date", "")
-        item["brand"]= product.get("brand", "")
-        item["breadcrumbs"] = breadcrumbs
-        item["food_type"] = product.get("food_type")
-        item["specifications"] = specifications
-        item["product_type"] = specifications.get("Product Type", "")
-        item["item_form"] = specifications.get("Tea Form", "")
-        item["variants/flavour"] = variants_string
-        item["country_of_origin"] = specifications.get("Country of Origin", "")
-        item["allergens"] = specifications.get("Allergens Included", "")
-        item["ingredients"] = specifications.get("Ingredients", "")
-        item["description"] = description
-        item["images"] = images
-        item["regular_price"] = price_data.get("regular_price", "")
-        item["selling_price"] = price_data.get("selling_price", "")
-        item["discount_percentage"] = price_data.get("discount_percentage", "")
-        item["location"] = product.get("location_city")
-        item["pincode"] = product.get("location_pincode")
-        item["statecode"] = product.get("location_state")
-     
-        
+    def save_locations(self, item, products, prices):
+        """Save an item parsed with the first location, plus a copy per other location"""
+        # Copies are made before saving, which adds _id to the item
+        items = [item] + [
+            localize_item(item, other, price_data)
+            for other, price_data in zip(products[1:], prices[1:])
+        ]
+        for item in items:
+            self.save_item(item)
+
+    def save_item(self, item):
+        """Queue one extracted item for MongoDB"""
         # ========== SAVE TO MONGODB ==========
-        try:
-            self.mongo[MONGO_COLLECTION_DATA].insert_one(item)
-            logging.info(f"Successfully saved: {item}")
-        except Exception as e:
-            logging.error(f"Failed to save {item.get('product_name')} | {repr(e)}")
+        logging.info(f"Queued for save: {item}")
+        self.writer.add(item)
     
     def parse_pricedata(self, unique_id, headers):
         """Extract price data from API"""
         url = f"https://www.jiomart.com/catalog/productdetails/get/{unique_id}"
         
         try:
-            res = requests.get(url, headers=headers, timeout=15)
+            res = self.fetch(url, headers)
             
             if res.status_code != 200:
                 logging.warning(f"Price API returned status {res.status_code}")
                 return {}
             
-            data = res.json()
-            product_data = data.get("data", {})
-            
-            return {
-                "regular_price": product_data.get("mrp", ""),
-                "selling_price": product_data.get("selling_price", ""),
-                "discount_percentage": product_data.get("discount_pct", ""),
-            }
+            return extract_prices(res.json())
         except Exception as e:
             logging.error(f"Error fetching price data: {e}")
             return {}
     
     def close(self):
-        """Close MongoDB connection"""
+        """Close HTTP pool and MongoDB connection"""
+        self.fetch_pool.shutdown()
+        if self.parse_pool:
+            self.parse_pool.close()
+        self.session.close()
+        self.writer.close()
+        if self.archive:
+            self.archive.close()
         self.mongo_client.close()
 
 
+def extract_item(product, url, unique_id, html, price_data):
+    """Fields of one product page; module level so parse workers can run it"""
+    root = parse_html(html)
+    
+    # ========== EXTRACT ==========
+    fields = PDP_FIELDS.extract(root)
+    breadcrumbs_list = fields['breadcrumbs']
+    spec_rows = fields['spec_rows']
+    description_list = fields['description']
+    images_list = fields['images']
+    variants_script = first(fields['variants_script'])
+    
+    # ========== CLEAN ==========
+    breadcrumbs = " > ".join(breadcrumbs_list).strip() if breadcrumbs_list else ""
+    
+    specifications = {}
+    for row in spec_rows:
+        row_data = SPEC_ROW_FIELDS.extract(row)
+        key = first(row_data['key'])
+        value = first(row_data['value'])
+        if key:
+            specifications[key.strip()] = value.strip() if value else ""
+    
+    description = " ".join(x.strip() for x in description_list).strip() if description_list else ""
+    images = ",".join(images_list) if images_list else ""
+    
+    if variants_script:
+        json_text = VARIANTS_RE.search(variants_script).group(1)
+
+        data = json.loads(json_text)
+        variants_ = [
+            v["value"]
+            for facet in data
+            if facet["facet_name"] == "Size"
+            for v in facet["facet_values"]
+        ]
+
+        variants_string = ", ".join(variants_)
+    else:
+        variants_string=""
+
+    
+    # ========== BUILD ITEM ==========
+    item = {}
+    item["website"] = "Jiomart"
+    item["url"] = url
+    item["unique_id"] = unique_id
+    item["product_name"] = product.get("product_name", "")
+    item["extraction_date"]= product.get("extraction_date", "")
+    item["brand"]= product.get("brand", "")
+    item["breadcrumbs"] = breadcrumbs
+    item["food_type"] = product.get("food_type")
+    item["specifications"] = specifications
+    item["product_type"] = specifications.get("Product Type", "")
+    item["item_form"] = specifications.get("Tea Form", "")
+    item["variants/flavour"] = variants_string
+    item["country_of_origin"] = specifications.get("Country of Origin", "")
+    item["allergens"] = specifications.get("Allergens Included", "")
+    item["ingredients"] = specifications.get("Ingredients", "")
+    item["description"] = description
+    item["images"] = images
+    item["regular_price"] = price_data.get("regular_price", "")
+    item["selling_price"] = price_data.get("selling_price", "")
+    item["discount_percentage"] = price_data.get("discount_percentage", "")
+    item["location"] = product.get("location_city")
+    item["pincode"] = product.get("location_pincode")
+    item["statecode"] = product.get("location_state")
+
+    return item
+
+
+def extract_prices(data):
+    """Price fields of one price API response"""
+    product_data = data.get("data", {})
+    return {
+        "regular_price": product_data.get("mrp", ""),
+        "selling_price": product_data.get("selling_price", ""),
+        "discount_percentage": product_data.get("discount_pct", ""),
+    }
+
+
+def localize_item(item, product, price_data):
+    """Copy of a parsed item for another location of the same page"""
+    item = dict(item)
+    item["unique_id"] = product.get("unique_id")
+    item["product_name"] = product.get("product_name", "")
+    item["extraction_date"]= product.get("extraction_date", "")
+    item["brand"]= product.get("brand", "")
+    item["food_type"] = product.get("food_type")
+    item["regular_price"] = price_data.get("regular_price", "")
+    item["selling_price"] = price_data.get("selling_price", "")
+    item["discount_percentage"] = price_data.get("discount_percentage", "")
+    item["location"] = product.get("location_city")
+    item["pincode"] = product.get("location_pincode")
+    item["statecode"] = product.get("location_state")
+    return item
+
+
 if __name__ == "__main__":
-    parser_obj = Parser()
+    arg_parser = argparse.ArgumentParser(description="Jiomart product parser")
+    arg_parser.add_argument("--replay", action="store_true", help="re-parse cached responses offline")
+    arg_parser.add_argument("--resume", action="store_true", help="skip parsed products and continue after the checkpoint")
+    args = arg_parser.parse_args()
+
+    if args.replay:
+        # Re-parse every product from the cache into a fresh side collection
+        parser_obj = Parser(replay=True, data_collection=f"{MONGO_COLLECTION_DATA}_replay")
+        parser_obj.writer.collection.drop()
+    else:
+        parser_obj = Parser(resume=args.resume or RESUME)
     parser_obj.start()
     parser_obj.close()
\ No newline at end of file
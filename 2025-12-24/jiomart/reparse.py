@@ -0,0 +1,88 @@
+"""Re-extract an archived iteration without crawling again
+
+    python reparse.py [--workers N]
+
+Streams RAW_ARCHIVE_DIR (written by parser.py with RAW_ARCHIVE on) through
+Parser.parse_item on a process pool, into a fresh <data>_reparse collection.
+"""
+import argparse
+import json
+import logging
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from pymongo import MongoClient
+from parser import Parser
+from raw_archive import read_records, record_response
+from settings import MONGO_DB, MONGO_COLLECTION_DATA, RAW_ARCHIVE_DIR, REPARSE_WORKERS, REPARSE_CHUNK
+
+REPARSE_COLLECTION = f"{MONGO_COLLECTION_DATA}_reparse"
+
+# One parser per worker process
+worker_parser = None
+
+
+def init_worker():
+    global worker_parser
+    worker_parser = Parser(replay=True, data_collection=REPARSE_COLLECTION, parse_workers=0)
+    # Pool workers exit without atexit hooks; finalizers still run
+    Finalize(worker_parser, worker_parser.close, exitpriority=10)
+
+
+def reparse_chunk(lines):
+    """Parse a chunk of archive lines, then flush this worker's writes"""
+    parsed = failed = 0
+    for line in lines:
+        record = json.loads(line)
+        try:
+            context = record["context"]
+            # Older parts hold one record per location
+            locations = context.get("locations") or [context]
+            worker_parser.parse_item(
+                [location["product"] for location in locations],
+                context["url"],
+                record_response(record),
+                [location["price_data"] for location in locations],
+            )
+            parsed += 1
+        except Exception as e:
+            failed += 1
+            logging.error(f"Error re-parsing {record['url']}: {str(e)}")
+    worker_parser.writer.flush()
+    return parsed, failed
+
+
+def main(workers):
+    # Plain client, closed before the pool forks; workers connect on their own
+    client = MongoClient('mongodb://localhost:27017/')
+    client[MONGO_DB].drop_collection(REPARSE_COLLECTION)
+    client.close()
+
+    lines = read_records(RAW_ARCHIVE_DIR)
+    chunks = iter(lambda: list(islice(lines, REPARSE_CHUNK)), [])
+    parsed = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        in_flight = set()
+        for chunk in chunks:
+            # Keep the archive streaming instead of loading it all
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_parsed, chunk_failed = future.result()
+                    parsed += chunk_parsed
+                    failed += chunk_failed
+            in_flight.add(pool.submit(reparse_chunk, chunk))
+        for future in wait(in_flight).done:
+            chunk_parsed, chunk_failed = future.result()
+            parsed += chunk_parsed
+            failed += chunk_failed
+
+    logging.info(f"Re-parsed {parsed} responses into {REPARSE_COLLECTION}, {failed} failed")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Re-extract Jiomart products from the raw archive")
+    arg_parser.add_argument("--workers", type=int, default=REPARSE_WORKERS)
+    args = arg_parser.parse_args()
+    main(args.workers)
@@ -1,4 +1,5 @@
 from datetime import datetime
+import os
 import time
 import calendar
 import logging
@@ -29,11 +30,53 @@ WEEK = (int(DAY) - 1) // 7 + 1
 
 FILE_NAME = f"{PROJECT_NAME}_{iteration}.csv"
 
+# CSV export
+EXPORT_BATCH_SIZE = 5000               # documents per cursor round trip
+EXPORT_BUFFER_SIZE = 1024 * 1024       # bytes buffered before each disk write
+EXPORT_GZIP = False                    # write FILE_NAME.gz instead of plain csv
+
 # Mongo db and collections
 MONGO_DB = f"{PROJECT_NAME}_{iteration}"
 MONGO_COLLECTION_PRODUCTS= f"{PROJECT_NAME}_products"
 MONGO_COLLECTION_URL_FAILED = f"{PROJECT_NAME}_url_failed"
 MONGO_COLLECTION_DATA = f"{PROJECT_NAME}_data"
+MONGO_COLLECTION_CHECKPOINT = f"{PROJECT_NAME}_checkpoint"
+
+# Mongo write batching
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Input pages: inputs read per query, each page read in full before any
+# network work so no server cursor sits idle past its 10 minute timeout
+INPUT_PAGE_SIZE = 200
+
+# Resume mode: skip inputs already parsed and continue after the checkpoint.
+# Off by default, since the checkpoint is per MONGO_DB; opt in with --resume
+RESUME = False
+CHECKPOINT_EVERY = 100
+
+# HTTP session
+HTTP_POOL_SIZE = 10        # keep-alive connections per host
+IMPERSONATE = None       # curl_cffi profile, None for plain requests
+
+# Response cache for parser fetches; `python parser.py --replay` re-parses from it offline.
+# Off in production runs, where a day-old page is a stale price; turn it on for
+# development runs that re-parse the same pages after an XPath change
+HTTP_CACHE = False
+HTTP_CACHE_DIR = "http_cache"
+HTTP_CACHE_TTL = 24 * 60 * 60          # seconds a cached response is reused
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3   # least recently used entries evicted beyond this
+HTTP_CACHE_VARY_HEADERS = ("pin",)     # request headers that change the response
+
+# Raw archive of parsed responses per iteration; `python reparse.py` re-extracts from it
+RAW_ARCHIVE = False
+RAW_ARCHIVE_DIR = f"raw_archive/{MONGO_DB}"
+RAW_ARCHIVE_PART_BYTES = 256 * 1024 ** 2   # uncompressed bytes per part file
+REPARSE_WORKERS = os.cpu_count()
+REPARSE_CHUNK = 200                        # records handed to a worker at a time
+
+# Parse stage: page extraction runs in worker processes, fetch threads only wait on I/O
+PARSE_WORKERS = os.cpu_count()             # 0 parses inline on the fetch threads
 
 """Settings file for JioMart crawler"""
 
@@ -68,6 +111,11 @@ LOCATIONS = [
     }
 ]
 
+# Crawl scheduler: every (location, category, page) is a separate unit on one pool
+CATEGORIES = ["29009"]
+CRAWLER_WORKERS = 8
+CRAWLER_OFFSET_PAGING = False  # fan pages out by offset once page 2 proves the API honours it
+
 def get_cookies(city, pincode, state_code):
     """Generate cookies with location-specific values"""
     return {
@@ -87,7 +135,7 @@ def get_cookies(city, pincode, state_code):
         '__tr_luptv': '1767675541770',
     }
 
-def get_json_data():
+def get_json_data(category_id="29009"):
     """Generate base JSON data for the request"""
     return {
         'pageSize': 50,
@@ -157,17 +205,29 @@ def get_json_data():
         ],
         'branch': 'projects/sr-project-jiomart-jfront-prod/locations/global/catalogs/default_catalog/branches/0',
         'pageCategories': [
-            '29009',
+            category_id,
         ],
         'userInfo': {
             'userId': None,
         },
         'orderBy': 'attributes.popularity desc',
-        'filter': 'attributes.status:ANY("active") AND attributes.category_ids:ANY("29009") AND (attributes.available_regions:ANY("TXCF", "PANINDIAGROCERIES")) AND (attributes.inv_stores_1p:ANY("ALL", "T7GZ") OR attributes.inv_stores_3p:ANY("ALL", "groceries_zone_non-essential_services", "general_zone", "groceries_zone_essential_services"))',
+        'filter': f'attributes.status:ANY("active") AND attributes.category_ids:ANY("{category_id}") AND (attributes.available_regions:ANY("TXCF", "PANINDIAGROCERIES")) AND (attributes.inv_stores_1p:ANY("ALL", "T7GZ") OR attributes.inv_stores_3p:ANY("ALL", "groceries_zone_non-essential_services", "general_zone", "groceries_zone_essential_services"))',
         'visitorId': 'anonymous-16b88074-4641-4f8e-b5f9-c4e9141e3536',
     }
 
 # parser config
+PARSER_WORKERS = 8                 # products in flight at once
+PARSER_MAX_PER_HOST = 8            # open connections to www.jiomart.com
+PARSER_TIMEOUT = 15
+PARSER_SHARE_PDP = True            # one PDP fetch per url for all locations, price API per location
+
+# Per-host rate limit shared by all workers; adapts between min and max
+# from response latency and 429/403/5xx answers
+RATE_LIMIT_START = 4               # req/s per host to begin with
+RATE_LIMIT_MIN = 0.5
+RATE_LIMIT_MAX = 16
+RATE_LIMIT_RETRIES = 2             # retries of a throttled request
+
 PARSER_HEADERS = {
     'accept': 'application/json, text/javascript, */*; q=0.01',
     'accept-language': 'en-GB,en-US;q=0.9,en;q=0.8',
@@ -0,0 +1,18 @@
+from hashlib import sha1
+from scrapy.utils.request import RequestFingerprinter
+
+
+class LocationFingerprinter(RequestFingerprinter):
+    """Request fingerprint that also covers meta["location_key"]
+
+    Sites that localize through cookies send the same url and body for every
+    location, so without the key the dupefilter drops every location after
+    the first and the HTTP cache serves one location's response to another.
+    """
+
+    def fingerprint(self, request):
+        fingerprint = super().fingerprint(request)
+        location_key = request.meta.get("location_key")
+        if location_key is None:
+            return fingerprint
+        return sha1(fingerprint + str(location_key).encode()).digest()
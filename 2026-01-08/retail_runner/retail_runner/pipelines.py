@@ -0,0 +1,93 @@
+import logging
+import threading
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from twisted.internet import defer, task, threads
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedMongoPipeline:
+    """Upsert items in unordered bulk writes run off the reactor thread
+
+    A spider names its target with `mongo_db`, `mongo_collection` and
+    `mongo_key` (the fields identifying one document). Items are buffered and
+    written every MONGO_BATCH_SIZE items or MONGO_FLUSH_INTERVAL seconds, so
+    Mongo round trips never block the downloader.
+    """
+
+    def __init__(self, mongo_uri, batch_size, flush_interval):
+        self.mongo_uri = mongo_uri
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.writes = set()
+        self.stats = {"upserted": 0, "modified": 0, "failed": 0}
+        self.stats_lock = threading.Lock()  # batches finish on several reactor threads
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            mongo_uri=settings.get("MONGO_URI"),
+            batch_size=settings.getint("MONGO_BATCH_SIZE", 500),
+            flush_interval=settings.getfloat("MONGO_FLUSH_INTERVAL", 5),
+        )
+
+    def open_spider(self, spider):
+        self.client = MongoClient(self.mongo_uri)
+        self.collection = self.client[spider.mongo_db][spider.mongo_collection]
+        self.key = spider.mongo_key
+        self.collection.create_index([(field, 1) for field in self.key], unique=True)
+        self.flusher = task.LoopingCall(self.flush)
+        self.flusher.start(self.flush_interval, now=False)
+
+    def process_item(self, item, spider):
+        doc = dict(item)
+        self.buffer.append(UpdateOne({field: doc.get(field) for field in self.key}, {"$set": doc}, upsert=True))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        return item
+
+    def flush(self):
+        """Hand everything buffered so far to a reactor thread"""
+        if not self.buffer:
+            return
+        ops, self.buffer = self.buffer, []
+        write = threads.deferToThread(self._write, ops)
+        self.writes.add(write)
+        write.addBoth(self._written, write)
+
+    def _write(self, ops):
+        failed = []
+        try:
+            result = self.collection.bulk_write(ops, ordered=False)
+            upserted, modified = result.upserted_count, result.modified_count
+        except BulkWriteError as e:
+            # ordered=False keeps going past bad docs, so only these are lost
+            details = e.details
+            upserted, modified = details.get("nUpserted", 0), details.get("nModified", 0)
+            failed = details.get("writeErrors", [])
+            for error in failed:
+                logger.error(f"Mongo upsert failed: {error.get('errmsg')}")
+        with self.stats_lock:
+            self.stats["upserted"] += upserted
+            self.stats["modified"] += modified
+            self.stats["failed"] += len(failed)
+
+    def _written(self, result, write):
+        self.writes.discard(write)
+        if isinstance(result, Failure):
+            logger.error(f"Mongo batch failed: {result.getErrorMessage()}")
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        self.flusher.stop()
+        self.flush()
+        yield defer.DeferredList(list(self.writes))
+        self.client.close()
+        logger.info(
+            f"{self.collection.name}: upserted {self.stats['upserted']}, "
+            f"modified {self.stats['modified']}, failed {self.stats['failed']}"
+        )
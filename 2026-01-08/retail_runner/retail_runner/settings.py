@@ -0,0 +1,72 @@
+# Scrapy settings for retail_runner project
+#
+# Hosts the crawler/parser stages of the retail pipelines as spiders so they
+# share one scheduler: AutoThrottle adapts the delay to each site's latency,
+# per-domain concurrency caps every host, the HTTP cache keeps raw responses
+# for re-parsing and items are upserted in batches by BatchedMongoPipeline.
+
+BOT_NAME = "retail_runner"
+
+SPIDER_MODULES = ["retail_runner.spiders"]
+NEWSPIDER_MODULE = "retail_runner.spiders"
+
+ROBOTSTXT_OBEY = False
+
+DEFAULT_REQUEST_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en-US;q=0.9,en;q=0.8",
+}
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+# Concurrency: global ceiling, per-host cap
+CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
+DOWNLOAD_DELAY = 0.25            # floor AutoThrottle never goes below
+DOWNLOAD_TIMEOUT = 30
+
+# AutoThrottle: back off when a site slows down, speed up when it doesn't
+AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_START_DELAY = 1
+AUTOTHROTTLE_MAX_DELAY = 30
+AUTOTHROTTLE_TARGET_CONCURRENCY = 4.0   # average requests in flight per host
+AUTOTHROTTLE_DEBUG = False
+
+# Retries
+RETRY_ENABLED = True
+RETRY_TIMES = 3
+RETRY_HTTP_CODES = [408, 429, 500, 502, 503, 504, 522, 524]
+
+# HTTP cache: re-running a parser after an XPath change reads from disk.
+# Off in production crawls; enable per run with -s HTTPCACHE_ENABLED=True
+HTTPCACHE_ENABLED = False
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_EXPIRATION_SECS = 24 * 60 * 60
+HTTPCACHE_IGNORE_HTTP_CODES = [403, 408, 429, 500, 502, 503, 504]
+HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_GZIP = True
+
+# Pipelines
+ITEM_PIPELINES = {
+    "retail_runner.pipelines.BatchedMongoPipeline": 300,
+}
+
+# MongoDB
+MONGO_URI = "mongodb://localhost:27017/"
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5  # seconds
+
+# Resume mode: parser spiders skip inputs already in their data collection.
+# Opt in per run with -s RESUME=True
+RESUME = False
+
+# Parser spider inputs are read in short _id pages, one query each, so no
+# cursor sits idle (and gets killed) while Scrapy works through the requests
+INPUT_PAGE_SIZE = 200
+
+REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
+# Location-aware fingerprints keep per-location requests apart in the
+# dupefilter and the HTTP cache
+REQUEST_FINGERPRINTER_CLASS = "retail_runner.fingerprint.LocationFingerprinter"
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+FEED_EXPORT_ENCODING = "utf-8"
+LOG_LEVEL = "INFO"
@@ -0,0 +1,115 @@
+import scrapy
+from pymongo import MongoClient
+from retail_runner.standalone import load_project
+
+# Settings, listing XPaths, PDP extraction and input paging of the standalone halfords project
+halfords = load_project("2025-11-21/halfords", "settings", "crawler", "parser", "input_pages")
+MONGO_DB = halfords.settings.MONGO_DB
+MONGO_COLLECTION_CATEGORY = halfords.settings.MONGO_COLLECTION_CATEGORY
+MONGO_COLLECTION_PRODUCTS = halfords.settings.MONGO_COLLECTION_PRODUCTS
+MONGO_COLLECTION_DATA = halfords.settings.MONGO_COLLECTION_DATA
+
+# XPATH
+DEEPER_SUBCAT_XPATH = halfords.crawler.DEEPER_SUBCAT_XPATH
+PRODUCT_XPATH = halfords.crawler.PRODUCT_XPATH
+LOADMORE_XPATH = halfords.crawler.LOADMORE_XPATH
+
+
+class HalfordsCrawlerSpider(scrapy.Spider):
+    """Category listings → product urls (halfords crawler.py)"""
+
+    name = "halfords_crawler"
+    allowed_domains = ["www.halfords.com"]
+
+    mongo_db = MONGO_DB
+    mongo_collection = MONGO_COLLECTION_PRODUCTS
+    mongo_key = ("url",)
+
+    def start_requests(self):
+        client = MongoClient(self.settings.get("MONGO_URI"))
+        try:
+            category_doc = client[MONGO_DB][MONGO_COLLECTION_CATEGORY].find_one()
+        finally:
+            client.close()
+        categories = category_doc.get("categories", {}) if category_doc else {}
+
+        if not categories:
+            self.logger.error("No categories found in database")
+            return
+
+        # Every sub-sub-category is a listing or expands into deeper ones
+        for cat, cat_data in categories.items():
+            for sub, sub_data in cat_data.get("subcategories", {}).items():
+                for subsub, subsub_data in sub_data.get("sub_subcategories", {}).items():
+                    yield scrapy.Request(
+                        subsub_data["url"],
+                        callback=self.parse_category,
+                        cb_kwargs={"path": f"{cat} > {sub} > {subsub}", "leaf": False},
+                    )
+
+    def parse_category(self, response, path, leaf):
+        """Expand a category into deeper listings or walk its pagination"""
+        if not leaf:
+            more_subcats = response.xpath(DEEPER_SUBCAT_XPATH).getall()
+            if more_subcats:
+                self.logger.info(f"Found {len(more_subcats)} deeper categories in {path}")
+                for link in more_subcats:
+                    child_path = f"{path} > {link.rstrip('/').split('/')[-1]}"
+                    yield response.follow(
+                        link, callback=self.parse_category, cb_kwargs={"path": child_path, "leaf": True}
+                    )
+                return
+
+        yield from self.parse_listing(response, path)
+
+    def parse_listing(self, response, path):
+        """Product urls of one page, then the "load more" page"""
+        product_links = response.xpath(PRODUCT_XPATH).getall()
+        if not product_links:
+            self.logger.info(f"[{path}] No products found on this page")
+            return
+
+        for url in product_links:
+            yield {"url": url}
+
+        next_page = response.xpath(LOADMORE_XPATH).get()
+        if next_page:
+            yield response.follow(next_page, callback=self.parse_listing, cb_kwargs={"path": path})
+
+
+class HalfordsParserSpider(scrapy.Spider):
+    """Product pages → product data (halfords parser.py)"""
+
+    name = "halfords_parser"
+    allowed_domains = ["www.halfords.com"]
+
+    mongo_db = MONGO_DB
+    mongo_collection = MONGO_COLLECTION_DATA
+    mongo_key = ("url",)
+
+    def start_requests(self):
+        client = MongoClient(self.settings.get("MONGO_URI"))
+        db = client[MONGO_DB]
+        try:
+            pages = halfords.input_pages.input_pages(
+                db[MONGO_COLLECTION_PRODUCTS], self.settings.getint("INPUT_PAGE_SIZE", 200), {"url": 1}
+            )
+            for page in pages:
+                for url_doc in self.unparsed(db, page):
+                    # The saved url, not the post-redirect one, keys the item
+                    yield scrapy.Request(url_doc["url"], callback=self.parse_item, cb_kwargs={"url": url_doc["url"]})
+        finally:
+            client.close()
+
+    def unparsed(self, db, url_docs):
+        """URLs of one page without a saved item (all of them unless resuming)"""
+        if not self.settings.getbool("RESUME"):
+            return url_docs
+        # Anti-join on the unique url index of the data collection
+        urls = [url_doc["url"] for url_doc in url_docs]
+        saved = {doc["url"] for doc in db[MONGO_COLLECTION_DATA].find({"url": {"$in": urls}}, {"url": 1})}
+        return [url_doc for url_doc in url_docs if url_doc["url"] not in saved]
+
+    def parse_item(self, response, url):
+        """Item part"""
+        yield halfords.parser.extract_item(url, response.text)
@@ -0,0 +1,154 @@
+import json
+import scrapy
+from pymongo import MongoClient
+from retail_runner.standalone import load_project
+
+# Settings, search items, PDP extraction and input paging of the standalone jiomart project
+jiomart = load_project("2025-12-24/jiomart", "settings", "crawler", "parser", "input_pages")
+MONGO_DB = jiomart.settings.MONGO_DB
+MONGO_COLLECTION_PRODUCTS = jiomart.settings.MONGO_COLLECTION_PRODUCTS
+MONGO_COLLECTION_DATA = jiomart.settings.MONGO_COLLECTION_DATA
+PRODUCT_FIELDS = jiomart.parser.PRODUCT_FIELDS
+
+SEARCH_API_URL = jiomart.crawler.API_URL
+PRICE_API_URL = "https://www.jiomart.com/catalog/productdetails/get/{}"
+
+
+class JiomartCrawlerSpider(scrapy.Spider):
+    """Search API pages per location → products (jiomart crawler.py)"""
+
+    name = "jiomart_crawler"
+    allowed_domains = ["www.jiomart.com"]
+
+    mongo_db = MONGO_DB
+    mongo_collection = MONGO_COLLECTION_PRODUCTS
+    mongo_key = ("unique_id", "location_city")
+
+    def start_requests(self):
+        for location in jiomart.settings.LOCATIONS:
+            self.logger.info(f"Starting scrape for {location['city']} ({location['pincode']})")
+            yield self.search_request(location, jiomart.settings.get_json_data(), page=1)
+
+    def search_request(self, location, json_data, page):
+        # POST body is part of the fingerprint, so each pageToken is its own
+        # request; the body is the same for every city, so the pincode goes
+        # into the fingerprint too and the HTTP cache keeps cities apart.
+        # Each city keeps its own cookie jar, so cookies the site sets for
+        # one pincode never ride along on another city's pages
+        return scrapy.Request(
+            SEARCH_API_URL,
+            method="POST",
+            headers=jiomart.settings.headers,
+            cookies=jiomart.settings.get_cookies(location['city'], location['pincode'], location['state_code']),
+            body=json.dumps(json_data),
+            callback=self.parse_item,
+            cb_kwargs={"location": location, "json_data": json_data, "page": page},
+            meta={"location_key": location['pincode'], "cookiejar": location['pincode']},
+            dont_filter=True,
+        )
+
+    def parse_item(self, response, location, json_data, page):
+        """item part"""
+        data = response.json()
+        products = data.get("results", [])
+
+        if not products:
+            self.logger.warning(f"[{location['city']}] No products found")
+            return
+
+        yield from jiomart.crawler.search_items(data, location)
+
+        # Extract next page token
+        next_page_token = data.get("nextPageToken")
+        if not next_page_token:
+            self.logger.info(f"[{location['city']}] Pagination completed at page {page}")
+            return
+
+        yield self.search_request(location, dict(json_data, pageToken=next_page_token), page + 1)
+
+
+class JiomartParserSpider(scrapy.Spider):
+    """PDP + price API per product → product data (jiomart parser.py)"""
+
+    name = "jiomart_parser"
+    allowed_domains = ["www.jiomart.com"]
+
+    mongo_db = MONGO_DB
+    mongo_collection = MONGO_COLLECTION_DATA
+    mongo_key = ("unique_id", "location")
+
+    def start_requests(self):
+        client = MongoClient(self.settings.get("MONGO_URI"))
+        db = client[MONGO_DB]
+        try:
+            pages = jiomart.input_pages.input_pages(
+                db[MONGO_COLLECTION_PRODUCTS], self.settings.getint("INPUT_PAGE_SIZE", 200), PRODUCT_FIELDS
+            )
+            for page in pages:
+                for product in self.unparsed(db, page):
+                    url = product.get('url')
+                    if not url or not product.get('unique_id'):
+                        continue
+                    product.pop('_id', None)
+                    # Every city fetches the same url; its pincode keeps the
+                    # dupefilter and the HTTP cache from merging them
+                    yield scrapy.Request(
+                        url,
+                        headers=self.product_headers(product, url),
+                        callback=self.parse_item,
+                        cb_kwargs={"product": product},
+                        meta={"location_key": product.get('location_pincode')},
+                    )
+        finally:
+            client.close()
+
+    def product_headers(self, product, url):
+        return jiomart.settings.get_headers_with_location(
+            product.get('location_city'), product.get('location_pincode'), product.get('location_state'), url
+        )
+
+    def unparsed(self, db, products):
+        """Products of one page not yet parsed for their city (all of them unless resuming)"""
+        if not self.settings.getbool("RESUME"):
+            return products
+        # Anti-join: drop products already saved for the same city
+        saved = {
+            (doc.get('unique_id'), doc.get('location'))
+            for doc in db[MONGO_COLLECTION_DATA].find(
+                {'unique_id': {'$in': [p.get('unique_id') for p in products]}}, {'unique_id': 1, 'location': 1}
+            )
+        }
+        return [p for p in products if (p.get('unique_id'), p.get('location_city')) not in saved]
+
+    def parse_item(self, response, product):
+        """Parse the PDP, then fetch its price"""
+        item = jiomart.parser.extract_item(product, product['url'], product['unique_id'], response.text, {})
+
+        # Prices change between runs, so the price API bypasses the HTTP cache
+        yield scrapy.Request(
+            PRICE_API_URL.format(product['unique_id']),
+            headers=self.product_headers(product, product['url']),
+            callback=self.parse_pricedata,
+            errback=self.price_failed,
+            cb_kwargs={"item": item},
+            meta={"dont_cache": True, "location_key": product.get('location_pincode')},
+            dont_filter=True,
+        )
+
+    def parse_pricedata(self, response, item):
+        """Extract price data from API"""
+        try:
+            data = response.json()
+        except ValueError as e:
+            # Block pages come back as HTML; keep the item without prices
+            self.logger.error(f"Price API returned no JSON for {item['unique_id']}: {e}")
+            data = {}
+        item.update(jiomart.parser.extract_prices(data))
+        yield item
+
+    def price_failed(self, failure):
+        """Save the item without prices, as the standalone parser does"""
+        item = failure.request.cb_kwargs["item"]
+        self.logger.warning(f"Price API failed for {item['unique_id']}: {failure.getErrorMessage()}")
+        item.update(jiomart.parser.extract_prices({}))
+        yield item
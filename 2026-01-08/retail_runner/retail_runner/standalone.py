@@ -0,0 +1,30 @@
+"""Import the standalone site projects the spiders share their code with
+
+Every standalone project imports its siblings by bare name (settings,
+parser, mongo_writer, ...) and several projects reuse the same names, so a
+project is imported with its directory first on sys.path and its sibling
+names are taken out of sys.modules again afterwards.
+"""
+import importlib
+import sys
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+@lru_cache(maxsize=None)
+def load_project(project, *modules):
+    """Modules of a standalone project (path from the repo root), by name"""
+    project_dir = REPO_ROOT / project
+    siblings = {path.stem for path in project_dir.glob("*.py")}
+    saved = {name: sys.modules.pop(name) for name in siblings if name in sys.modules}
+    sys.path.insert(0, str(project_dir))
+    try:
+        return SimpleNamespace(**{name: importlib.import_module(name) for name in modules})
+    finally:
+        sys.path.remove(str(project_dir))
+        for name in siblings:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
@@ -0,0 +1,48 @@
+"""Run the stages of one or more sites in order on a single reactor
+
+    python run.py halfords jiomart
+
+Each site's crawler finishes before its parser starts, since the parser
+reads the urls the crawler saved. Single spiders still run with
+`scrapy crawl <name>`.
+"""
+import sys
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.log import configure_logging
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+
+STAGES = {
+    "halfords": ["halfords_crawler", "halfords_parser"],
+    "jiomart": ["jiomart_crawler", "jiomart_parser"],
+}
+
+
+def main(sites):
+    settings = get_project_settings()
+    install_reactor(settings["TWISTED_REACTOR"])
+    configure_logging(settings)
+
+    from twisted.internet import defer, reactor
+
+    runner = CrawlerRunner(settings)
+
+    @defer.inlineCallbacks
+    def crawl():
+        try:
+            for site in sites:
+                for spider_name in STAGES[site]:
+                    yield runner.crawl(spider_name)
+        finally:
+            reactor.stop()
+
+    crawl()
+    reactor.run()
+
+
+if __name__ == "__main__":
+    sites = sys.argv[1:] or list(STAGES)
+    unknown = [site for site in sites if site not in STAGES]
+    if unknown:
+        sys.exit(f"Unknown site(s): {', '.join(unknown)}. Choose from: {', '.join(STAGES)}")
+    main(sites)